@@ -0,0 +1,212 @@
+import click
+import json
+import random
+import time
+from datetime import date, datetime
+from sqlalchemy import select
+from src.models import db, Article, Roadmap, Mindmap, Tag, TagRelation, User
+from src.utils.tag_graph_cache import TagGraph
+from src.utils.tag_layout import compute_layout, count_crossings
+from src.utils.content_codec import zstandard, encode_content, decode_content
+from src.utils.json_provider import orjson, json_default, dumps_text, loads_text
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _value_size(value):
+    """估算单个字段在 MySQL 协议中传输的字节数"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (datetime, date)):
+        return 8
+    if isinstance(value, bool):
+        return 1
+    return 8
+
+
+def _result_size(statement):
+    """以 Core 方式执行语句（不构造ORM对象），统计结果集的字节数"""
+    rows = db.session.connection().execute(statement).all()
+    return len(rows), sum(_value_size(value) for row in rows for value in row)
+
+
+def _synthetic_tag_graph(tag_count, max_parents, seed):
+    """构造不入库的随机标签DAG：每个标签从编号更小的标签中随机选取父标签"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    author = User(id=1, username='bench', email='bench@example.com', display_name='基准测试', created_at=now)
+    tags = [
+        Tag(id=i, user_id=1, name=f'标签{i}', description=f'基准测试标签 {i}', color='#1677ff',
+            created_at=now, updated_at=now, author=author)
+        for i in range(1, tag_count + 1)
+    ]
+    relations = []
+    for tag in tags[1:]:
+        for parent in rng.sample(tags[:tag.id - 1], min(tag.id - 1, rng.randint(1, max_parents))):
+            relations.append(TagRelation(
+                id=len(relations) + 1, parent_tag_id=parent.id, child_tag_id=tag.id, user_id=1,
+                created_at=now, parent_tag=parent, child_tag=tag
+            ))
+    return author, tags, relations
+
+
+def _measure(render, encode, repeat):
+    """返回 (编码后字节数, 平均耗时毫秒)"""
+    body = encode(render())
+    started = time.perf_counter()
+    for _ in range(repeat):
+        encode(render())
+    return len(body), (time.perf_counter() - started) * 1000 / repeat
+
+
+def register_benchmarks(app):
+    """注册 flask bench 基准测试命令"""
+    
+    @app.cli.group('bench')
+    def bench():
+        """性能基准测试"""
+    
+    @bench.command('list-payload')
+    @click.option('--limit', default=10, help='每页数量')
+    @click.option('--status', default='published', help='内容状态，传空字符串表示不过滤')
+    def list_payload(limit, status):
+        """比较列表查询加载全部列与延迟加载内容列时从数据库读取的字节数（关联加载方式相同）"""
+        for model in (Article, Roadmap, Mindmap):
+            query = model.query
+            if status:
+                query = query.filter(model.status == status)
+            query = query.order_by(model.published_at.desc(), model.created_at.desc()).limit(limit)
+            
+            # 两侧使用相同的关联加载方式，只比较内容列是否延迟加载；关联连接的开销单独列出
+            _, plain_bytes = _result_size(query.statement)
+            full_rows, full_bytes = _result_size(
+                query.options(*model.list_loader_options(include_content=True)).statement
+            )
+            summary_rows, summary_bytes = _result_size(
+                query.options(*model.list_loader_options()).statement
+            )
+            saved = (1 - summary_bytes / full_bytes) * 100 if full_bytes else 0
+            click.echo(
+                f'{model.__tablename__:<10} 行数 {full_rows:>4}  '
+                f'全部列 {full_bytes:>10,} B  摘要列 {summary_bytes:>10,} B  减少 {saved:5.1f}%  '
+                f'（其中关联连接 {full_bytes - plain_bytes:>8,} B）'
+            )
+    
+    @bench.command('tag-graph')
+    @click.option('--tags', 'tag_count', default=5000, help='标签数量')
+    @click.option('--max-parents', default=3, help='每个标签最多的父标签数')
+    @click.option('--repeat', default=5, help='每种格式的重复次数')
+    @click.option('--seed', default=42, help='随机种子')
+    def tag_graph(tag_count, max_parents, repeat, seed):
+        """比较标签关系图各种响应格式的大小与序列化耗时（合成数据，不访问数据库）"""
+        author, tags, relations = _synthetic_tag_graph(tag_count, max_parents, seed)
+        graph = TagGraph(1, 0, tags, relations)
+        author_data = author.to_dict()
+        dump_json = lambda data: app.json.dumps(data).encode('utf-8')
+        
+        formats = [
+            ('逐条 to_dict', lambda: {
+                'nodes': [tag.to_dict() for tag in tags],
+                'edges': [relation.to_dict() for relation in relations]
+            }, dump_json),
+            ('缓存图 完整', lambda: graph.render(author_data), dump_json),
+            ('缓存图 紧凑', lambda: graph.render_compact(author_data), dump_json),
+        ]
+        if msgpack is not None:
+            formats.append(('紧凑 MessagePack', lambda: graph.render_compact(author_data), lambda data: msgpack.packb(data, default=json_default)))
+        
+        click.echo(f'标签 {len(tags):,}  关系 {len(relations):,}')
+        baseline = None
+        for label, render, encode in formats:
+            size, elapsed = _measure(render, encode, repeat)
+            baseline = baseline or size
+            click.echo(f'{label:<16} {size:>12,} B  {size / baseline * 100:6.1f}%  {elapsed:8.1f} ms')
+        if msgpack is None:
+            click.echo('未安装 msgpack，跳过 MessagePack 格式')
+        
+        edges = [(relation.parent_tag_id, relation.child_tag_id) for relation in relations]
+        for rounds in (0, 4):
+            started = time.perf_counter()
+            layout = compute_layout(graph.nodes.keys(), edges, rounds=rounds)
+            elapsed = (time.perf_counter() - started) * 1000
+            click.echo(
+                f'分层布局 {rounds} 轮重心排序  {layout["layers"]} 层  '
+                f'相邻层交叉 {count_crossings(layout, edges):,}  {elapsed:8.1f} ms'
+            )
+    
+    @bench.command('content-storage')
+    @click.option('--limit', default=200, help='每种内容最多抽取的行数')
+    @click.option('--repeat', default=5, help='读取耗时的重复次数')
+    def content_storage(limit, repeat):
+        """比较内容各压缩方式的存储字节数与详情读取（解码并解析JSON）耗时"""
+        modes = ['none', 'zlib'] + (['zstd'] if zstandard is not None else [])
+        for model in (Article, Roadmap, Mindmap):
+            table = model.__table__
+            texts = [
+                decode_content(content) for content in db.session.execute(
+                    select(table.c.content).order_by(table.c.id.desc()).limit(limit)
+                ).scalars() if content
+            ]
+            if not texts:
+                click.echo(f'{model.__tablename__:<10} 无数据')
+                continue
+            
+            raw_size = sum(len(text.encode('utf-8')) for text in texts)
+            for mode in modes:
+                stored = [encode_content(text, mode) for text in texts]
+                size = sum(len(value.encode('utf-8')) for value in stored)
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    for value in stored:
+                        try:
+                            json.loads(decode_content(value))
+                        except json.JSONDecodeError:
+                            pass
+                elapsed = (time.perf_counter() - started) * 1000 / (repeat * len(stored))
+                click.echo(
+                    f'{model.__tablename__:<10} {mode:<5} 行数 {len(stored):>4}  '
+                    f'{size:>12,} B  {size / raw_size * 100:6.1f}%  读取 {elapsed:8.3f} ms/行'
+                )
+        if zstandard is None:
+            click.echo('未安装 zstandard，跳过 zstd 压缩方式')
+    
+    @bench.command('json')
+    @click.option('--limit', default=200, help='每种内容最多抽取的行数')
+    @click.option('--repeat', default=5, help='重复次数')
+    def json_backends(limit, repeat):
+        """比较标准库 json 与 orjson 对真实内容文档的解析、序列化耗时"""
+        backends = ['json'] + (['orjson'] if orjson is not None else [])
+        for model in (Article, Roadmap, Mindmap):
+            rows = model.query.order_by(model.id.desc()).limit(limit).all()
+            texts = [row.get_content_text() for row in rows if row.content]
+            if not texts:
+                click.echo(f'{model.__tablename__:<10} 无数据')
+                continue
+            documents = [loads_text(text, backend='json') for text in texts]
+            records = [row.to_dict(include_content=False) for row in rows]
+            size = sum(len(text.encode('utf-8')) for text in texts)
+            
+            for backend in backends:
+                timings = []
+                for action in (
+                    lambda: [loads_text(text, backend=backend) for text in texts],
+                    lambda: [dumps_text(document, backend=backend) for document in documents],
+                    lambda: dumps_text(records, sort_keys=True, backend=backend),
+                ):
+                    started = time.perf_counter()
+                    for _ in range(repeat):
+                        action()
+                    timings.append((time.perf_counter() - started) * 1000 / repeat)
+                click.echo(
+                    f'{model.__tablename__:<10} {backend:<6} 文档 {len(texts):>4} 个 {size:>12,} B  '
+                    f'解析 {timings[0]:8.2f} ms  序列化 {timings[1]:8.2f} ms  列表元数据 {timings[2]:8.2f} ms'
+                )
+        if orjson is None:
+            click.echo('未安装 orjson，只测试标准库 json')
@@ -0,0 +1,147 @@
+import click
+from sqlalchemy import or_, func, select, bindparam
+from src.models import db, Article, Roadmap, Mindmap, TagClosure
+from src.benchmarks import register_benchmarks
+from src.utils.search_index import rebuild_index
+from src.utils.schema import upgrade_schema
+from src.utils.tag_usage import reconcile_usage
+from src.utils.tag_pages import backfill_tag_articles
+from src.utils.mindmap_nodes import sync_mindmap
+from src.utils.content_codec import COMPRESSION_MODES, compression_mode, encode_content, decode_content
+
+
+def process_articles(id_query, handler, batch_size=200):
+    """按批加载文章并逐篇处理，每批提交一次，返回处理的文章数"""
+    article_ids = [row.id for row in id_query.order_by(Article.id)]
+    
+    for start in range(0, len(article_ids), batch_size):
+        batch = Article.query.filter(Article.id.in_(article_ids[start:start + batch_size])).all()
+        for article in batch:
+            handler(article)
+        db.session.commit()
+        db.session.expunge_all()
+    
+    return len(article_ids)
+
+
+def recode_content(model, mode, batch_size=200):
+    """按 ID 分批将内容列重新编码为指定压缩方式（不改变 updated_at），返回 (变更行数, 编码前字节数, 编码后字节数)"""
+    table = model.__table__
+    stmt = table.update().where(
+        table.c.id == bindparam('row_id')
+    ).values({
+        'content': bindparam('new_content'),
+        'updated_at': table.c.updated_at
+    })
+    
+    last_id = 0
+    changed = before = after = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.content).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        
+        updates = []
+        for row in rows:
+            content = encode_content(decode_content(row.content), mode)
+            before += len((row.content or '').encode('utf-8'))
+            after += len((content or '').encode('utf-8'))
+            if content != row.content:
+                updates.append({'row_id': row.id, 'new_content': content})
+        if updates:
+            db.session.execute(stmt, updates)
+        db.session.commit()
+        changed += len(updates)
+    
+    return changed, before, after
+
+
+def register_commands(app):
+    """注册 flask 命令行维护命令"""
+    register_benchmarks(app)
+    
+    @app.cli.command('upgrade-schema')
+    def upgrade_schema_command():
+        """为已有数据库补齐新增的表、列、索引和外键"""
+        changes = upgrade_schema(db)
+        for change in changes:
+            click.echo(change)
+        click.echo(f'数据库结构已是最新（{len(changes)} 项变更）')
+    
+    @app.cli.command('search-rebuild')
+    def search_rebuild():
+        """重建文章全文检索倒排索引"""
+        count = rebuild_index()
+        click.echo(f'已重建 {count} 篇文章的全文索引')
+    
+    @app.cli.command('rebuild-tag-closure')
+    @click.option('--user-id', type=int, default=None, help='只重建指定用户的标签闭包')
+    def rebuild_tag_closure(user_id):
+        """根据标签关系重建标签闭包表"""
+        count = TagClosure.rebuild(user_id)
+        db.session.commit()
+        click.echo(f'已写入 {count} 条标签闭包记录')
+    
+    @app.cli.command('reconcile-tag-usage')
+    def reconcile_tag_usage():
+        """按关联表重新统计标签的使用计数，修正不一致的标签"""
+        count = reconcile_usage()
+        click.echo(f'已修正 {count} 个标签的使用计数')
+    
+    @app.cli.command('backfill-tag-articles')
+    def backfill_tag_articles_command():
+        """为尚未关联标签文章的标签回填 article_id"""
+        count = backfill_tag_articles()
+        click.echo(f'已为 {count} 个标签回填标签文章')
+    
+    @app.cli.command('sync-mindmap-nodes')
+    @click.option('--all', 'sync_all', is_flag=True, help='重新同步全部思维导图（默认只处理节点表落后于内容的思维导图）')
+    @click.option('--batch-size', default=50, help='每批处理的思维导图数')
+    def sync_mindmap_nodes(sync_all, batch_size):
+        """按思维导图内容同步节点表"""
+        query = db.session.query(Mindmap.id)
+        if not sync_all:
+            query = query.filter(or_(Mindmap.node_version.is_(None), Mindmap.node_version != func.coalesce(Mindmap.version, 0)))
+        mindmap_ids = [row.id for row in query.order_by(Mindmap.id)]
+        
+        for start in range(0, len(mindmap_ids), batch_size):
+            for mindmap in Mindmap.query.filter(Mindmap.id.in_(mindmap_ids[start:start + batch_size])).all():
+                sync_mindmap(db.session.connection(), mindmap)
+            db.session.commit()
+            db.session.expunge_all()
+        click.echo(f'已同步 {len(mindmap_ids)} 个思维导图的节点表')
+    
+    @app.cli.command('compress-content')
+    @click.option('--mode', type=click.Choice(COMPRESSION_MODES), default=None, help='目标压缩方式（默认使用 CONTENT_COMPRESSION 配置，none 表示还原为原文）')
+    @click.option('--batch-size', default=200, help='每批处理的行数')
+    def compress_content(mode, batch_size):
+        """将已有的文章、路线图、思维导图内容重新编码为目标压缩方式"""
+        mode = mode or compression_mode()
+        for model in (Article, Roadmap, Mindmap):
+            changed, before, after = recode_content(model, mode, batch_size)
+            click.echo(f'{model.__tablename__:<10} 重新编码 {changed:>6} 行  {before:>12,} B -> {after:>12,} B')
+    
+    @app.cli.command('render-articles')
+    @click.option('--all', 'render_all', is_flag=True, help='重新渲染全部文章（默认只处理 content_html 为空的文章）')
+    @click.option('--batch-size', default=200, help='每批处理的文章数')
+    def render_articles(render_all, batch_size):
+        """回填文章的 content_html"""
+        query = db.session.query(Article.id)
+        if not render_all:
+            query = query.filter(Article.content_html.is_(None))
+        count = process_articles(query, lambda article: article.render_content_html(), batch_size)
+        click.echo(f'已渲染 {count} 篇文章的HTML')
+    
+    @app.cli.command('article-stats')
+    @click.option('--all', 'refresh_all', is_flag=True, help='重新统计全部文章（默认只处理尚未统计的文章）')
+    @click.option('--batch-size', default=200, help='每批处理的文章数')
+    def article_stats(refresh_all, batch_size):
+        """回填文章的字数、阅读时长，并为空摘要生成摘要"""
+        query = db.session.query(Article.id)
+        if not refresh_all:
+            query = query.filter(Article.word_count.is_(None))
+        count = process_articles(query, lambda article: article.refresh_content_stats(), batch_size)
+        click.echo(f'已统计 {count} 篇文章')
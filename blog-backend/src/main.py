@@ -20,8 +20,18 @@ from src.routes.tag import tag_bp
 from src.routes.upload import upload_bp
 from src.routes.admin import admin_bp
 
+# 导入命令行命令
+from src.commands import register_commands
+from src.utils.view_counter import view_counter
+from src.utils.tag_graph_cache import tag_graph_cache
+from src.utils.json_provider import FastJSONProvider
+from src.utils import tag_usage  # noqa: F401  注册维护标签使用计数的会话事件
+from src.utils import mindmap_nodes  # noqa: F401  注册同步思维导图节点表的会话事件
+
 def create_app():
     app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    # JSON 序列化：安装 orjson 时使用 orjson，否则使用标准库；日期时间统一输出 ISO 8601 字符串
+    app.json = FastJSONProvider(app)
     
     # 基本配置
     app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
@@ -35,6 +45,22 @@ def create_app():
     # app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # 浏览量写回缓冲配置：每隔多少秒或累计多少次浏览批量写入数据库
+    app.config['VIEW_COUNTER_FLUSH_INTERVAL'] = 30
+    app.config['VIEW_COUNTER_FLUSH_THRESHOLD'] = 100
+    
+    # 标签图缓存配置：最多缓存多少个用户的标签图，以及缓存过期秒数（多进程部署时兜底）
+    app.config['TAG_GRAPH_CACHE_SIZE'] = 128
+    app.config['TAG_GRAPH_CACHE_TTL'] = 300
+    
+    # 思维导图节点表：保存时同步按节点拆分的内容，供按需加载子树；关闭时读取回退到完整内容
+    # 默认关闭，启用前先运行 flask upgrade-schema 与 flask sync-mindmap-nodes
+    app.config['MINDMAP_NODE_STORE'] = False
+    
+    # 内容列压缩存储：none / zlib / zstd（需安装 zstandard，未安装时回退到 zlib）；已有数据可用 flask compress-content 重新编码
+    # 默认不压缩；启用后写入的内容只能由支持解压的版本读取
+    app.config['CONTENT_COMPRESSION'] = 'none'
+    
     # 文件上传配置
     app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'static', 'uploads')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
@@ -43,6 +69,8 @@ def create_app():
     CORS(app, origins="*")  # 允许所有来源的跨域请求
     JWTManager(app)
     db.init_app(app)
+    view_counter.init_app(app)
+    tag_graph_cache.init_app(app)
     
     # 注册蓝图
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -53,6 +81,9 @@ def create_app():
     app.register_blueprint(upload_bp, url_prefix='/api/upload')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     
+    # 注册命令行命令
+    register_commands(app)
+    
     # 创建数据库表
     with app.app_context():
         # 确保上传目录存在
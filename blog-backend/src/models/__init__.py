@@ -1,13 +1,14 @@
 from src.models.user import db, User
 from src.models.article import Article
 from src.models.roadmap import Roadmap
-from src.models.mindmap import Mindmap
-from src.models.tag import Tag, TagRelation, article_tags, roadmap_tags, mindmap_tags
+from src.models.mindmap import Mindmap, MindmapNode
+from src.models.tag import Tag, TagRelation, TagClosure, article_tags, roadmap_tags, mindmap_tags
 from src.models.upload import Upload
+from src.models.search import ArticleTerm, ArticleSearchDoc
 
 __all__ = [
-    'db', 'User', 'Article', 'Roadmap', 'Mindmap', 
-    'Tag', 'TagRelation', 'Upload',
+    'db', 'User', 'Article', 'Roadmap', 'Mindmap', 'MindmapNode',
+    'Tag', 'TagRelation', 'TagClosure', 'Upload', 'ArticleTerm', 'ArticleSearchDoc',
     'article_tags', 'roadmap_tags', 'mindmap_tags'
 ]
 
@@ -1,4 +1,11 @@
 from src.models.user import db
+from src.models.tag import Tag
+from sqlalchemy.orm import joinedload, selectinload, defer
+from src.utils.fieldsets import DEFAULT_FIELDSET
+from src.utils.tiptap import render_html, analyze
+from src.utils.content_codec import encode_content, decode_content
+from src.utils.raw_json import RawJSON
+from src.utils.json_provider import dumps_text, loads_text, is_valid_json
 from datetime import datetime
 import json
 
@@ -11,6 +18,9 @@ class Article(db.Model):
     content = db.Column(db.Text, nullable=False)  # TipTap JSON格式
     content_html = db.Column(db.Text)  # 渲染后的HTML
     excerpt = db.Column(db.Text)
+    word_count = db.Column(db.Integer, default=0)  # 字数（汉字按字、其他文字按词）
+    char_count = db.Column(db.Integer, default=0)  # 字符数（不含空白）
+    reading_time = db.Column(db.Integer, default=0)  # 预计阅读时长（分钟）
     status = db.Column(db.Enum('draft', 'published', 'archived', name='article_status'), default='draft')
     is_tag_article = db.Column(db.Boolean, default=False)
     roadmap_id = db.Column(db.Integer, db.ForeignKey('roadmaps.id'), nullable=True)
@@ -20,6 +30,11 @@ class Article(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     published_at = db.Column(db.DateTime, nullable=True)
     
+    # 索引：列表按 (published_at, created_at, id) 倒序游标分页
+    __table_args__ = (
+        db.Index('idx_articles_status_published', 'status', 'published_at', 'created_at', 'id'),
+    )
+    
     # 关系
     author = db.relationship('User', backref='user_articles', lazy=True)
     tags = db.relationship('Tag', secondary='article_tags', backref='articles', lazy=True)
@@ -27,18 +42,71 @@ class Article(db.Model):
     def __repr__(self):
         return f'<Article {self.title}>'
     
+    @staticmethod
+    def list_loader_options(fieldset=DEFAULT_FIELDSET, include_content=False):
+        """列表序列化所需的加载选项：不加载大字段内容，只按整页批量加载字段集需要展开的关联
+
+        include_content 为真时不延迟内容列，关联加载方式不变（用于对比延迟加载的效果）。
+        """
+        options = [] if include_content else [defer(Article.content), defer(Article.content_html)]
+        if fieldset.expands('author'):
+            options.append(joinedload(Article.author))
+        if fieldset.expands('tags'):
+            tags = selectinload(Article.tags)
+            options.append(tags.joinedload(Tag.author) if fieldset.nested('tags').expands('author') else tags)
+        return tuple(options)
+    
     def set_content(self, content_dict):
-        """设置内容（将字典转换为JSON字符串）"""
-        if isinstance(content_dict, dict):
-            self.content = json.dumps(content_dict, ensure_ascii=False)
+        """设置内容（将字典转换为JSON字符串，按配置压缩存储），并同步生成HTML和阅读统计"""
+        if isinstance(content_dict, str):
+            # 字符串须为合法JSON，保证读取时可直接拼接进响应；否则按纯文本段落保存
+            try:
+                loads_text(content_dict)
+                text = content_dict
+            except json.JSONDecodeError:
+                content_dict = {'type': 'doc', 'content': [{'type': 'paragraph', 'content': [{'type': 'text', 'text': content_dict}]}]}
+                text = dumps_text(content_dict)
         else:
-            self.content = content_dict
+            text = dumps_text(content_dict)
+        self.content = encode_content(text)
+        content_dict = content_dict if isinstance(content_dict, dict) else self.get_content()
+        self.render_content_html(content_dict)
+        self.refresh_content_stats(content_dict)
+    
+    def render_content_html(self, content_dict=None):
+        """根据 TipTap JSON 生成 content_html"""
+        if content_dict is None:
+            content_dict = self.get_content()
+        self.content_html = render_html(content_dict)
+    
+    def refresh_content_stats(self, content_dict=None):
+        """根据正文更新字数、字符数和阅读时长，摘要为空时自动生成摘要"""
+        if content_dict is None:
+            content_dict = self.get_content()
+        stats = analyze(content_dict)
+        self.word_count = stats['word_count']
+        self.char_count = stats['char_count']
+        self.reading_time = stats['reading_time']
+        if not self.excerpt:
+            self.excerpt = stats['excerpt']
+    
+    def get_content_text(self):
+        """获取解压后的内容JSON字符串"""
+        return decode_content(self.content)
+    
+    def get_content_raw(self):
+        """获取内容的原始JSON片段，供响应直接拼接；不是合法JSON的旧数据回退到 get_content() 的结果"""
+        text = self.get_content_text()
+        if text and is_valid_json(text):
+            return RawJSON(text)
+        return self.get_content()
     
     def get_content(self):
         """获取内容（将JSON字符串转换为字典）"""
         try:
             if isinstance(self.content, str):
-                return json.loads(self.content) if self.content else {}
+                text = self.get_content_text()
+                return loads_text(text) if text else {}
             elif isinstance(self.content, dict):
                 return self.content
             else:
@@ -51,27 +119,34 @@ class Article(db.Model):
         self.status = 'published'
         self.published_at = datetime.utcnow()
     
-    def to_dict(self, include_content=True):
-        """转换为字典格式"""
+    def to_dict(self, include_content=True, fieldset=DEFAULT_FIELDSET, raw_content=False):
+        """转换为字典格式，fieldset 决定输出的字段和展开的关联；raw_content 时内容为未解析的 RawJSON 片段"""
         data = {
             'id': self.id,
             'user_id': self.user_id,
             'title': self.title,
             'excerpt': self.excerpt,
+            'word_count': self.word_count,
+            'char_count': self.char_count,
+            'reading_time': self.reading_time,
             'status': self.status,
-            'author': self.author.to_dict() if self.author else None,
             'is_tag_article': self.is_tag_article,
             'roadmap_id': self.roadmap_id,
             'mindmap_id': self.mindmap_id,
             'view_count': self.view_count,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'published_at': self.published_at.isoformat() if self.published_at else None,
-            'tags': [tag.to_dict() for tag in self.tags] if self.tags else []
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'published_at': self.published_at
         }
         
-        if include_content:
-            data['content'] = self.get_content()
+        if fieldset.expands('author'):
+            data['author'] = self.author.to_dict(fieldset=fieldset.nested('author')) if self.author else None
+        if fieldset.expands('tags'):
+            data['tags'] = [tag.to_dict(fieldset=fieldset.nested('tags')) for tag in self.tags]
+        
+        if include_content and fieldset.includes('content'):
+            data['content'] = self.get_content_raw() if raw_content else self.get_content()
+        if include_content and fieldset.includes('content_html'):
             data['content_html'] = self.content_html
             
-        return data
\ No newline at end of file
+        return fieldset.apply(data)
\ No newline at end of file
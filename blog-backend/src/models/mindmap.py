@@ -1,4 +1,11 @@
 from src.models.user import db
+from src.models.tag import Tag
+from sqlalchemy import select, literal
+from sqlalchemy.orm import joinedload, selectinload, defer
+from src.utils.fieldsets import DEFAULT_FIELDSET
+from src.utils.content_codec import encode_content, decode_content
+from src.utils.raw_json import RawJSON
+from src.utils.json_provider import dumps_text, loads_text, is_valid_json
 from datetime import datetime
 import json
 
@@ -10,12 +17,19 @@ class Mindmap(db.Model):
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     content = db.Column(db.Text, nullable=False)  # Simple Mind Map JSON格式
+    version = db.Column(db.Integer, default=0)  # 内容版本号，每次写入内容时递增，用于 JSON Patch 冲突检测
+    node_version = db.Column(db.Integer, nullable=True)  # 节点表已同步到的内容版本号，与 version 相等时节点表可用
     status = db.Column(db.Enum('draft', 'published', 'archived', name='mindmap_status'), default='draft')
     view_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     published_at = db.Column(db.DateTime, nullable=True)
     
+    # 索引：列表按 (published_at, created_at, id) 倒序游标分页
+    __table_args__ = (
+        db.Index('idx_mindmaps_status_published', 'status', 'published_at', 'created_at', 'id'),
+    )
+    
     # 关系
     author = db.relationship('User', backref='user_mindmaps', lazy=True)
     tags = db.relationship('Tag', secondary='mindmap_tags', backref='mindmaps', lazy=True)
@@ -24,14 +38,41 @@ class Mindmap(db.Model):
     def __repr__(self):
         return f'<Mindmap {self.title}>'
     
+    @staticmethod
+    def list_loader_options(fieldset=DEFAULT_FIELDSET, include_content=False):
+        """列表序列化所需的加载选项：不加载大字段内容，只按整页批量加载字段集需要展开的关联
+
+        include_content 为真时不延迟内容列，关联加载方式不变（用于对比延迟加载的效果）。
+        """
+        options = [] if include_content else [defer(Mindmap.content)]
+        if fieldset.expands('author'):
+            options.append(joinedload(Mindmap.author))
+        if fieldset.expands('tags'):
+            tags = selectinload(Mindmap.tags)
+            options.append(tags.joinedload(Tag.author) if fieldset.nested('tags').expands('author') else tags)
+        return tuple(options)
+    
     def set_content(self, content_dict):
-        """设置内容（将字典转换为JSON字符串）"""
-        self.content = json.dumps(content_dict, ensure_ascii=False)
+        """设置内容（将字典转换为JSON字符串，按配置压缩存储），并递增内容版本号"""
+        self.content = encode_content(dumps_text(content_dict))
+        self.version = (self.version or 0) + 1
+    
+    def get_content_text(self):
+        """获取解压后的内容JSON字符串"""
+        return decode_content(self.content)
+    
+    def get_content_raw(self):
+        """获取内容的原始JSON片段，供响应直接拼接；不是合法JSON的旧数据回退到 get_content() 的结果"""
+        text = self.get_content_text()
+        if text and is_valid_json(text):
+            return RawJSON(text)
+        return self.get_content()
     
     def get_content(self):
         """获取内容（将JSON字符串转换为字典）"""
         try:
-            return json.loads(self.content) if self.content else {}
+            text = self.get_content_text()
+            return loads_text(text) if text else {}
         except json.JSONDecodeError:
             return {}
     
@@ -40,24 +81,72 @@ class Mindmap(db.Model):
         self.status = 'published'
         self.published_at = datetime.utcnow()
     
-    def to_dict(self, include_content=True):
-        """转换为字典格式"""
+    def to_dict(self, include_content=True, fieldset=DEFAULT_FIELDSET, raw_content=False):
+        """转换为字典格式，fieldset 决定输出的字段和展开的关联；raw_content 时内容为未解析的 RawJSON 片段"""
         data = {
             'id': self.id,
             'user_id': self.user_id,
             'title': self.title,
             'description': self.description,
             'status': self.status,
-            'author': self.author.to_dict() if self.author else None,
+            'version': self.version or 0,
             'view_count': self.view_count,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'published_at': self.published_at.isoformat() if self.published_at else None,
-            'tags': [tag.to_dict() for tag in self.tags] if self.tags else []
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'published_at': self.published_at
         }
         
-        if include_content:
-            data['content'] = self.get_content()
+        if fieldset.expands('author'):
+            data['author'] = self.author.to_dict(fieldset=fieldset.nested('author')) if self.author else None
+        if fieldset.expands('tags'):
+            data['tags'] = [tag.to_dict(fieldset=fieldset.nested('tags')) for tag in self.tags]
+        
+        if include_content and fieldset.includes('content'):
+            data['content'] = self.get_content_raw() if raw_content else self.get_content()
             
-        return data
+        return fieldset.apply(data)
+    
+    @property
+    def nodes_synced(self):
+        """节点表是否与当前内容一致"""
+        return self.node_version is not None and self.node_version == (self.version or 0)
 
+class MindmapNode(db.Model):
+    """思维导图节点表：按节点拆分的内容，供按需加载子树；由 utils.mindmap_nodes 与内容同步"""
+    __tablename__ = 'mindmap_nodes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    mindmap_id = db.Column(db.Integer, db.ForeignKey('mindmaps.id', ondelete='CASCADE'), nullable=False)
+    node_id = db.Column(db.String(64), nullable=False)  # 节点 data.uid，缺失时由父节点ID与位置生成
+    parent_id = db.Column(db.String(64), nullable=True)  # 根节点为空
+    position = db.Column(db.Integer, nullable=False, default=0)  # 在兄弟节点中的顺序
+    depth = db.Column(db.Integer, nullable=False, default=0)  # 根节点为 0
+    child_count = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.Text, nullable=False)  # 节点 data 的JSON，不含子节点
+    
+    # 唯一约束和索引
+    __table_args__ = (
+        db.UniqueConstraint('mindmap_id', 'node_id', name='unique_mindmap_node'),
+        db.Index('idx_mindmap_nodes_parent', 'mindmap_id', 'parent_id', 'position'),
+    )
+    
+    def __repr__(self):
+        return f'<MindmapNode {self.mindmap_id}:{self.node_id}>'
+    
+    @staticmethod
+    def subtree(mindmap_id, root_id, max_depth):
+        """用递归CTE查询从 root_id 出发 max_depth 层以内的节点，返回节点行（含根节点）"""
+        nodes = MindmapNode.__table__
+        columns = (nodes.c.node_id, nodes.c.parent_id, nodes.c.position, nodes.c.depth, nodes.c.child_count, nodes.c.data)
+        
+        tree = select(*columns, literal(0).label('level')).where(
+            nodes.c.mindmap_id == mindmap_id, nodes.c.node_id == root_id
+        ).cte('mindmap_subtree', recursive=True)
+        
+        tree = tree.union_all(
+            select(*columns, tree.c.level + 1).join(
+                tree, nodes.c.parent_id == tree.c.node_id
+            ).where(nodes.c.mindmap_id == mindmap_id, tree.c.level < max_depth)
+        )
+        
+        return db.session.execute(select(tree).order_by(tree.c.depth, tree.c.position)).all()
@@ -1,4 +1,10 @@
 from src.models.user import db
+from src.models.tag import Tag
+from sqlalchemy.orm import joinedload, selectinload, defer
+from src.utils.fieldsets import DEFAULT_FIELDSET
+from src.utils.content_codec import encode_content, decode_content
+from src.utils.raw_json import RawJSON
+from src.utils.json_provider import dumps_text, loads_text, is_valid_json
 from datetime import datetime
 import json
 
@@ -10,12 +16,18 @@ class Roadmap(db.Model):
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     content = db.Column(db.Text, nullable=False)  # Vue Flow JSON格式
+    version = db.Column(db.Integer, default=0)  # 内容版本号，每次写入内容时递增，用于 JSON Patch 冲突检测
     status = db.Column(db.Enum('draft', 'published', 'archived', name='roadmap_status'), default='draft')
     view_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     published_at = db.Column(db.DateTime, nullable=True)
     
+    # 索引：列表按 (published_at, created_at, id) 倒序游标分页
+    __table_args__ = (
+        db.Index('idx_roadmaps_status_published', 'status', 'published_at', 'created_at', 'id'),
+    )
+    
     # 关系
     author = db.relationship('User', backref='user_roadmaps', lazy=True)
     tags = db.relationship('Tag', secondary='roadmap_tags', backref='roadmaps', lazy=True)
@@ -24,14 +36,41 @@ class Roadmap(db.Model):
     def __repr__(self):
         return f'<Roadmap {self.title}>'
     
+    @staticmethod
+    def list_loader_options(fieldset=DEFAULT_FIELDSET, include_content=False):
+        """列表序列化所需的加载选项：不加载大字段内容，只按整页批量加载字段集需要展开的关联
+
+        include_content 为真时不延迟内容列，关联加载方式不变（用于对比延迟加载的效果）。
+        """
+        options = [] if include_content else [defer(Roadmap.content)]
+        if fieldset.expands('author'):
+            options.append(joinedload(Roadmap.author))
+        if fieldset.expands('tags'):
+            tags = selectinload(Roadmap.tags)
+            options.append(tags.joinedload(Tag.author) if fieldset.nested('tags').expands('author') else tags)
+        return tuple(options)
+    
     def set_content(self, content_dict):
-        """设置内容（将字典转换为JSON字符串）"""
-        self.content = json.dumps(content_dict, ensure_ascii=False)
+        """设置内容（将字典转换为JSON字符串，按配置压缩存储），并递增内容版本号"""
+        self.content = encode_content(dumps_text(content_dict))
+        self.version = (self.version or 0) + 1
+    
+    def get_content_text(self):
+        """获取解压后的内容JSON字符串"""
+        return decode_content(self.content)
+    
+    def get_content_raw(self):
+        """获取内容的原始JSON片段，供响应直接拼接；不是合法JSON的旧数据回退到 get_content() 的结果"""
+        text = self.get_content_text()
+        if text and is_valid_json(text):
+            return RawJSON(text)
+        return self.get_content()
     
     def get_content(self):
         """获取内容（将JSON字符串转换为字典）"""
         try:
-            return json.loads(self.content) if self.content else {}
+            text = self.get_content_text()
+            return loads_text(text) if text else {}
         except json.JSONDecodeError:
             return {}
     
@@ -40,24 +79,28 @@ class Roadmap(db.Model):
         self.status = 'published'
         self.published_at = datetime.utcnow()
     
-    def to_dict(self, include_content=True):
-        """转换为字典格式"""
+    def to_dict(self, include_content=True, fieldset=DEFAULT_FIELDSET, raw_content=False):
+        """转换为字典格式，fieldset 决定输出的字段和展开的关联；raw_content 时内容为未解析的 RawJSON 片段"""
         data = {
             'id': self.id,
             'user_id': self.user_id,
             'title': self.title,
             'description': self.description,
             'status': self.status,
-            'author': self.author.to_dict() if self.author else None,
+            'version': self.version or 0,
             'view_count': self.view_count,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'published_at': self.published_at.isoformat() if self.published_at else None,
-            'tags': [tag.to_dict() for tag in self.tags] if self.tags else []
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'published_at': self.published_at
         }
         
-        if include_content:
-            data['content'] = self.get_content()
+        if fieldset.expands('author'):
+            data['author'] = self.author.to_dict(fieldset=fieldset.nested('author')) if self.author else None
+        if fieldset.expands('tags'):
+            data['tags'] = [tag.to_dict(fieldset=fieldset.nested('tags')) for tag in self.tags]
+        
+        if include_content and fieldset.includes('content'):
+            data['content'] = self.get_content_raw() if raw_content else self.get_content()
             
-        return data
+        return fieldset.apply(data)
 
@@ -0,0 +1,27 @@
+from src.models.user import db
+
+class ArticleTerm(db.Model):
+    """文章倒排索引：词项 -> 文章及词频"""
+    __tablename__ = 'article_search_terms'
+    
+    term = db.Column(db.String(64), primary_key=True)
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    tf = db.Column(db.Integer, nullable=False, default=1)
+    
+    # 索引
+    __table_args__ = (
+        db.Index('idx_search_terms_article_id', 'article_id'),
+    )
+    
+    def __repr__(self):
+        return f'<ArticleTerm {self.term} -> {self.article_id}>'
+
+class ArticleSearchDoc(db.Model):
+    """文章索引文档的长度统计，用于BM25长度归一化"""
+    __tablename__ = 'article_search_docs'
+    
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    length = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ArticleSearchDoc {self.article_id}>'
@@ -1,5 +1,8 @@
 from src.models.user import db
+from sqlalchemy import or_, select, literal
+from sqlalchemy.orm import joinedload
 from datetime import datetime
+from src.utils.fieldsets import DEFAULT_FIELDSET
 
 # 关联表定义
 article_tags = db.Table('article_tags',
@@ -7,7 +10,8 @@ article_tags = db.Table('article_tags',
     db.Column('article_id', db.Integer, db.ForeignKey('articles.id'), nullable=False),
     db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'), nullable=False),
     db.Column('created_at', db.DateTime, default=datetime.utcnow),
-    db.UniqueConstraint('article_id', 'tag_id', name='unique_article_tag')
+    db.UniqueConstraint('article_id', 'tag_id', name='unique_article_tag'),
+    db.Index('idx_article_tags_tag_id', 'tag_id', 'article_id')
 )
 
 roadmap_tags = db.Table('roadmap_tags',
@@ -15,7 +19,8 @@ roadmap_tags = db.Table('roadmap_tags',
     db.Column('roadmap_id', db.Integer, db.ForeignKey('roadmaps.id'), nullable=False),
     db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'), nullable=False),
     db.Column('created_at', db.DateTime, default=datetime.utcnow),
-    db.UniqueConstraint('roadmap_id', 'tag_id', name='unique_roadmap_tag')
+    db.UniqueConstraint('roadmap_id', 'tag_id', name='unique_roadmap_tag'),
+    db.Index('idx_roadmap_tags_tag_id', 'tag_id', 'roadmap_id')
 )
 
 mindmap_tags = db.Table('mindmap_tags',
@@ -23,7 +28,8 @@ mindmap_tags = db.Table('mindmap_tags',
     db.Column('mindmap_id', db.Integer, db.ForeignKey('mindmaps.id'), nullable=False),
     db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'), nullable=False),
     db.Column('created_at', db.DateTime, default=datetime.utcnow),
-    db.UniqueConstraint('mindmap_id', 'tag_id', name='unique_mindmap_tag')
+    db.UniqueConstraint('mindmap_id', 'tag_id', name='unique_mindmap_tag'),
+    db.Index('idx_mindmap_tags_tag_id', 'tag_id', 'mindmap_id')
 )
 
 class Tag(db.Model):
@@ -34,6 +40,14 @@ class Tag(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     color = db.Column(db.String(7), default='#1677ff')
+    # 标签对应的标签文章（管理员创建标签时生成），旧数据由 flask backfill-tag-articles 回填
+    article_id = db.Column(
+        db.Integer, db.ForeignKey('articles.id', name='fk_tags_article_id', ondelete='SET NULL'), nullable=True
+    )
+    # 使用计数：引用该标签的已发布内容数量，由 utils.tag_usage 在内容变更时维护
+    article_count = db.Column(db.Integer, default=0)
+    roadmap_count = db.Column(db.Integer, default=0)
+    mindmap_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -41,25 +55,46 @@ class Tag(db.Model):
     __table_args__ = (
         db.UniqueConstraint('user_id', 'name', name='unique_user_tag'),
         db.Index('idx_tags_user_id', 'user_id'),
+        db.Index('idx_tags_article_id', 'article_id'),
     )
     
     # 关系
     author = db.relationship('User', backref='tags', lazy=True)
+    # 标签文章被删除时 ORM 会将 article_id 置空
+    article = db.relationship('Article', foreign_keys=[article_id], backref=db.backref('page_tag', uselist=False), lazy=True)
     
     def __repr__(self):
         return f'<Tag {self.name}>'
     
-    def to_dict(self):
+    @staticmethod
+    def list_loader_options(fieldset=DEFAULT_FIELDSET):
+        """列表序列化所需的加载选项：需要展开作者时随标签一并加载"""
+        if fieldset.expands('author'):
+            return (joinedload(Tag.author),)
+        return ()
+    
+    def to_dict(self, include_author=True, fieldset=DEFAULT_FIELDSET):
         """转换为字典格式"""
-        return {
+        data = {
             'id': self.id,
             'user_id': self.user_id,
             'name': self.name,
             'description': self.description,
             'color': self.color,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'author': self.author.to_dict() if self.author else None
+            'article_id': self.article_id,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+        if include_author and fieldset.expands('author'):
+            data['author'] = self.author.to_dict(fieldset=fieldset.nested('author')) if self.author else None
+        return fieldset.apply(data)
+    
+    def usage_counts(self):
+        """引用该标签的已发布内容数量"""
+        return {
+            'articles': self.article_count or 0,
+            'roadmaps': self.roadmap_count or 0,
+            'mindmaps': self.mindmap_count or 0
         }
 
 class TagRelation(db.Model):
@@ -86,47 +121,234 @@ class TagRelation(db.Model):
     def __repr__(self):
         return f'<TagRelation {self.parent_tag_id} -> {self.child_tag_id}>'
     
-    def to_dict(self):
+    def to_dict(self, fieldset=DEFAULT_FIELDSET):
         """转换为字典格式"""
-        return {
+        data = {
             'id': self.id,
             'parent_tag_id': self.parent_tag_id,
             'child_tag_id': self.child_tag_id,
             'user_id': self.user_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'parent_tag': self.parent_tag.to_dict() if self.parent_tag else None,
-            'child_tag': self.child_tag.to_dict() if self.child_tag else None
+            'created_at': self.created_at
         }
+        if fieldset.expands('parent_tag'):
+            data['parent_tag'] = self.parent_tag.to_dict(fieldset=fieldset.nested('parent_tag')) if self.parent_tag else None
+        if fieldset.expands('child_tag'):
+            data['child_tag'] = self.child_tag.to_dict(fieldset=fieldset.nested('child_tag')) if self.child_tag else None
+        return fieldset.apply(data)
     
     @staticmethod
-    def validate_dag(user_id, parent_tag_id, child_tag_id):
-        """验证添加关系后是否仍为有向无环图"""
-        if parent_tag_id == child_tag_id:
-            return False, "标签不能关联自己"
+    def descendant_ids(tag_id):
+        """获取标签及其全部后代标签的ID（查询闭包表）"""
+        rows = db.session.query(TagClosure.descendant_id).filter(
+            TagClosure.ancestor_id == tag_id
+        ).distinct().all()
+        return {tag_id} | {row.descendant_id for row in rows}
+    
+    @staticmethod
+    def ancestor_ids(tag_id):
+        """获取标签及其全部祖先标签的ID（查询闭包表）"""
+        rows = db.session.query(TagClosure.ancestor_id).filter(
+            TagClosure.descendant_id == tag_id
+        ).distinct().all()
+        return {tag_id} | {row.ancestor_id for row in rows}
+    
+    @staticmethod
+    def subtree_edges(tag_id, max_depth, direction='down'):
+        """用递归CTE查询从标签出发 max_depth 层以内的全部关系
+
+        direction 为 down 时沿子标签方向，up 时沿父标签方向；返回 [(源标签ID, 下一层标签ID)]。
+        DAG 中同一标签可能经多条路径到达，递归部分使用 UNION 去重以避免路径数爆炸。
+        """
+        if direction == 'up':
+            source, target = TagRelation.child_tag_id, TagRelation.parent_tag_id
+        else:
+            source, target = TagRelation.parent_tag_id, TagRelation.child_tag_id
         
-        # 检查是否会形成循环：从child_tag开始，看能否到达parent_tag
-        visited = set()
+        tree = select(
+            source.label('source_id'),
+            target.label('target_id'),
+            literal(1).label('depth')
+        ).where(source == tag_id).cte('tag_subtree', recursive=True)
         
-        def has_path(start_id, target_id):
-            if start_id == target_id:
-                return True
-            if start_id in visited:
-                return False
-            visited.add(start_id)
-            
-            # 查找从start_id出发的所有子标签
-            relations = TagRelation.query.filter_by(
-                user_id=user_id, 
-                parent_tag_id=start_id
-            ).all()
-            
-            for relation in relations:
-                if has_path(relation.child_tag_id, target_id):
-                    return True
-            return False
+        tree = tree.union(
+            select(source, target, tree.c.depth + 1).join(
+                tree, source == tree.c.target_id
+            ).where(tree.c.depth < max_depth)
+        )
+        
+        rows = db.session.execute(
+            select(tree.c.source_id, tree.c.target_id).distinct()
+        ).all()
+        return [(row.source_id, row.target_id) for row in rows]
+    
+    @staticmethod
+    def validate_dag(user_id, parent_tag_id, child_tag_id, graph=None):
+        """验证添加关系后是否仍为有向无环图
+
+        传入已缓存的标签图时在内存中广度优先搜索，否则查询闭包表；
+        写入关系时应使用闭包表，缓存图可能落后于其他进程的提交。
+        """
+        if parent_tag_id == child_tag_id:
+            return False, "标签不能关联自己"
         
-        if has_path(child_tag_id, parent_tag_id):
+        # 子标签已是父标签的祖先时，添加此关系会形成循环
+        if graph is not None:
+            has_path = graph.has_path(child_tag_id, parent_tag_id)
+        else:
+            has_path = db.session.query(
+                TagClosure.query.filter_by(
+                    ancestor_id=child_tag_id,
+                    descendant_id=parent_tag_id
+                ).exists()
+            ).scalar()
+        if has_path:
             return False, "添加此关系会形成循环"
         
         return True, "关系有效"
+    
+    @staticmethod
+    def detach_tag(tag_id):
+        """删除标签的全部父子关系，并同步闭包表"""
+        relations = TagRelation.query.filter(
+            or_(
+                TagRelation.parent_tag_id == tag_id,
+                TagRelation.child_tag_id == tag_id
+            )
+        ).all()
+        for relation in relations:
+            TagClosure.unlink(relation.user_id, relation.parent_tag_id, relation.child_tag_id)
+            db.session.delete(relation)
+
+class TagClosure(db.Model):
+    """标签闭包表：记录每对 (祖先, 后代, 距离) 之间的路径条数
 
+    DAG 中两个标签之间可能有多条路径，按路径计数增量维护，删除关系时只需减去
+    经过该关系的路径数，无需重新遍历整张图。不包含 depth 为 0 的自身记录。
+    """
+    __tablename__ = 'tag_closure'
+    
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('tags.id'), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('tags.id'), primary_key=True)
+    depth = db.Column(db.Integer, primary_key=True)
+    path_count = db.Column(db.Integer, nullable=False, default=1)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    # 索引
+    __table_args__ = (
+        db.Index('idx_tag_closure_descendant', 'descendant_id', 'ancestor_id'),
+        db.Index('idx_tag_closure_user_id', 'user_id'),
+    )
+    
+    def __repr__(self):
+        return f'<TagClosure {self.ancestor_id} -> {self.descendant_id} ({self.depth})>'
+    
+    @staticmethod
+    def _path_deltas(parent_tag_id, child_tag_id):
+        """计算关系 parent -> child 带来的 (祖先, 后代, 距离) 路径数"""
+        ancestors = [(parent_tag_id, 0, 1)] + db.session.query(
+            TagClosure.ancestor_id, TagClosure.depth, TagClosure.path_count
+        ).filter(TagClosure.descendant_id == parent_tag_id).all()
+        descendants = [(child_tag_id, 0, 1)] + db.session.query(
+            TagClosure.descendant_id, TagClosure.depth, TagClosure.path_count
+        ).filter(TagClosure.ancestor_id == child_tag_id).all()
+        
+        deltas = {}
+        for ancestor_id, up_depth, up_count in ancestors:
+            for descendant_id, down_depth, down_count in descendants:
+                key = (ancestor_id, descendant_id, up_depth + 1 + down_depth)
+                deltas[key] = deltas.get(key, 0) + up_count * down_count
+        return deltas, {a for a, _, _ in ancestors}, {d for d, _, _ in descendants}
+    
+    @staticmethod
+    def _apply(user_id, parent_tag_id, child_tag_id, sign):
+        deltas, ancestor_ids, descendant_ids = TagClosure._path_deltas(parent_tag_id, child_tag_id)
+        existing = {
+            (row.ancestor_id, row.descendant_id, row.depth): row
+            for row in TagClosure.query.filter(
+                TagClosure.ancestor_id.in_(ancestor_ids),
+                TagClosure.descendant_id.in_(descendant_ids)
+            ).all()
+        }
+        
+        for key, count in deltas.items():
+            row = existing.get(key)
+            if row is None:
+                if sign > 0:
+                    ancestor_id, descendant_id, depth = key
+                    db.session.add(TagClosure(
+                        ancestor_id=ancestor_id,
+                        descendant_id=descendant_id,
+                        depth=depth,
+                        path_count=count,
+                        user_id=user_id
+                    ))
+                continue
+            row.path_count += sign * count
+            if row.path_count <= 0:
+                db.session.delete(row)
+    
+    @staticmethod
+    def link(user_id, parent_tag_id, child_tag_id):
+        """新增关系 parent -> child 后更新闭包表（调用前应已通过 validate_dag 校验）"""
+        TagClosure._apply(user_id, parent_tag_id, child_tag_id, 1)
+    
+    @staticmethod
+    def unlink(user_id, parent_tag_id, child_tag_id):
+        """删除关系 parent -> child 后更新闭包表"""
+        TagClosure._apply(user_id, parent_tag_id, child_tag_id, -1)
+    
+    @staticmethod
+    def rebuild(user_id=None):
+        """根据 tag_relations 重建闭包表，返回写入的记录数"""
+        relation_query = TagRelation.query
+        closure_query = TagClosure.query
+        if user_id is not None:
+            relation_query = relation_query.filter_by(user_id=user_id)
+            closure_query = closure_query.filter_by(user_id=user_id)
+        closure_query.delete(synchronize_session=False)
+        
+        children = {}
+        owners = {}
+        for relation in relation_query.all():
+            children.setdefault(relation.parent_tag_id, []).append(relation.child_tag_id)
+            owners[relation.parent_tag_id] = relation.user_id
+        
+        # 按逆拓扑序（后序遍历）计算每个标签的后代路径数：{(后代, 距离): 路径数}
+        paths = {}
+        visiting = set()
+        for root in list(children):
+            stack = [(root, False)]
+            while stack:
+                tag_id, expanded = stack.pop()
+                if tag_id in paths:
+                    continue
+                if not expanded:
+                    # 历史数据中若存在环，忽略回到祖先的那条边
+                    if tag_id in visiting:
+                        continue
+                    visiting.add(tag_id)
+                    stack.append((tag_id, True))
+                    stack.extend((child_id, False) for child_id in children.get(tag_id, []) if child_id not in paths)
+                    continue
+                counts = {}
+                for child_id in children.get(tag_id, []):
+                    counts[(child_id, 1)] = counts.get((child_id, 1), 0) + 1
+                    for (descendant_id, depth), count in paths.get(child_id, {}).items():
+                        key = (descendant_id, depth + 1)
+                        counts[key] = counts.get(key, 0) + count
+                paths[tag_id] = counts
+        
+        rows = [
+            {
+                'ancestor_id': ancestor_id,
+                'descendant_id': descendant_id,
+                'depth': depth,
+                'path_count': count,
+                'user_id': owners[ancestor_id]
+            }
+            for ancestor_id, counts in paths.items() if ancestor_id in owners
+            for (descendant_id, depth), count in counts.items()
+        ]
+        if rows:
+            db.session.execute(TagClosure.__table__.insert(), rows)
+        return len(rows)
@@ -1,5 +1,6 @@
 from src.models.user import db
 from datetime import datetime
+from src.utils.fieldsets import DEFAULT_FIELDSET
 
 class Upload(db.Model):
     __tablename__ = 'uploads'
@@ -17,14 +18,15 @@ class Upload(db.Model):
     __table_args__ = (
         db.Index('idx_uploads_user_id', 'user_id'),
         db.Index('idx_uploads_created_at', 'created_at'),
+        db.Index('idx_uploads_user_created', 'user_id', 'created_at', 'id'),
     )
     
     def __repr__(self):
         return f'<Upload {self.filename}>'
     
-    def to_dict(self):
+    def to_dict(self, fieldset=DEFAULT_FIELDSET):
         """转换为字典格式"""
-        return {
+        data = {
             'id': self.id,
             'user_id': self.user_id,
             'filename': self.filename,
@@ -33,7 +35,9 @@ class Upload(db.Model):
             'url': f'/uploads/{self.filename}',
             'file_size': self.file_size,
             'mime_type': self.mime_type,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'uploader': self.uploader.to_dict() if self.uploader else None
+            'created_at': self.created_at
         }
+        if fieldset.expands('uploader'):
+            data['uploader'] = self.uploader.to_dict(fieldset=fieldset.nested('uploader')) if self.uploader else None
+        return fieldset.apply(data)
 
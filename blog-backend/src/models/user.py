@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from src.utils.fieldsets import DEFAULT_FIELDSET
 import bcrypt
 
 db = SQLAlchemy()
@@ -38,7 +39,7 @@ class User(db.Model):
         """验证密码"""
         return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
 
-    def to_dict(self, include_sensitive=False):
+    def to_dict(self, include_sensitive=False, fieldset=DEFAULT_FIELDSET):
         """转换为字典格式"""
         data = {
             'id': self.id,
@@ -47,10 +48,10 @@ class User(db.Model):
             'display_name': self.display_name,
             'avatar_url': self.avatar_url,
             'bio': self.bio,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
             'is_active': self.is_active,
             'is_admin': self.is_admin
         }
-        return {k: v for k, v in data.items() if v is not None or include_sensitive}
+        return fieldset.apply({k: v for k, v in data.items() if v is not None or include_sensitive})
 
@@ -1,11 +1,20 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
-from src.models import db, User, Tag, Article
+from src.models import db, User, Tag, TagRelation, Article
+from src.utils.search_index import index_article, remove_article
+from src.utils.view_counter import view_counter
+from src.utils.tag_graph_cache import tag_graph_cache
+from src.utils.fieldsets import FieldSet
+from src.utils.tag_listing import list_user_tags, query_tags
+from src.utils.tag_pages import find_tag_article
 from functools import wraps
 import json
 
 admin_bp = Blueprint('admin', __name__)
 
+# 标签列表游标分页的默认每页数量
+ADMIN_TAG_PAGE_SIZE = 50
+
 def admin_required(f):
     """管理员权限装饰器"""
     @wraps(f)
@@ -157,25 +166,37 @@ def admin_login():
 def get_admin_tags():
     """获取所有标签（管理员）"""
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         
         # 查询参数
         search = request.args.get('search', '').strip()
-        
-        # 构建查询 - 管理员可以看到自己创建的标签
-        query = Tag.query.filter_by(user_id=user_id)
-        
-        # 搜索筛选
-        if search:
-            query = query.filter(Tag.name.contains(search))
-        
-        # 排序
-        query = query.order_by(Tag.name)
-        tags = query.all()
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', ADMIN_TAG_PAGE_SIZE, type=int)
+        with_total = request.args.get('with_total', 'false').lower() == 'true'
+        fieldset = FieldSet.from_request(request.args)
+        
+        # 管理员可以看到自己创建的标签：无搜索时读取缓存的有序标签列表，传入 cursor 时分页
+        try:
+            if search:
+                tags_data, pagination_data = query_tags(
+                    fieldset, cursor, limit, with_total,
+                    user_id=user_id, search=search, search_description=False
+                )
+            else:
+                tags_data, pagination_data = list_user_tags(user_id, fieldset, cursor, limit, with_total)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'code': 400
+            }), 400
         
         return jsonify({
             'success': True,
-            'data': [tag.to_dict() for tag in tags],
+            'data': tags_data if pagination_data is None else {
+                'tags': tags_data,
+                'pagination': pagination_data
+            },
             'message': '获取标签列表成功',
             'code': 200
         }), 200
@@ -192,7 +213,7 @@ def get_admin_tags():
 def create_admin_tag():
     """创建标签文章（管理员）"""
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         data = request.get_json()
         
         # 验证必填字段
@@ -267,6 +288,10 @@ def create_admin_tag():
         
         # 关联标签和文章
         article.tags = [tag]
+        tag.article = article
+        
+        # 建立全文索引
+        index_article(article)
         
         db.session.commit()
         
@@ -290,11 +315,10 @@ def create_admin_tag():
 
 @admin_bp.route('/tags/<int:tag_id>', methods=['PUT'])
 @admin_required
-def update_admin_tag():
+def update_admin_tag(tag_id):
     """更新标签文章（管理员）"""
     try:
-        user_id = get_jwt_identity()
-        tag_id = request.view_args['tag_id']
+        user_id = int(get_jwt_identity())
         tag = Tag.query.get(tag_id)
         
         if not tag:
@@ -331,13 +355,11 @@ def update_admin_tag():
         if 'color' in data:
             tag.color = data['color']
         
-        # 查找对应的标签文章
-        tag_article = Article.query.filter_by(
-            user_id=user_id,
-            is_tag_article=True
-        ).filter(Article.tags.any(Tag.id == tag_id)).first()
+        # 查找对应的标签文章，旧数据顺带补上 article_id
+        tag_article = find_tag_article(tag)
         
         if tag_article:
+            tag.article = tag_article
             # 更新文章标题和内容
             if 'name' in data:
                 tag_article.title = data['name']
@@ -353,6 +375,9 @@ def update_admin_tag():
                         tag_article.set_content({'type': 'doc', 'content': [{'type': 'paragraph', 'content': [{'type': 'text', 'text': content}]}]})
                 elif isinstance(content, dict):
                     tag_article.set_content(content)
+            
+            # 更新全文索引
+            index_article(tag_article)
         
         db.session.commit()
         
@@ -379,7 +404,7 @@ def update_admin_tag():
 def delete_admin_tag(tag_id):
     """删除标签文章（管理员）"""
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         tag = Tag.query.get(tag_id)
         
         if not tag:
@@ -397,15 +422,14 @@ def delete_admin_tag(tag_id):
             }), 403
         
         # 查找并删除对应的标签文章
-        tag_article = Article.query.filter_by(
-            user_id=user_id,
-            is_tag_article=True
-        ).filter(Article.tags.any(Tag.id == tag_id)).first()
+        tag_article = find_tag_article(tag)
         
         if tag_article:
+            remove_article(tag_article.id)
             db.session.delete(tag_article)
         
-        # 删除标签
+        # 删除标签及其父子关系（同步闭包表）
+        TagRelation.detach_tag(tag_id)
         db.session.delete(tag)
         db.session.commit()
         
@@ -423,3 +447,24 @@ def delete_admin_tag(tag_id):
             'code': 500
         }), 500
 
+@admin_bp.route('/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    """获取运行时指标（管理员）"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': {
+                'view_counter': view_counter.metrics(),
+                'tag_graph_cache': tag_graph_cache.metrics()
+            },
+            'message': '获取运行时指标成功',
+            'code': 200
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'获取运行时指标失败：{str(e)}',
+            'code': 500
+        }), 500
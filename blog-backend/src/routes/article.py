@@ -1,11 +1,43 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from src.models import db, Article, User, Tag
-from sqlalchemy import or_, and_
+from src.models import db, Article, User, Tag, TagRelation, article_tags
+from sqlalchemy import and_, select
+from src.utils.pagination import keyset_paginate
+from src.utils.view_counter import view_counter
+from src.utils.http_cache import make_etag, embedded_objects, apply_cache_headers, not_modified_response
+from src.utils.fieldsets import FieldSet
+from src.utils.raw_json import jsonify_raw
+from src.utils.json_provider import dumps_text, loads_text
+from sqlalchemy.orm import Session
+from datetime import datetime
+from collections import defaultdict
+from src.utils.tiptap import render_html
+from src.utils.search_index import index_article, remove_article, search_articles
 import json
+import math
 
 article_bp = Blueprint('article', __name__)
 
+# NDJSON 导出时每批读取的文章数、导入时每个事务写入的文章数
+EXPORT_BATCH_SIZE = 200
+IMPORT_BATCH_SIZE = 100
+
+def parse_article_content(content):
+    """将请求中的文章内容统一转换为 TipTap JSON 字典"""
+    if isinstance(content, str):
+        try:
+            # 如果是JSON字符串，尝试解析
+            return loads_text(content)
+        except json.JSONDecodeError:
+            # 如果不是JSON，直接作为文本内容
+            return {'type': 'doc', 'content': [{'type': 'paragraph', 'content': [{'type': 'text', 'text': content}]}]}
+    elif isinstance(content, dict):
+        # 如果已经是字典，直接设置
+        return content
+    else:
+        # 其他情况，创建默认结构
+        return {'type': 'doc', 'content': []}
+
 @article_bp.route('', methods=['GET'])
 def get_articles():
     """获取文章列表"""
@@ -17,9 +49,13 @@ def get_articles():
         tag_id = request.args.get('tag_id', type=int)
         search = request.args.get('search', '').strip()
         user_id = request.args.get('user_id', type=int)
+        include_descendants = request.args.get('include_descendants', 'false').lower() == 'true'
+        cursor = request.args.get('cursor')
+        with_total = request.args.get('with_total', 'false').lower() == 'true'
         
-        # 构建查询
-        query = Article.query
+        # 构建查询（整页批量加载作者和标签，避免逐条懒加载）
+        fieldset = FieldSet.from_request(request.args)
+        query = Article.query.options(*Article.list_loader_options(fieldset))
         
         # 状态筛选
         if status:
@@ -30,36 +66,68 @@ def get_articles():
             query = query.filter(Article.user_id == user_id)
         
         # 标签筛选
-        if tag_id:
+        if tag_id and include_descendants:
+            # 包含后代标签：展开为标签集合后通过 article_tags 的 (tag_id, article_id) 索引做半连接
+            tag_ids = TagRelation.descendant_ids(tag_id)
+            query = query.filter(Article.id.in_(
+                select(article_tags.c.article_id).where(article_tags.c.tag_id.in_(tag_ids))
+            ))
+        elif tag_id:
             query = query.filter(Article.tags.any(Tag.id == tag_id))
         
-        # 搜索筛选
+        # 排序和分页
         if search:
-            query = query.filter(
-                or_(
-                    Article.title.contains(search),
-                    Article.excerpt.contains(search)
+            # 全文检索：通过倒排索引查找，按BM25相关度排序后分页
+            ranked = search_articles(search, query.with_entities(Article.id))
+            total = len(ranked)
+            page_ids = [article_id for article_id, _ in ranked[(page - 1) * limit:page * limit]]
+            found = {article.id: article for article in query.filter(Article.id.in_(page_ids))} if page_ids else {}
+            items = [found[article_id] for article_id in page_ids if article_id in found]
+            pages = math.ceil(total / limit) if limit > 0 else 0
+            pagination_data = {
+                'page': page,
+                'limit': limit,
+                'total': total,
+                'pages': pages,
+                'has_next': page < pages,
+                'has_prev': page > 1
+            }
+        elif cursor is not None:
+            # 游标分页：按 (published_at, created_at, id) 直接定位，总数仅在请求时统计
+            try:
+                items, pagination_data = keyset_paginate(
+                    query,
+                    [Article.published_at, Article.created_at, Article.id],
+                    cursor,
+                    limit,
+                    with_total=with_total
                 )
-            )
-        
-        # 排序和分页
-        query = query.order_by(Article.published_at.desc(), Article.created_at.desc())
-        pagination = query.paginate(page=page, per_page=limit, error_out=False)
-        
-        articles = [article.to_dict(include_content=False) for article in pagination.items]
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'code': 400
+                }), 400
+        else:
+            query = query.order_by(Article.published_at.desc(), Article.created_at.desc())
+            pagination = query.paginate(page=page, per_page=limit, error_out=False)
+            items = pagination.items
+            pagination_data = {
+                'page': page,
+                'limit': limit,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            }
+        
+        articles = [article.to_dict(include_content=False, fieldset=fieldset) for article in items]
         
         return jsonify({
             'success': True,
             'data': {
                 'articles': articles,
-                'pagination': {
-                    'page': page,
-                    'limit': limit,
-                    'total': pagination.total,
-                    'pages': pagination.pages,
-                    'has_next': pagination.has_next,
-                    'has_prev': pagination.has_prev
-                }
+                'pagination': pagination_data
             },
             'message': '获取文章列表成功',
             'code': 200
@@ -76,7 +144,9 @@ def get_articles():
 def get_article(article_id):
     """获取文章详情"""
     try:
-        article = Article.query.get(article_id)
+        # 大字段延迟加载（命中 304 时无需读取内容），字段集需要展开的作者和标签随之加载，用于计算 ETag
+        fieldset = FieldSet.from_request(request.args)
+        article = Article.query.options(*Article.list_loader_options(fieldset)).get(article_id)
         
         if not article:
             return jsonify({
@@ -104,17 +174,36 @@ def get_article(article_id):
                 'code': 403
             }), 403
         
-        # 增加浏览量（非作者访问时）
+        # 增加浏览量（非作者访问时），先写入内存缓冲，定时批量落库
         if current_user_id != article.user_id:
-            article.view_count += 1
-            db.session.commit()
+            view_counter.increment('article', article.id)
+        
+        # 内容未变化时直接返回 304，跳过序列化
+        response_format = request.args.get('format')
+        is_public = article.status == 'published'
+        variant = ':'.join(part for part in (response_format, fieldset.cache_key()) if part)
+        etag = make_etag('article', article.id, article.updated_at, variant, embedded_objects(article, fieldset))
+        cached = not_modified_response(etag, is_public)
+        if cached is not None:
+            return cached
+        
+        # format=html 时只返回服务端渲染的HTML，不返回 TipTap JSON
+        if response_format == 'html':
+            data = article.to_dict(include_content=False, fieldset=fieldset)
+            data['content_html'] = article.content_html if article.content_html is not None else render_html(article.get_content())
+        else:
+            # 内容以存储的JSON文本直接拼接进响应，不解析再序列化
+            data = article.to_dict(fieldset=fieldset, raw_content=True)
+        if 'view_count' in data:
+            data['view_count'] = (article.view_count or 0) + view_counter.pending('article', article.id)
         
-        return jsonify({
+        response = jsonify_raw({
             'success': True,
-            'data': article.to_dict(),
+            'data': data,
             'message': '获取文章成功',
             'code': 200
-        }), 200
+        })
+        return apply_cache_headers(response, etag, is_public), 200
         
     except Exception as e:
         return jsonify({
@@ -158,21 +247,7 @@ def create_article():
         )
         
         # 处理内容
-        content = data['content']
-        if isinstance(content, str):
-            try:
-                # 如果是JSON字符串，尝试解析
-                content_dict = json.loads(content)
-                article.set_content(content_dict)
-            except json.JSONDecodeError:
-                # 如果不是JSON，直接作为文本内容
-                article.set_content({'type': 'doc', 'content': [{'type': 'paragraph', 'content': [{'type': 'text', 'text': content}]}]})
-        elif isinstance(content, dict):
-            # 如果已经是字典，直接设置
-            article.set_content(content)
-        else:
-            # 其他情况，创建默认结构
-            article.set_content({'type': 'doc', 'content': []})
+        article.set_content(parse_article_content(data['content']))
         
         # 如果是发布状态，设置发布时间
         if article.status == 'published':
@@ -189,6 +264,9 @@ def create_article():
             ).all()
             article.tags = tags
         
+        # 建立全文索引
+        index_article(article)
+        
         db.session.commit()
         
         return jsonify({
@@ -234,23 +312,12 @@ def update_article(article_id):
         if 'title' in data:
             article.title = data['title']
         if 'content' in data:
-            content = data['content']
-            if isinstance(content, str):
-                try:
-                    # 如果是JSON字符串，尝试解析
-                    content_dict = json.loads(content)
-                    article.set_content(content_dict)
-                except json.JSONDecodeError:
-                    # 如果不是JSON，直接作为文本内容
-                    article.set_content({'type': 'doc', 'content': [{'type': 'paragraph', 'content': [{'type': 'text', 'text': content}]}]})
-            elif isinstance(content, dict):
-                # 如果已经是字典，直接设置
-                article.set_content(content)
-            else:
-                # 其他情况，创建默认结构
-                article.set_content({'type': 'doc', 'content': []})
+            article.set_content(parse_article_content(data['content']))
         if 'excerpt' in data:
             article.excerpt = data['excerpt']
+            # 清空摘要时根据正文自动生成
+            if not article.excerpt:
+                article.refresh_content_stats()
         if 'status' in data:
             old_status = article.status
             article.status = data['status']
@@ -271,6 +338,12 @@ def update_article(article_id):
                 and_(Tag.id.in_(tag_ids), Tag.user_id == user_id)
             ).all() if tag_ids else []
             article.tags = tags
+            # 仅修改标签时也刷新更新时间，使 ETag 失效
+            article.updated_at = datetime.utcnow()
+        
+        # 标题、摘要或正文变化时更新全文索引
+        if 'title' in data or 'content' in data or 'excerpt' in data:
+            index_article(article)
         
         db.session.commit()
         
@@ -311,6 +384,7 @@ def delete_article(article_id):
                 'code': 403
             }), 403
         
+        remove_article(article.id)
         db.session.delete(article)
         db.session.commit()
         
@@ -368,3 +442,174 @@ def publish_article(article_id):
             'code': 500
         }), 500
 
+def _export_record(article, tag_ids):
+    """导出单篇文章：包含内容和标签ID"""
+    return {
+        'id': article.id,
+        'title': article.title,
+        'excerpt': article.excerpt,
+        'status': article.status,
+        'is_tag_article': article.is_tag_article,
+        'roadmap_id': article.roadmap_id,
+        'mindmap_id': article.mindmap_id,
+        'created_at': article.created_at,
+        'updated_at': article.updated_at,
+        'published_at': article.published_at,
+        'content': article.get_content(),
+        'tags': tag_ids
+    }
+
+@article_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_articles():
+    """以NDJSON流式导出当前用户的全部文章"""
+    user_id = int(get_jwt_identity())
+    
+    def generate():
+        # 文章通过独立连接的服务端游标分批读取，标签查询走默认会话，互不阻塞；
+        # 会话的标识映射为弱引用，已输出的批次不会在内存中累积
+        with db.engine.connect() as conn:
+            stream_session = Session(bind=conn)
+            try:
+                result = stream_session.execute(
+                    select(Article)
+                    .where(Article.user_id == user_id)
+                    .order_by(Article.id)
+                    .execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+                )
+                for batch in result.scalars().partitions():
+                    tag_map = defaultdict(list)
+                    rows = db.session.execute(
+                        select(article_tags.c.article_id, article_tags.c.tag_id)
+                        .where(article_tags.c.article_id.in_([article.id for article in batch]))
+                    ).all()
+                    for article_id, tag_id in rows:
+                        tag_map[article_id].append(tag_id)
+                    
+                    for article in batch:
+                        record = _export_record(article, tag_map.get(article.id, []))
+                        yield dumps_text(record) + '\n'
+            finally:
+                stream_session.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=articles.ndjson'}
+    )
+
+def _parse_datetime(value):
+    """解析导入数据中的ISO时间，无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def _import_batch(user_id, records):
+    """在一个事务中写入一批文章，返回写入数量"""
+    tag_ids = {tag_id for _, record in records for tag_id in (record.get('tags') or [])}
+    tags = {
+        tag.id: tag for tag in Tag.query.filter(
+            and_(Tag.id.in_(tag_ids), Tag.user_id == user_id)
+        ).all()
+    } if tag_ids else {}
+    
+    articles = []
+    for _, record in records:
+        status = record.get('status') or 'draft'
+        article = Article(
+            user_id=user_id,
+            title=record['title'],
+            excerpt=record.get('excerpt') or '',
+            status=status,
+            is_tag_article=bool(record.get('is_tag_article', False)),
+            created_at=_parse_datetime(record.get('created_at')) or datetime.utcnow(),
+            published_at=_parse_datetime(record.get('published_at'))
+        )
+        article.set_content(parse_article_content(record['content']))
+        if status == 'published' and article.published_at is None:
+            article.publish()
+        article.tags = [tags[tag_id] for tag_id in (record.get('tags') or []) if tag_id in tags]
+        db.session.add(article)
+        articles.append(article)
+    
+    db.session.flush()
+    for article in articles:
+        index_article(article)
+    db.session.commit()
+    return len(articles)
+
+@article_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_articles():
+    """从NDJSON请求体流式导入文章，按批提交并逐批报告错误"""
+    try:
+        user_id = int(get_jwt_identity())
+        batches = []
+        imported = 0
+        failed = 0
+        
+        def flush_batch(records, errors):
+            nonlocal imported, failed
+            if not records and not errors:
+                return
+            line_numbers = [line_number for line_number, _ in records] + [error['line'] for error in errors]
+            report = {
+                'batch': len(batches) + 1,
+                'first_line': min(line_numbers),
+                'last_line': max(line_numbers),
+                'imported': 0,
+                'errors': errors,
+                'error': None
+            }
+            if records:
+                try:
+                    report['imported'] = _import_batch(user_id, records)
+                except Exception as e:
+                    # 整批回滚，该批所有文章都计为失败
+                    db.session.rollback()
+                    report['error'] = f'批次写入失败：{str(e)}'
+            imported += report['imported']
+            failed += len(errors) + len(records) - report['imported']
+            batches.append(report)
+        
+        records = []
+        errors = []
+        for line_number, raw_line in enumerate(request.stream, start=1):
+            line = raw_line.strip()
+            if not line:
+                continue
+            try:
+                record = loads_text(line)
+                if not isinstance(record, dict) or not record.get('title') or not record.get('content'):
+                    raise ValueError('标题和内容不能为空')
+                records.append((line_number, record))
+            except ValueError as e:
+                errors.append({'line': line_number, 'error': str(e)})
+            
+            if len(records) + len(errors) >= IMPORT_BATCH_SIZE:
+                flush_batch(records, errors)
+                records, errors = [], []
+        
+        flush_batch(records, errors)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'imported': imported,
+                'failed': failed,
+                'batches': batches
+            },
+            'message': '导入文章完成',
+            'code': 200
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'导入文章失败：{str(e)}',
+            'code': 500
+        }), 500
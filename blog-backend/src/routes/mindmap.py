@@ -1,10 +1,23 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models import db, Mindmap, User, Tag
-from sqlalchemy import or_, and_
+from src.models import db, Mindmap, User, Tag, TagRelation, mindmap_tags
+from sqlalchemy import or_, and_, select
+from src.utils.pagination import keyset_paginate
+from src.utils.view_counter import view_counter
+from src.utils.http_cache import make_etag, embedded_objects, apply_cache_headers, not_modified_response
+from src.utils.fieldsets import FieldSet
+from src.utils.raw_json import jsonify_raw
+from src.utils.json_patch import apply_patch, JsonPatchError, JsonPatchTestFailed
+from src.utils.mindmap_nodes import load_subtree, truncate_content
+from sqlalchemy.orm import defer
+from datetime import datetime
 
 mindmap_bp = Blueprint('mindmap', __name__)
 
+# 按需加载子树的默认层数与最大层数
+NODES_DEFAULT_DEPTH = 2
+NODES_MAX_DEPTH = 10
+
 @mindmap_bp.route('', methods=['GET'])
 def get_mindmaps():
     """获取思维导图列表"""
@@ -16,9 +29,13 @@ def get_mindmaps():
         tag_id = request.args.get('tag_id', type=int)
         search = request.args.get('search', '').strip()
         user_id = request.args.get('user_id', type=int)
+        include_descendants = request.args.get('include_descendants', 'false').lower() == 'true'
+        cursor = request.args.get('cursor')
+        with_total = request.args.get('with_total', 'false').lower() == 'true'
         
-        # 构建查询
-        query = Mindmap.query
+        # 构建查询（整页批量加载作者和标签，避免逐条懒加载）
+        fieldset = FieldSet.from_request(request.args)
+        query = Mindmap.query.options(*Mindmap.list_loader_options(fieldset))
         
         # 状态筛选
         if status:
@@ -29,7 +46,13 @@ def get_mindmaps():
             query = query.filter(Mindmap.user_id == user_id)
         
         # 标签筛选
-        if tag_id:
+        if tag_id and include_descendants:
+            # 包含后代标签：展开为标签集合后通过 mindmap_tags 的 (tag_id, mindmap_id) 索引做半连接
+            tag_ids = TagRelation.descendant_ids(tag_id)
+            query = query.filter(Mindmap.id.in_(
+                select(mindmap_tags.c.mindmap_id).where(mindmap_tags.c.tag_id.in_(tag_ids))
+            ))
+        elif tag_id:
             query = query.filter(Mindmap.tags.any(Tag.id == tag_id))
         
         # 搜索筛选
@@ -42,23 +65,42 @@ def get_mindmaps():
             )
         
         # 排序和分页
-        query = query.order_by(Mindmap.published_at.desc(), Mindmap.created_at.desc())
-        pagination = query.paginate(page=page, per_page=limit, error_out=False)
-        
-        mindmaps = [mindmap.to_dict(include_content=False) for mindmap in pagination.items]
+        if cursor is not None:
+            # 游标分页：按 (published_at, created_at, id) 直接定位，总数仅在请求时统计
+            try:
+                items, pagination_data = keyset_paginate(
+                    query,
+                    [Mindmap.published_at, Mindmap.created_at, Mindmap.id],
+                    cursor,
+                    limit,
+                    with_total=with_total
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'code': 400
+                }), 400
+        else:
+            query = query.order_by(Mindmap.published_at.desc(), Mindmap.created_at.desc())
+            pagination = query.paginate(page=page, per_page=limit, error_out=False)
+            items = pagination.items
+            pagination_data = {
+                'page': page,
+                'limit': limit,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            }
+        
+        mindmaps = [mindmap.to_dict(include_content=False, fieldset=fieldset) for mindmap in items]
         
         return jsonify({
             'success': True,
             'data': {
                 'mindmaps': mindmaps,
-                'pagination': {
-                    'page': page,
-                    'limit': limit,
-                    'total': pagination.total,
-                    'pages': pagination.pages,
-                    'has_next': pagination.has_next,
-                    'has_prev': pagination.has_prev
-                }
+                'pagination': pagination_data
             },
             'message': '获取思维导图列表成功',
             'code': 200
@@ -76,7 +118,9 @@ def get_mindmaps():
 def get_mindmap(mindmap_id):
     """获取思维导图详情"""
     try:
-        mindmap = Mindmap.query.get(mindmap_id)
+        # 大字段延迟加载（命中 304 时无需读取内容），字段集需要展开的作者和标签随之加载，用于计算 ETag
+        fieldset = FieldSet.from_request(request.args)
+        mindmap = Mindmap.query.options(*Mindmap.list_loader_options(fieldset)).get(mindmap_id)
         
         if not mindmap:
             return jsonify({
@@ -99,17 +143,41 @@ def get_mindmap(mindmap_id):
                 'code': 403
             }), 403
         
-        # 增加浏览量（非作者访问时）
+        # 增加浏览量（非作者访问时），先写入内存缓冲，定时批量落库
         if current_user_id != mindmap.user_id:
-            mindmap.view_count += 1
-            db.session.commit()
+            view_counter.increment('mindmap', mindmap.id)
         
-        return jsonify({
+        # depth 指定时只返回根节点以下若干层，其余子树通过 /nodes 按需加载
+        depth = request.args.get('depth', type=int)
+        if depth is not None and depth < 0:
+            return jsonify({
+                'success': False,
+                'error': 'depth 不能为负数',
+                'code': 400
+            }), 400
+        
+        # 内容未变化时直接返回 304，跳过序列化
+        is_public = mindmap.status == 'published'
+        variant = ':'.join(part for part in (fieldset.cache_key(), f'depth={depth}' if depth is not None else '') if part)
+        etag = make_etag('mindmap', mindmap.id, mindmap.updated_at, variant, embedded_objects(mindmap, fieldset))
+        cached = not_modified_response(etag, is_public)
+        if cached is not None:
+            return cached
+        
+        # 不截断时内容以存储的JSON文本直接拼接进响应，不解析再序列化
+        data = mindmap.to_dict(fieldset=fieldset, raw_content=depth is None)
+        if depth is not None and 'content' in data:
+            data['content'] = truncate_content(data['content'], depth)
+        if 'view_count' in data:
+            data['view_count'] = (mindmap.view_count or 0) + view_counter.pending('mindmap', mindmap.id)
+        
+        response = jsonify_raw({
             'success': True,
-            'data': mindmap.to_dict(),
+            'data': data,
             'message': '获取思维导图成功',
             'code': 200
-        }), 200
+        })
+        return apply_cache_headers(response, etag, is_public), 200
         
     except Exception as e:
         return jsonify({
@@ -118,6 +186,80 @@ def get_mindmap(mindmap_id):
             'code': 500
         }), 500
 
+@mindmap_bp.route('/<int:mindmap_id>/nodes', methods=['GET'])
+@jwt_required()
+def get_mindmap_nodes(mindmap_id):
+    """按需加载思维导图子树：从 root 节点（默认根节点）起向下 depth 层"""
+    try:
+        depth = request.args.get('depth', NODES_DEFAULT_DEPTH, type=int)
+        root_id = request.args.get('root') or None
+        
+        if depth < 0:
+            return jsonify({
+                'success': False,
+                'error': 'depth 不能为负数',
+                'code': 400
+            }), 400
+        depth = min(depth, NODES_MAX_DEPTH)
+        
+        # 节点表已同步时无需读取完整内容
+        mindmap = Mindmap.query.options(defer(Mindmap.content)).get(mindmap_id)
+        
+        if not mindmap:
+            return jsonify({
+                'success': False,
+                'error': '思维导图不存在',
+                'code': 404
+            }), 404
+        
+        # 只有已发布的思维导图或作者本人可以查看
+        current_user_id = None
+        try:
+            current_user_id = int(get_jwt_identity())
+        except:
+            pass
+        
+        if mindmap.status != 'published' and mindmap.user_id != current_user_id:
+            return jsonify({
+                'success': False,
+                'error': '无权访问此思维导图',
+                'code': 403
+            }), 403
+        
+        is_public = mindmap.status == 'published'
+        etag = make_etag('mindmap-nodes', mindmap.id, mindmap.updated_at, f'{root_id or ""}:{depth}')
+        cached = not_modified_response(etag, is_public)
+        if cached is not None:
+            return cached
+        
+        tree = load_subtree(mindmap, root_id, depth)
+        
+        if tree is None:
+            return jsonify({
+                'success': False,
+                'error': '节点不存在',
+                'code': 404
+            }), 404
+        
+        response = jsonify({
+            'success': True,
+            'data': {
+                'root': tree,
+                'depth': depth,
+                'version': mindmap.version or 0
+            },
+            'message': '获取思维导图节点成功',
+            'code': 200
+        })
+        return apply_cache_headers(response, etag, is_public), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'获取思维导图节点失败：{str(e)}',
+            'code': 500
+        }), 500
+
 @mindmap_bp.route('', methods=['POST'])
 @jwt_required()
 def create_mindmap():
@@ -228,6 +370,8 @@ def update_mindmap(mindmap_id):
                 and_(Tag.id.in_(tag_ids), Tag.user_id == user_id)
             ).all() if tag_ids else []
             mindmap.tags = tags
+            # 仅修改标签时也刷新更新时间，使 ETag 失效
+            mindmap.updated_at = datetime.utcnow()
         
         db.session.commit()
         
@@ -246,6 +390,99 @@ def update_mindmap(mindmap_id):
             'code': 500
         }), 500
 
+@mindmap_bp.route('/<int:mindmap_id>', methods=['PATCH'])
+@jwt_required()
+def patch_mindmap(mindmap_id):
+    """以 JSON Patch（RFC 6902）增量更新思维导图内容"""
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.get_json(silent=True) or {}
+        base_version = data.get('base_version')
+        patch = data.get('patch')
+        
+        if not isinstance(base_version, int) or isinstance(base_version, bool) or not isinstance(patch, list):
+            return jsonify({
+                'success': False,
+                'error': '请求体须包含整数 base_version 和操作数组 patch',
+                'code': 400
+            }), 400
+        
+        # 锁定该行，避免并发补丁在版本检查与写入之间交错
+        mindmap = Mindmap.query.with_for_update().filter_by(id=mindmap_id).first()
+        
+        if not mindmap:
+            return jsonify({
+                'success': False,
+                'error': '思维导图不存在',
+                'code': 404
+            }), 404
+        
+        if mindmap.user_id != user_id:
+            return jsonify({
+                'success': False,
+                'error': '无权修改此思维导图',
+                'code': 403
+            }), 403
+        
+        current_version = mindmap.version or 0
+        if base_version != current_version:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': '思维导图已被修改，请重新获取后再提交',
+                'data': {'version': current_version},
+                'code': 409
+            }), 409
+        
+        try:
+            content = apply_patch(mindmap.get_content(), patch)
+        except JsonPatchTestFailed as e:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'data': {'version': current_version},
+                'code': 409
+            }), 409
+        except JsonPatchError as e:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': f'补丁无效：{str(e)}',
+                'code': 400
+            }), 400
+        
+        if not isinstance(content, dict):
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': '补丁无效：思维导图内容必须为对象',
+                'code': 400
+            }), 400
+        
+        mindmap.set_content(content)
+        db.session.commit()
+        
+        # 只返回新版本信息，响应大小与文档大小无关
+        return jsonify({
+            'success': True,
+            'data': {
+                'id': mindmap.id,
+                'version': mindmap.version,
+                'updated_at': mindmap.updated_at
+            },
+            'message': '更新思维导图成功',
+            'code': 200
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'更新思维导图失败：{str(e)}',
+            'code': 500
+        }), 500
+
 @mindmap_bp.route('/<int:mindmap_id>', methods=['DELETE'])
 @jwt_required()
 def delete_mindmap(mindmap_id):
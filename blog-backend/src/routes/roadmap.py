@@ -1,7 +1,14 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models import db, Roadmap, User, Tag
-from sqlalchemy import or_, and_
+from src.models import db, Roadmap, User, Tag, TagRelation, roadmap_tags
+from sqlalchemy import or_, and_, select
+from src.utils.pagination import keyset_paginate
+from src.utils.view_counter import view_counter
+from src.utils.http_cache import make_etag, embedded_objects, apply_cache_headers, not_modified_response
+from src.utils.fieldsets import FieldSet
+from src.utils.raw_json import jsonify_raw
+from src.utils.json_patch import apply_patch, JsonPatchError, JsonPatchTestFailed
+from datetime import datetime
 
 roadmap_bp = Blueprint('roadmap', __name__)
 
@@ -16,9 +23,13 @@ def get_roadmaps():
         tag_id = request.args.get('tag_id', type=int)
         search = request.args.get('search', '').strip()
         user_id = request.args.get('user_id', type=int)
+        include_descendants = request.args.get('include_descendants', 'false').lower() == 'true'
+        cursor = request.args.get('cursor')
+        with_total = request.args.get('with_total', 'false').lower() == 'true'
         
-        # 构建查询
-        query = Roadmap.query
+        # 构建查询（整页批量加载作者和标签，避免逐条懒加载）
+        fieldset = FieldSet.from_request(request.args)
+        query = Roadmap.query.options(*Roadmap.list_loader_options(fieldset))
         
         # 状态筛选
         if status:
@@ -29,7 +40,13 @@ def get_roadmaps():
             query = query.filter(Roadmap.user_id == user_id)
         
         # 标签筛选
-        if tag_id:
+        if tag_id and include_descendants:
+            # 包含后代标签：展开为标签集合后通过 roadmap_tags 的 (tag_id, roadmap_id) 索引做半连接
+            tag_ids = TagRelation.descendant_ids(tag_id)
+            query = query.filter(Roadmap.id.in_(
+                select(roadmap_tags.c.roadmap_id).where(roadmap_tags.c.tag_id.in_(tag_ids))
+            ))
+        elif tag_id:
             query = query.filter(Roadmap.tags.any(Tag.id == tag_id))
         
         # 搜索筛选
@@ -42,23 +59,42 @@ def get_roadmaps():
             )
         
         # 排序和分页
-        query = query.order_by(Roadmap.published_at.desc(), Roadmap.created_at.desc())
-        pagination = query.paginate(page=page, per_page=limit, error_out=False)
-        
-        roadmaps = [roadmap.to_dict(include_content=False) for roadmap in pagination.items]
+        if cursor is not None:
+            # 游标分页：按 (published_at, created_at, id) 直接定位，总数仅在请求时统计
+            try:
+                items, pagination_data = keyset_paginate(
+                    query,
+                    [Roadmap.published_at, Roadmap.created_at, Roadmap.id],
+                    cursor,
+                    limit,
+                    with_total=with_total
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'code': 400
+                }), 400
+        else:
+            query = query.order_by(Roadmap.published_at.desc(), Roadmap.created_at.desc())
+            pagination = query.paginate(page=page, per_page=limit, error_out=False)
+            items = pagination.items
+            pagination_data = {
+                'page': page,
+                'limit': limit,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            }
+        
+        roadmaps = [roadmap.to_dict(include_content=False, fieldset=fieldset) for roadmap in items]
         
         return jsonify({
             'success': True,
             'data': {
                 'roadmaps': roadmaps,
-                'pagination': {
-                    'page': page,
-                    'limit': limit,
-                    'total': pagination.total,
-                    'pages': pagination.pages,
-                    'has_next': pagination.has_next,
-                    'has_prev': pagination.has_prev
-                }
+                'pagination': pagination_data
             },
             'message': '获取路线图列表成功',
             'code': 200
@@ -76,7 +112,9 @@ def get_roadmaps():
 def get_roadmap(roadmap_id):
     """获取路线图详情"""
     try:
-        roadmap = Roadmap.query.get(roadmap_id)
+        # 大字段延迟加载（命中 304 时无需读取内容），字段集需要展开的作者和标签随之加载，用于计算 ETag
+        fieldset = FieldSet.from_request(request.args)
+        roadmap = Roadmap.query.options(*Roadmap.list_loader_options(fieldset)).get(roadmap_id)
         
         if not roadmap:
             return jsonify({
@@ -100,17 +138,29 @@ def get_roadmap(roadmap_id):
                 'code': 403
             }), 403
         
-        # 增加浏览量（非作者访问时）
+        # 增加浏览量（非作者访问时），先写入内存缓冲，定时批量落库
         if current_user_id != roadmap.user_id:
-            roadmap.view_count += 1
-            db.session.commit()
+            view_counter.increment('roadmap', roadmap.id)
         
-        return jsonify({
+        # 内容未变化时直接返回 304，跳过序列化
+        is_public = roadmap.status == 'published'
+        etag = make_etag('roadmap', roadmap.id, roadmap.updated_at, fieldset.cache_key(), embedded_objects(roadmap, fieldset))
+        cached = not_modified_response(etag, is_public)
+        if cached is not None:
+            return cached
+        
+        # 内容以存储的JSON文本直接拼接进响应，不解析再序列化
+        data = roadmap.to_dict(fieldset=fieldset, raw_content=True)
+        if 'view_count' in data:
+            data['view_count'] = (roadmap.view_count or 0) + view_counter.pending('roadmap', roadmap.id)
+        
+        response = jsonify_raw({
             'success': True,
-            'data': roadmap.to_dict(),
+            'data': data,
             'message': '获取路线图成功',
             'code': 200
-        }), 200
+        })
+        return apply_cache_headers(response, etag, is_public), 200
         
     except Exception as e:
         return jsonify({
@@ -229,6 +279,8 @@ def update_roadmap(roadmap_id):
                 and_(Tag.id.in_(tag_ids), Tag.user_id == user_id)
             ).all() if tag_ids else []
             roadmap.tags = tags
+            # 仅修改标签时也刷新更新时间，使 ETag 失效
+            roadmap.updated_at = datetime.utcnow()
         
         db.session.commit()
         
@@ -247,6 +299,99 @@ def update_roadmap(roadmap_id):
             'code': 500
         }), 500
 
+@roadmap_bp.route('/<int:roadmap_id>', methods=['PATCH'])
+@jwt_required()
+def patch_roadmap(roadmap_id):
+    """以 JSON Patch（RFC 6902）增量更新路线图内容"""
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.get_json(silent=True) or {}
+        base_version = data.get('base_version')
+        patch = data.get('patch')
+        
+        if not isinstance(base_version, int) or isinstance(base_version, bool) or not isinstance(patch, list):
+            return jsonify({
+                'success': False,
+                'error': '请求体须包含整数 base_version 和操作数组 patch',
+                'code': 400
+            }), 400
+        
+        # 锁定该行，避免并发补丁在版本检查与写入之间交错
+        roadmap = Roadmap.query.with_for_update().filter_by(id=roadmap_id).first()
+        
+        if not roadmap:
+            return jsonify({
+                'success': False,
+                'error': '路线图不存在',
+                'code': 404
+            }), 404
+        
+        if roadmap.user_id != user_id:
+            return jsonify({
+                'success': False,
+                'error': '无权修改此路线图',
+                'code': 403
+            }), 403
+        
+        current_version = roadmap.version or 0
+        if base_version != current_version:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': '路线图已被修改，请重新获取后再提交',
+                'data': {'version': current_version},
+                'code': 409
+            }), 409
+        
+        try:
+            content = apply_patch(roadmap.get_content(), patch)
+        except JsonPatchTestFailed as e:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'data': {'version': current_version},
+                'code': 409
+            }), 409
+        except JsonPatchError as e:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': f'补丁无效：{str(e)}',
+                'code': 400
+            }), 400
+        
+        if not isinstance(content, dict):
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': '补丁无效：路线图内容必须为对象',
+                'code': 400
+            }), 400
+        
+        roadmap.set_content(content)
+        db.session.commit()
+        
+        # 只返回新版本信息，响应大小与文档大小无关
+        return jsonify({
+            'success': True,
+            'data': {
+                'id': roadmap.id,
+                'version': roadmap.version,
+                'updated_at': roadmap.updated_at
+            },
+            'message': '更新路线图成功',
+            'code': 200
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'更新路线图失败：{str(e)}',
+            'code': 500
+        }), 500
+
 @roadmap_bp.route('/<int:roadmap_id>', methods=['DELETE'])
 @jwt_required()
 def delete_roadmap(roadmap_id):
@@ -1,50 +1,78 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models import db, Tag, TagRelation, User
-from sqlalchemy import or_
+from flask import Blueprint, request, jsonify, Response
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from src.models import db, Tag, TagRelation, TagClosure, User, Article
+from sqlalchemy.orm import joinedload
+from src.utils.tag_graph_cache import tag_graph_cache
+from src.utils.tag_listing import list_user_tags, query_tags
+from src.utils.dag import partition_new_edges
+from src.utils.fieldsets import FieldSet
+from src.utils.json_provider import json_default
+from src.utils.tag_pages import find_tag_article
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖，未安装时紧凑格式只返回JSON
+    msgpack = None
+
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+# 批量创建标签关系的单次上限
+RELATION_BATCH_LIMIT = 500
+
+# 标签子树的默认层数与最大层数
+SUBTREE_DEFAULT_DEPTH = 5
+SUBTREE_MAX_DEPTH = 10
+
+# 标签列表游标分页的默认每页数量
+TAG_PAGE_SIZE = 50
+
+# 标签云默认与最大返回数量
+CLOUD_DEFAULT_LIMIT = 100
+CLOUD_MAX_LIMIT = 500
+
+# 标签页中的文章只展开作者，其标签即页面本身的标签
+TAG_PAGE_ARTICLE_FIELDSET = FieldSet(expand=['author'])
 
 tag_bp = Blueprint('tag', __name__)
 
 @tag_bp.route('', methods=['GET'])
 def get_tags():
-    """获取标签列表"""
+    """获取标签列表
+
+    传入 cursor 时按 (名称, ID) 游标分页（首页传空字符串），返回 {'tags', 'pagination'}；
+    否则返回全部标签。只按用户筛选时直接读取缓存的有序标签列表。
+    """
     try:
         # 查询参数
         user_id = request.args.get('user_id', type=int)
         parent_id = request.args.get('parent_id', type=int)
         search = request.args.get('search', '').strip()
-        
-        # 构建查询
-        query = Tag.query
-        
-        # 用户筛选
-        if user_id:
-            query = query.filter(Tag.user_id == user_id)
-        
-        # 父标签筛选
-        if parent_id:
-            # 查找指定父标签的子标签
-            child_tag_ids = db.session.query(TagRelation.child_tag_id).filter(
-                TagRelation.parent_tag_id == parent_id
-            ).subquery()
-            query = query.filter(Tag.id.in_(child_tag_ids))
-        
-        # 搜索筛选
-        if search:
-            query = query.filter(
-                or_(
-                    Tag.name.contains(search),
-                    Tag.description.contains(search)
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', TAG_PAGE_SIZE, type=int)
+        with_total = request.args.get('with_total', 'false').lower() == 'true'
+        fieldset = FieldSet.from_request(request.args)
+        
+        try:
+            if user_id and not parent_id and not search:
+                tags_data, pagination_data = list_user_tags(user_id, fieldset, cursor, limit, with_total)
+            else:
+                tags_data, pagination_data = query_tags(
+                    fieldset, cursor, limit, with_total,
+                    user_id=user_id, parent_id=parent_id, search=search
                 )
-            )
-        
-        # 排序
-        query = query.order_by(Tag.name)
-        tags = query.all()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'code': 400
+            }), 400
         
         return jsonify({
             'success': True,
-            'data': [tag.to_dict() for tag in tags],
+            'data': tags_data if pagination_data is None else {
+                'tags': tags_data,
+                'pagination': pagination_data
+            },
             'message': '获取标签列表成功',
             'code': 200
         }), 200
@@ -69,13 +97,22 @@ def get_tag(tag_id):
                 'code': 404
             }), 404
         
-        # 获取父标签和子标签
-        parent_relations = TagRelation.query.filter_by(child_tag_id=tag_id).all()
-        child_relations = TagRelation.query.filter_by(parent_tag_id=tag_id).all()
+        fieldset = FieldSet.from_request(request.args)
+        tag_data = tag.to_dict(fieldset=fieldset)
         
-        tag_data = tag.to_dict()
-        tag_data['parent_tags'] = [rel.parent_tag.to_dict() for rel in parent_relations]
-        tag_data['child_tags'] = [rel.child_tag.to_dict() for rel in child_relations]
+        # 从标签图缓存获取父标签和子标签（关系两端属于同一用户，共用作者信息）
+        graph = None
+        for key, adjacency in (('parent_tags', 'parents'), ('child_tags', 'children')):
+            if not fieldset.expands(key):
+                continue
+            graph = graph or tag_graph_cache.get(tag.user_id)
+            nested = fieldset.nested(key)
+            with_author = nested.expands('author')
+            author = tag.author.to_dict(fieldset=nested.nested('author')) if with_author and tag.author else None
+            tag_data[key] = [
+                nested.apply(graph.node_dict(related_id, author, with_author))
+                for related_id in getattr(graph, adjacency).get(tag_id, []) if related_id in graph.nodes
+            ]
         
         return jsonify({
             'success': True,
@@ -91,12 +128,138 @@ def get_tag(tag_id):
             'code': 500
         }), 500
 
+@tag_bp.route('/<int:tag_id>/subtree', methods=['GET'])
+def get_tag_subtree(tag_id):
+    """获取标签子树（direction=down）或祖先树（direction=up），附带各节点的已发布内容数量"""
+    try:
+        depth = request.args.get('depth', SUBTREE_DEFAULT_DEPTH, type=int)
+        direction = request.args.get('direction', 'down')
+        
+        if direction not in ('down', 'up'):
+            return jsonify({
+                'success': False,
+                'error': 'direction 只能为 down 或 up',
+                'code': 400
+            }), 400
+        
+        if depth < 1:
+            return jsonify({
+                'success': False,
+                'error': 'depth 必须为正整数',
+                'code': 400
+            }), 400
+        depth = min(depth, SUBTREE_MAX_DEPTH)
+        
+        tag = Tag.query.get(tag_id)
+        
+        if not tag:
+            return jsonify({
+                'success': False,
+                'error': '标签不存在',
+                'code': 404
+            }), 404
+        
+        # 一条递归CTE取得全部关系，再一次查询取得涉及的标签
+        edges = TagRelation.subtree_edges(tag_id, depth, direction)
+        next_ids = {}
+        for source_id, target_id in edges:
+            next_ids.setdefault(source_id, []).append(target_id)
+        
+        node_ids = {tag_id} | {target_id for _, target_id in edges}
+        tags = {tag_id: tag}
+        if len(node_ids) > 1:
+            tags.update({item.id: item for item in Tag.query.filter(Tag.id.in_(node_ids - {tag_id})).all()})
+        
+        # DAG 中的共享节点在每个父节点下各出现一次，层数受 depth 限制
+        branch_key = 'children' if direction == 'down' else 'parents'
+        
+        def build(node_id, level):
+            node = tags[node_id].to_dict(include_author=False)
+            node['content_counts'] = tags[node_id].usage_counts()
+            node[branch_key] = []
+            if level < depth:
+                next_tags = sorted(
+                    (tags[next_id] for next_id in next_ids.get(node_id, []) if next_id in tags),
+                    key=lambda item: item.name
+                )
+                node[branch_key] = [build(item.id, level + 1) for item in next_tags]
+            return node
+        
+        tree = build(tag_id, 0)
+        tree['author'] = tag.author.to_dict() if tag.author else None
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'direction': direction,
+                'depth': depth,
+                'tree': tree
+            },
+            'message': '获取标签子树成功',
+            'code': 200
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'获取标签子树失败：{str(e)}',
+            'code': 500
+        }), 500
+
+@tag_bp.route('/<int:tag_id>/page', methods=['GET'])
+def get_tag_page(tag_id):
+    """获取标签页：标签及其标签文章，通过 article_id 一次联表查询取得"""
+    try:
+        tag = Tag.query.options(
+            joinedload(Tag.author),
+            joinedload(Tag.article).joinedload(Article.author)
+        ).filter(Tag.id == tag_id).first()
+        
+        if not tag:
+            return jsonify({
+                'success': False,
+                'error': '标签不存在',
+                'code': 404
+            }), 404
+        
+        current_user_id = None
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+            current_user_id = int(identity) if identity else None
+        except Exception:
+            pass
+        
+        # 尚未回填 article_id 的旧数据回退到按关联表查找
+        article = find_tag_article(tag)
+        
+        # 未发布的标签文章只有作者本人可以查看
+        if article and article.status != 'published' and article.user_id != current_user_id:
+            article = None
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'tag': tag.to_dict(),
+                'article': article.to_dict(fieldset=TAG_PAGE_ARTICLE_FIELDSET) if article else None
+            },
+            'message': '获取标签页成功',
+            'code': 200
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'获取标签页失败：{str(e)}',
+            'code': 500
+        }), 500
+
 @tag_bp.route('', methods=['POST'])
 @jwt_required()
 def create_tag():
     """创建标签"""
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         data = request.get_json()
         
         # 验证必填字段
@@ -125,18 +288,23 @@ def create_tag():
             color=data.get('color', '#1677ff')
         )
         
+        # 处理父标签关系：写入路径查询数据库校验父标签归属，不使用可能落后于其他进程的标签图缓存
+        parent_tag_ids = list(dict.fromkeys(data.get('parent_tags', [])))
+        owned_parent_ids = {
+            parent_id for (parent_id,) in db.session.query(Tag.id).filter(
+                Tag.id.in_(parent_tag_ids), Tag.user_id == user_id
+            )
+        } if parent_tag_ids else set()
+        
         db.session.add(tag)
         db.session.flush()  # 获取标签ID
         
-        # 处理父标签关系
-        parent_tag_ids = data.get('parent_tags', [])
         for parent_tag_id in parent_tag_ids:
             # 验证父标签存在且属于当前用户
-            parent_tag = Tag.query.filter_by(id=parent_tag_id, user_id=user_id).first()
-            if not parent_tag:
+            if parent_tag_id not in owned_parent_ids:
                 continue
             
-            # 验证DAG
+            # 验证DAG（查询闭包表）
             is_valid, msg = TagRelation.validate_dag(user_id, parent_tag_id, tag.id)
             if not is_valid:
                 db.session.rollback()
@@ -153,6 +321,7 @@ def create_tag():
                 user_id=user_id
             )
             db.session.add(relation)
+            TagClosure.link(user_id, parent_tag_id, tag.id)
         
         db.session.commit()
         
@@ -176,7 +345,7 @@ def create_tag():
 def update_tag(tag_id):
     """更新标签"""
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         tag = Tag.query.get(tag_id)
         
         if not tag:
@@ -235,7 +404,7 @@ def update_tag(tag_id):
 def delete_tag(tag_id):
     """删除标签"""
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         tag = Tag.query.get(tag_id)
         
         if not tag:
@@ -252,13 +421,8 @@ def delete_tag(tag_id):
                 'code': 403
             }), 403
         
-        # 删除相关的标签关系
-        TagRelation.query.filter(
-            or_(
-                TagRelation.parent_tag_id == tag_id,
-                TagRelation.child_tag_id == tag_id
-            )
-        ).delete()
+        # 删除相关的标签关系（同步闭包表）
+        TagRelation.detach_tag(tag_id)
         
         db.session.delete(tag)
         db.session.commit()
@@ -279,9 +443,16 @@ def delete_tag(tag_id):
 
 @tag_bp.route('/graph', methods=['GET'])
 def get_tag_graph():
-    """获取标签关系图"""
+    """获取标签关系图
+
+    format=compact 时每个节点只返回一次（作者信息单独返回），边为 [父标签ID, 子标签ID]；
+    请求头 Accept 为 application/x-msgpack 且已安装 msgpack 时以 MessagePack 编码；
+    layout=true 时附带分层布局坐标，布局随标签图版本缓存。
+    """
     try:
         user_id = request.args.get('user_id', type=int)
+        compact = request.args.get('format') == 'compact'
+        with_layout = request.args.get('layout', 'false').lower() == 'true'
         
         if not user_id:
             return jsonify({
@@ -290,17 +461,31 @@ def get_tag_graph():
                 'code': 400
             }), 400
         
-        # 获取用户的所有标签
-        tags = Tag.query.filter_by(user_id=user_id).all()
-        
-        # 获取标签关系
-        relations = TagRelation.query.filter_by(user_id=user_id).all()
-        
-        # 构建图结构
-        graph_data = {
-            'nodes': [tag.to_dict() for tag in tags],
-            'edges': [relation.to_dict() for relation in relations]
-        }
+        # 从缓存获取用户的标签图，所有节点共用同一份作者信息
+        graph = tag_graph_cache.get(user_id)
+        author = User.query.get(user_id)
+        author_data = author.to_dict() if author else None
+        
+        if compact:
+            graph_data = graph.render_compact(author_data)
+            if with_layout:
+                graph_data['layout'] = graph.layout()
+            payload = {
+                'success': True,
+                'data': graph_data,
+                'message': '获取标签关系图成功',
+                'code': 200
+            }
+            if msgpack is not None and request.accept_mimetypes.best == MSGPACK_MIMETYPE:
+                response = Response(msgpack.packb(payload, default=json_default), mimetype=MSGPACK_MIMETYPE)
+            else:
+                response = jsonify(payload)
+            response.vary.add('Accept')
+            return response, 200
+        
+        graph_data = graph.render(author_data)
+        if with_layout:
+            graph_data['layout'] = graph.layout()
         
         return jsonify({
             'success': True,
@@ -316,12 +501,61 @@ def get_tag_graph():
             'code': 500
         }), 500
 
+@tag_bp.route('/cloud', methods=['GET'])
+def get_tag_cloud():
+    """获取标签云：按已发布内容数量（权重）降序，只读取标签上维护的使用计数"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        limit = min(max(request.args.get('limit', CLOUD_DEFAULT_LIMIT, type=int), 1), CLOUD_MAX_LIMIT)
+        
+        if not user_id:
+            return jsonify({
+                'success': False,
+                'error': '用户ID不能为空',
+                'code': 400
+            }), 400
+        
+        weight = (
+            db.func.coalesce(Tag.article_count, 0)
+            + db.func.coalesce(Tag.roadmap_count, 0)
+            + db.func.coalesce(Tag.mindmap_count, 0)
+        )
+        rows = db.session.query(Tag, weight.label('weight')).filter(
+            Tag.user_id == user_id,
+            weight > 0
+        ).order_by(weight.desc(), Tag.name).limit(limit).all()
+        
+        cloud = []
+        for tag, tag_weight in rows:
+            item = {
+                'id': tag.id,
+                'name': tag.name,
+                'color': tag.color,
+                'weight': tag_weight
+            }
+            item.update(tag.usage_counts())
+            cloud.append(item)
+        
+        return jsonify({
+            'success': True,
+            'data': cloud,
+            'message': '获取标签云成功',
+            'code': 200
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'获取标签云失败：{str(e)}',
+            'code': 500
+        }), 500
+
 @tag_bp.route('/validate-relation', methods=['POST'])
 @jwt_required()
 def validate_tag_relation():
     """验证标签关系"""
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         data = request.get_json()
         
         parent_tag_id = data.get('parent_tag_id')
@@ -334,19 +568,18 @@ def validate_tag_relation():
                 'code': 400
             }), 400
         
-        # 验证标签存在且属于当前用户
-        parent_tag = Tag.query.filter_by(id=parent_tag_id, user_id=user_id).first()
-        child_tag = Tag.query.filter_by(id=child_tag_id, user_id=user_id).first()
+        # 验证标签存在且属于当前用户（使用缓存的标签图）
+        graph = tag_graph_cache.get(user_id)
         
-        if not parent_tag or not child_tag:
+        if parent_tag_id not in graph.nodes or child_tag_id not in graph.nodes:
             return jsonify({
                 'success': False,
                 'error': '标签不存在或无权访问',
                 'code': 404
             }), 404
         
-        # 验证DAG
-        is_valid, msg = TagRelation.validate_dag(user_id, parent_tag_id, child_tag_id)
+        # 验证DAG（内存中广度优先搜索）
+        is_valid, msg = TagRelation.validate_dag(user_id, parent_tag_id, child_tag_id, graph=graph)
         
         return jsonify({
             'success': True,
@@ -370,7 +603,7 @@ def validate_tag_relation():
 def create_tag_relation():
     """创建标签关系"""
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         data = request.get_json()
         
         parent_tag_id = data.get('parent_tag_id')
@@ -424,6 +657,7 @@ def create_tag_relation():
         )
         
         db.session.add(relation)
+        TagClosure.link(user_id, parent_tag_id, child_tag_id)
         db.session.commit()
         
         return jsonify({
@@ -441,12 +675,122 @@ def create_tag_relation():
             'code': 500
         }), 500
 
+@tag_bp.route('/relations/batch', methods=['POST'])
+@jwt_required()
+def create_tag_relations_batch():
+    """批量创建标签关系：一次拓扑排序校验全部新关系，有效关系在同一事务中写入"""
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.get_json() or {}
+        items = data.get('relations')
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                'success': False,
+                'error': '标签关系列表不能为空',
+                'code': 400
+            }), 400
+        
+        if len(items) > RELATION_BATCH_LIMIT:
+            return jsonify({
+                'success': False,
+                'error': f'单次最多创建 {RELATION_BATCH_LIMIT} 条标签关系',
+                'code': 400
+            }), 400
+        
+        # 两次批量查询取得当前用户的标签与关系
+        tag_ids = {tag_id for (tag_id,) in db.session.query(Tag.id).filter(Tag.user_id == user_id)}
+        existing_edges = set(
+            db.session.query(TagRelation.parent_tag_id, TagRelation.child_tag_id).filter(
+                TagRelation.user_id == user_id
+            ).all()
+        )
+        
+        rejected = []
+        candidates = []
+        candidate_index = {}
+        for index, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            parent_tag_id = item.get('parent_tag_id')
+            child_tag_id = item.get('child_tag_id')
+            edge = (parent_tag_id, child_tag_id)
+            
+            if not parent_tag_id or not child_tag_id:
+                reason = '父标签ID和子标签ID不能为空'
+            elif parent_tag_id not in tag_ids or child_tag_id not in tag_ids:
+                reason = '标签不存在或无权访问'
+            elif parent_tag_id == child_tag_id:
+                reason = '标签不能关联自己'
+            elif edge in existing_edges:
+                reason = '标签关系已存在'
+            elif edge in candidate_index:
+                reason = '与本批次中的关系重复'
+            else:
+                candidate_index[edge] = index
+                candidates.append(edge)
+                continue
+            rejected.append({
+                'index': index,
+                'parent_tag_id': parent_tag_id,
+                'child_tag_id': child_tag_id,
+                'error': reason
+            })
+        
+        # 合并后的图只做一次拓扑排序；有环时逐条找出会形成循环的关系
+        accepted, cyclic = partition_new_edges(existing_edges, candidates)
+        for parent_tag_id, child_tag_id in cyclic:
+            rejected.append({
+                'index': candidate_index[(parent_tag_id, child_tag_id)],
+                'parent_tag_id': parent_tag_id,
+                'child_tag_id': child_tag_id,
+                'error': '添加此关系会形成循环'
+            })
+        rejected.sort(key=lambda item: item['index'])
+        
+        relations = []
+        for parent_tag_id, child_tag_id in accepted:
+            relation = TagRelation(
+                parent_tag_id=parent_tag_id,
+                child_tag_id=child_tag_id,
+                user_id=user_id
+            )
+            db.session.add(relation)
+            TagClosure.link(user_id, parent_tag_id, child_tag_id)
+            relations.append(relation)
+        
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'created': [
+                    {
+                        'id': relation.id,
+                        'parent_tag_id': relation.parent_tag_id,
+                        'child_tag_id': relation.child_tag_id
+                    }
+                    for relation in relations
+                ],
+                'rejected': rejected
+            },
+            'message': f'创建 {len(relations)} 条标签关系，{len(rejected)} 条未创建',
+            'code': 201 if relations else 200
+        }), 201 if relations else 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'批量创建标签关系失败：{str(e)}',
+            'code': 500
+        }), 500
+
 @tag_bp.route('/relations/<int:relation_id>', methods=['DELETE'])
 @jwt_required()
 def delete_tag_relation(relation_id):
     """删除标签关系"""
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         relation = TagRelation.query.get(relation_id)
         
         if not relation:
@@ -463,6 +807,7 @@ def delete_tag_relation(relation_id):
                 'code': 403
             }), 403
         
+        TagClosure.unlink(relation.user_id, relation.parent_tag_id, relation.child_tag_id)
         db.session.delete(relation)
         db.session.commit()
         
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models import db, Upload, User
+from src.utils.pagination import keyset_paginate
+from src.utils.fieldsets import FieldSet
 import os
 import uuid
 from werkzeug.utils import secure_filename
@@ -102,26 +104,49 @@ def get_uploads():
         # 查询参数
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 20, type=int)
+        cursor = request.args.get('cursor')
+        with_total = request.args.get('with_total', 'false').lower() == 'true'
         
         # 构建查询
         query = Upload.query.filter_by(user_id=user_id)
-        query = query.order_by(Upload.created_at.desc())
         
-        pagination = query.paginate(page=page, per_page=limit, error_out=False)
-        uploads = [upload.to_dict() for upload in pagination.items]
+        if cursor is not None:
+            # 游标分页：按 (created_at, id) 直接定位
+            try:
+                items, pagination_data = keyset_paginate(
+                    query,
+                    [Upload.created_at, Upload.id],
+                    cursor,
+                    limit,
+                    with_total=with_total
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'code': 400
+                }), 400
+        else:
+            query = query.order_by(Upload.created_at.desc())
+            pagination = query.paginate(page=page, per_page=limit, error_out=False)
+            items = pagination.items
+            pagination_data = {
+                'page': page,
+                'limit': limit,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            }
+        
+        fieldset = FieldSet.from_request(request.args)
+        uploads = [upload.to_dict(fieldset=fieldset) for upload in items]
         
         return jsonify({
             'success': True,
             'data': {
                 'uploads': uploads,
-                'pagination': {
-                    'page': page,
-                    'limit': limit,
-                    'total': pagination.total,
-                    'pages': pagination.pages,
-                    'has_next': pagination.has_next,
-                    'has_prev': pagination.has_prev
-                }
+                'pagination': pagination_data
             },
             'message': '获取上传文件列表成功',
             'code': 200
@@ -0,0 +1,79 @@
+import base64
+import zlib
+from flask import current_app, has_app_context
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，未安装时 zstd 模式回退到 zlib
+    zstandard = None
+
+# 压缩内容的格式标记：JSON 文本不会以 '~' 开头，未带标记的旧数据按原文读取
+ZLIB_MARKER = '~z:'
+ZSTD_MARKER = '~s:'
+
+# 短于该长度的内容压缩收益有限，保持原文
+MIN_COMPRESS_LENGTH = 256
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+COMPRESSION_MODES = ('none', 'zlib', 'zstd')
+
+# Base64 或压缩数据损坏时抛出的异常（binascii.Error、UnicodeDecodeError 均为 ValueError 的子类）
+_DECODE_ERRORS = (ValueError, zlib.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+def compression_mode():
+    """当前的内容压缩方式（CONTENT_COMPRESSION 配置：none / zlib / zstd）"""
+    mode = current_app.config.get('CONTENT_COMPRESSION', 'none') if has_app_context() else 'none'
+    if mode == 'zstd' and zstandard is None:
+        return 'zlib'
+    return mode if mode in COMPRESSION_MODES else 'none'
+
+
+def encode_content(text, mode=None):
+    """按压缩方式编码内容文本，压缩后不比原文短时保持原文"""
+    if text is None:
+        return text
+    mode = mode or compression_mode()
+    if mode == 'none' or len(text) < MIN_COMPRESS_LENGTH:
+        return text
+
+    raw = text.encode('utf-8')
+    if mode == 'zstd' and zstandard is not None:
+        marker, packed = ZSTD_MARKER, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        marker, packed = ZLIB_MARKER, zlib.compress(raw, ZLIB_LEVEL)
+
+    encoded = marker + base64.b64encode(packed).decode('ascii')
+    return encoded if len(encoded) < len(raw) else text
+
+
+def decode_content(stored):
+    """解码数据库中的内容，兼容未压缩的旧数据
+
+    带标记但无法解压的内容（恰好以标记开头的旧纯文本或损坏的数据）按原文返回，由调用方按无效JSON处理。
+    """
+    if not isinstance(stored, str) or not stored.startswith('~'):
+        return stored
+    try:
+        if stored.startswith(ZLIB_MARKER):
+            return zlib.decompress(base64.b64decode(stored[len(ZLIB_MARKER):], validate=True)).decode('utf-8')
+        if stored.startswith(ZSTD_MARKER):
+            if zstandard is None:
+                raise RuntimeError('内容使用 zstd 压缩，但未安装 zstandard')
+            packed = base64.b64decode(stored[len(ZSTD_MARKER):], validate=True)
+            return zstandard.ZstdDecompressor().decompress(packed).decode('utf-8')
+    except _DECODE_ERRORS:
+        return stored
+    return stored
+
+
+def stored_mode(stored):
+    """数据库中内容的存储格式"""
+    if isinstance(stored, str):
+        if stored.startswith(ZLIB_MARKER):
+            return 'zlib'
+        if stored.startswith(ZSTD_MARKER):
+            return 'zstd'
+    return 'none'
@@ -0,0 +1,132 @@
+from collections import deque
+
+
+def topological_order(nodes, edges):
+    """Kahn 拓扑排序，返回 (拓扑序列表, 未能排序的节点集合)
+
+    未能排序的节点位于环上或环的下游，为空时图无环。
+    """
+    indegree = {node: 0 for node in nodes}
+    children = {}
+    for parent, child in edges:
+        indegree.setdefault(parent, 0)
+        indegree[child] = indegree.get(child, 0) + 1
+        children.setdefault(parent, []).append(child)
+
+    queue = deque(node for node, degree in indegree.items() if degree == 0)
+    order = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for child in children.get(node, ()):
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                queue.append(child)
+
+    remaining = {node for node, degree in indegree.items() if degree > 0}
+    return order, remaining
+
+
+def strongly_connected_components(nodes, edges):
+    """Tarjan 强连通分量（迭代实现，避免深图递归溢出），返回 {节点: 分量编号}"""
+    children = {}
+    for parent, child in edges:
+        children.setdefault(parent, []).append(child)
+
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    component = {}
+    counter = 0
+
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(children.get(root, ())))]
+        while work:
+            node, successors = work[-1]
+            advanced = False
+            for child in successors:
+                if child not in index:
+                    index[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(children.get(child, ()))))
+                    advanced = True
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component[member] = index[node]
+                    if member == node:
+                        break
+
+    return component
+
+
+def _has_path(children, start, target):
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        if node == target:
+            return True
+        for child in children.get(node, ()):
+            if child not in seen:
+                seen.add(child)
+                queue.append(child)
+    return False
+
+
+def partition_new_edges(existing_edges, new_edges):
+    """将新增边划分为可接受与会形成环两组，返回 (可接受的边, 会形成环的边)
+
+    existing_edges 须为无环图。先对合并后的图做一次拓扑排序，无环时全部接受；
+    否则只有两端处于同一强连通分量的新边可能成环，按提交顺序逐条检查，
+    先提交的边优先保留。
+    """
+    existing_edges = list(existing_edges)
+    new_edges = list(new_edges)
+    all_edges = existing_edges + new_edges
+
+    _, remaining = topological_order((), all_edges)
+    if not remaining:
+        return new_edges, []
+
+    cyclic_edges = [(parent, child) for parent, child in all_edges if parent in remaining and child in remaining]
+    component = strongly_connected_components(remaining, cyclic_edges)
+
+    # 只保留同一强连通分量内部的已有边，环只可能出现在分量内部
+    children = {}
+    for parent, child in existing_edges:
+        if parent in remaining and component.get(parent) == component.get(child):
+            children.setdefault(parent, []).append(child)
+
+    accepted = []
+    rejected = []
+    for parent, child in new_edges:
+        if parent not in remaining or component.get(parent) != component.get(child):
+            accepted.append((parent, child))
+        elif _has_path(children, child, parent):
+            rejected.append((parent, child))
+        else:
+            accepted.append((parent, child))
+            children.setdefault(parent, []).append(child)
+
+    return accepted, rejected
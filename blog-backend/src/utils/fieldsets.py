@@ -0,0 +1,74 @@
+class FieldSet:
+    """稀疏字段集：由 ?fields= 与 ?expand= 决定 to_dict 输出哪些字段、展开哪些关联
+
+    - 两个参数都未传时保持原有输出（全部字段，默认展开全部关联）
+    - fields=id,title 只输出列出的字段，id 始终保留
+    - expand=author,tags.author 只展开列出的关联，点号表示嵌套展开；
+      fields 中列出的关联同样会被展开
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = set(fields) if fields is not None else None
+        self._expand = None
+        if expand is not None or fields is not None:
+            self._expand = {}
+            for path in list(expand or []) + [name for name in self.fields or () if '.' not in name]:
+                name, _, rest = path.partition('.')
+                self._expand.setdefault(name, [])
+                if rest:
+                    self._expand[name].append(rest)
+
+    @classmethod
+    def from_request(cls, args):
+        """从查询参数解析，两个参数都未传时返回默认字段集"""
+        fields = _split(args.get('fields'))
+        expand = _split(args.get('expand'))
+        if fields is None and expand is None:
+            return DEFAULT_FIELDSET
+        return cls(fields, expand)
+
+    @property
+    def is_default(self):
+        return self._expand is None
+
+    def includes(self, name):
+        """是否输出字段 name"""
+        return self.fields is None or name == 'id' or name in self.fields
+
+    def expands(self, relation):
+        """是否展开关联 relation"""
+        return self._expand is None or relation in self._expand
+
+    def nested(self, relation):
+        """关联对象使用的字段集：只继承点号指定的下一级展开"""
+        if self._expand is None:
+            return DEFAULT_FIELDSET
+        return FieldSet(expand=self._expand.get(relation, []))
+
+    def apply(self, data):
+        """按 fields 过滤 to_dict 生成的字典"""
+        if self.fields is None:
+            return data
+        return {
+            key: value for key, value in data.items()
+            if key == 'id' or key in self.fields or (self._expand is not None and key in self._expand)
+        }
+
+    def cache_key(self):
+        """用于 ETag 等缓存键的规范化表示"""
+        if self._expand is None:
+            return ''
+        fields = ','.join(sorted(self.fields)) if self.fields is not None else '*'
+        expand = ','.join(
+            sorted(f'{name}.{rest}' if rest else name for name, nested in self._expand.items() for rest in nested or [''])
+        )
+        return f'fields={fields};expand={expand}'
+
+
+def _split(value):
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+DEFAULT_FIELDSET = FieldSet()
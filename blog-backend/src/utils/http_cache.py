@@ -0,0 +1,50 @@
+import hashlib
+from flask import request, make_response
+
+# 已发布内容允许浏览器和反向代理缓存的时间（秒），过期后使用 ETag 重新验证
+PUBLIC_MAX_AGE = 60
+
+
+def embedded_objects(item, fieldset):
+    """to_dict 按字段集嵌入响应的关联对象：作者、标签及标签的作者"""
+    objects = []
+    if fieldset.expands('author') and item.author:
+        objects.append(item.author)
+    if fieldset.expands('tags'):
+        expand_tag_author = fieldset.nested('tags').expands('author')
+        for tag in item.tags:
+            objects.append(tag)
+            if expand_tag_author and tag.author:
+                objects.append(tag.author)
+    return objects
+
+
+def make_etag(kind, item_id, updated_at, variant=None, related=()):
+    """由内容类型、ID、更新时间、响应变体及嵌入的关联对象生成 ETag 值
+
+    related 中对象的表名、ID 和更新时间计入 ETag，标签改名、作者修改资料时 ETag 随之变化。
+    浏览量等高频变化的字段不计入，因此以弱 ETag 返回（见 apply_cache_headers）。
+    """
+    stamp = updated_at.isoformat() if updated_at else ''
+    parts = [f'{kind}:{item_id}:{stamp}:{variant or ""}']
+    for obj in related:
+        parts.append(f'{obj.__tablename__}:{obj.id}:{obj.updated_at.isoformat() if obj.updated_at else ""}')
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def apply_cache_headers(response, etag, public):
+    """设置弱 ETag 和 Cache-Control：已发布内容可共享缓存，其他内容仅允许私有缓存且每次验证"""
+    response.set_etag(etag, weak=True)
+    if public:
+        response.headers['Cache-Control'] = f'public, max-age={PUBLIC_MAX_AGE}'
+    else:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified_response(etag, public):
+    """If-None-Match 命中时返回 304 响应，否则返回 None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = make_response('', 304)
+    return apply_cache_headers(response, etag, public)
@@ -0,0 +1,144 @@
+class JsonPatchError(ValueError):
+    """补丁格式错误或无法应用（路径不存在等）"""
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    """test 操作比较失败，文档已不是补丁预期的状态"""
+
+
+def parse_pointer(pointer):
+    """解析 RFC 6901 JSON Pointer，返回引用令牌列表"""
+    if not isinstance(pointer, str):
+        raise JsonPatchError('路径必须为字符串')
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise JsonPatchError(f'无效的路径：{pointer}')
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _array_index(container, token, allow_end=False):
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise JsonPatchError(f'无效的数组下标：{token}')
+    index = int(token)
+    limit = len(container) if allow_end else len(container) - 1
+    if index > limit:
+        raise JsonPatchError(f'数组下标越界：{token}')
+    return index
+
+
+def _resolve(document, tokens):
+    """返回路径所指的值"""
+    value = document
+    for token in tokens:
+        if isinstance(value, dict):
+            if token not in value:
+                raise JsonPatchError(f'路径不存在：{token}')
+            value = value[token]
+        elif isinstance(value, list):
+            value = value[_array_index(value, token)]
+        else:
+            raise JsonPatchError(f'路径不存在：{token}')
+    return value
+
+
+def _parent(document, tokens):
+    """返回路径的父容器与最后一个令牌"""
+    if not tokens:
+        raise JsonPatchError('不能对根路径执行该操作')
+    container = _resolve(document, tokens[:-1])
+    if not isinstance(container, (dict, list)):
+        raise JsonPatchError('父路径不是对象或数组')
+    return container, tokens[-1]
+
+
+def _add(document, tokens, value):
+    if not tokens:
+        return value
+    container, token = _parent(document, tokens)
+    if isinstance(container, list):
+        container.insert(_array_index(container, token, allow_end=True), value)
+    else:
+        container[token] = value
+    return document
+
+
+def _remove(document, tokens):
+    container, token = _parent(document, tokens)
+    if isinstance(container, list):
+        return container.pop(_array_index(container, token))
+    if token not in container:
+        raise JsonPatchError(f'路径不存在：{token}')
+    return container.pop(token)
+
+
+def _copy_value(value):
+    # 只包含 JSON 类型的值，按结构递归复制比 deepcopy 快
+    if isinstance(value, dict):
+        return {key: _copy_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+    return value
+
+
+def _equal(left, right):
+    # JSON 中 true 与 1 不相等，Python 中 True == 1，需区分布尔值
+    if isinstance(left, bool) or isinstance(right, bool):
+        return type(left) is type(right) and left == right
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(_equal(left[key], right[key]) for key in left)
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(_equal(a, b) for a, b in zip(left, right))
+    return left == right
+
+
+def apply_patch(document, patch):
+    """对文档应用 RFC 6902 JSON Patch，返回修改后的文档
+
+    文档会被原地修改（根路径被替换时返回新值），调用方应传入刚解析出的副本；
+    任一操作失败时抛出 JsonPatchError，调用方丢弃该文档即可保证补丁整体生效或整体不生效。
+    """
+    if not isinstance(patch, list):
+        raise JsonPatchError('补丁必须为操作数组')
+
+    for operation in patch:
+        if not isinstance(operation, dict):
+            raise JsonPatchError('补丁操作必须为对象')
+        op = operation.get('op')
+        tokens = parse_pointer(operation.get('path'))
+
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError(f'{op} 操作缺少 value')
+        if op in ('move', 'copy') and 'from' not in operation:
+            raise JsonPatchError(f'{op} 操作缺少 from')
+
+        if op == 'add':
+            document = _add(document, tokens, operation['value'])
+        elif op == 'remove':
+            _remove(document, tokens)
+        elif op == 'replace':
+            if not tokens:
+                document = operation['value']
+                continue
+            _resolve(document, tokens)
+            container, token = _parent(document, tokens)
+            container[_array_index(container, token) if isinstance(container, list) else token] = operation['value']
+        elif op == 'move':
+            source = parse_pointer(operation['from'])
+            if source == tokens:
+                continue
+            if tokens[:len(source)] == source:
+                raise JsonPatchError('不能移动到自身的子路径')
+            document = _add(document, tokens, _remove(document, source))
+        elif op == 'copy':
+            value = _copy_value(_resolve(document, parse_pointer(operation['from'])))
+            document = _add(document, tokens, value)
+        elif op == 'test':
+            if not _equal(_resolve(document, tokens), operation['value']):
+                raise JsonPatchTestFailed(f'test 操作失败：{operation["path"]}')
+        else:
+            raise JsonPatchError(f'不支持的操作：{op}')
+
+    return document
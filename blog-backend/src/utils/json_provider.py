@@ -0,0 +1,115 @@
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库 json
+    orjson = None
+
+# 当前使用的 JSON 实现
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def json_default(value):
+    """序列化 JSON 不支持的类型：日期时间统一输出 ISO 8601 字符串"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _orjson_option(sort_keys=False, indent=False):
+    option = orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return option
+
+
+def dumps_bytes(obj, sort_keys=False, indent=False):
+    """序列化为 UTF-8 编码的 JSON 字节串（紧凑格式，非 ASCII 字符不转义）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=json_default, option=_orjson_option(sort_keys, indent))
+        except TypeError:
+            # orjson 不支持超过 64 位的整数等少数情况，交给标准库处理
+            pass
+    return dumps_text(obj, sort_keys, indent, backend='json').encode('utf-8')
+
+
+def dumps_text(obj, sort_keys=False, indent=False, backend=None):
+    """序列化为 JSON 字符串（紧凑格式，非 ASCII 字符不转义），日期时间输出 ISO 8601 字符串"""
+    if (backend or BACKEND) == 'orjson':
+        return dumps_bytes(obj, sort_keys, indent).decode('utf-8')
+    return json.dumps(
+        obj, ensure_ascii=False, sort_keys=sort_keys, default=json_default,
+        indent=2 if indent else None, separators=None if indent else (',', ':')
+    )
+
+
+def loads_text(text, backend=None):
+    """解析 JSON 字符串或字节串，格式错误时抛出 json.JSONDecodeError"""
+    if (backend or BACKEND) == 'orjson':
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # orjson 拒绝 NaN、Infinity 等标准库可接受的输入，交给标准库判断
+            pass
+    return json.loads(text)
+
+
+def _reject_constant(name):
+    raise ValueError(f'非标准的 JSON 常量：{name}')
+
+
+def is_valid_json(text):
+    """严格校验 JSON 文本：拒绝 NaN、Infinity 等标准库可接受但不合法的常量，通过校验的文本可原样拼接进响应"""
+    if orjson is not None:
+        try:
+            orjson.loads(text)
+        except orjson.JSONDecodeError:
+            return False
+        return True
+    try:
+        json.loads(text, parse_constant=_reject_constant)
+    except ValueError:
+        return False
+    return True
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON 提供者：安装 orjson 时使用 orjson，否则使用标准库 json
+
+    与 Flask 默认提供者一致按键排序输出；日期时间统一序列化为 ISO 8601 字符串，
+    模型的 to_dict 可直接返回 datetime。
+    """
+
+    sort_keys = True
+    compact = None
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.keys() - {'sort_keys', 'indent', 'separators'}:
+            kwargs.setdefault('default', json_default)
+            return json.dumps(obj, **kwargs)
+        return dumps_text(obj, kwargs.get('sort_keys', self.sort_keys), bool(kwargs.get('indent')))
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return loads_text(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(dumps_bytes(obj, self.sort_keys, indent) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,212 @@
+import hashlib
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select, bindparam
+from sqlalchemy.orm import Session, attributes
+from src.models import db, Mindmap, MindmapNode
+from src.utils.json_provider import dumps_text, loads_text
+
+# 节点ID列的长度上限，超出的 uid 视为缺失；生成的ID超出时取其摘要
+NODE_ID_MAX_LENGTH = 64
+
+# 与已有节点行比较是否变化的列
+NODE_COLUMNS = ('parent_id', 'position', 'depth', 'child_count', 'data')
+
+# 单条 IN 删除语句的节点数上限
+DELETE_BATCH_SIZE = 500
+
+
+def node_store_enabled():
+    """是否在保存思维导图时同步节点表（MINDMAP_NODE_STORE 配置）"""
+    return has_app_context() and current_app.config.get('MINDMAP_NODE_STORE', False)
+
+
+def mindmap_root(content):
+    """内容中的根节点：编辑器 getData(true) 保存为 {'root': 根节点, 'layout', 'theme', 'view'}，也兼容直接保存根节点"""
+    if not isinstance(content, dict):
+        return None
+    if isinstance(content.get('root'), dict):
+        return content['root']
+    if 'data' in content or 'children' in content:
+        return content
+    return None
+
+
+def _fallback_id(parent_id, position, seen):
+    """由父节点ID与位置生成节点ID，过长时取摘要，与已有ID冲突时追加序号"""
+    base = '#' if parent_id is None else f'{parent_id}/{position}'
+    if len(base) > NODE_ID_MAX_LENGTH - 4:
+        base = '#' + hashlib.sha1(base.encode('utf-8')).hexdigest()
+    node_id = base
+    sequence = 0
+    while node_id in seen:
+        sequence += 1
+        node_id = f'{base}~{sequence}'
+    return node_id
+
+
+def flatten_nodes(content):
+    """按先序将内容拆分为节点行列表，data 保持为字典
+
+    节点ID取 data.uid；uid 缺失、过长或重复时由父节点ID与位置生成（根节点为 '#'，其子节点为 '#/0' 等），
+    在其他位置插入、删除节点不会改变这些ID，同步节点表时只有真正变化的节点需要写入。
+    """
+    root = mindmap_root(content)
+    if root is None:
+        return []
+
+    rows = []
+    seen = set()
+    stack = [(root, None, 0, 0)]
+    while stack:
+        node, parent_id, position, depth = stack.pop()
+        data = node.get('data') if isinstance(node.get('data'), dict) else {}
+        children = node.get('children') if isinstance(node.get('children'), list) else []
+        children = [child for child in children if isinstance(child, dict)]
+
+        uid = data.get('uid')
+        if isinstance(uid, str) and uid and len(uid) <= NODE_ID_MAX_LENGTH and uid not in seen:
+            node_id = uid
+        else:
+            node_id = _fallback_id(parent_id, position, seen)
+        seen.add(node_id)
+
+        rows.append({
+            'node_id': node_id,
+            'parent_id': parent_id,
+            'position': position,
+            'depth': depth,
+            'child_count': len(children),
+            'data': data
+        })
+        for index in range(len(children) - 1, -1, -1):
+            stack.append((children[index], node_id, index, depth + 1))
+    return rows
+
+
+def build_tree(rows, root_id, max_depth):
+    """由节点行组装 root_id 以下 max_depth 层的子树，未展开的节点 children 为空、child_count 为子节点数
+
+    找不到 root_id 时返回 None。
+    """
+    by_id = {}
+    children = {}
+    for row in rows:
+        by_id[row['node_id']] = row
+        children.setdefault(row['parent_id'], []).append(row)
+    if root_id not in by_id:
+        return None
+
+    def render(row, level):
+        data = row['data']
+        node = {
+            'node_id': row['node_id'],
+            'data': loads_text(data) if isinstance(data, str) else data,
+            'child_count': row['child_count'],
+            'children': []
+        }
+        if level < max_depth:
+            next_rows = sorted(children.get(row['node_id'], ()), key=lambda item: item['position'])
+            node['children'] = [render(item, level + 1) for item in next_rows]
+        return node
+
+    return render(by_id[root_id], 0)
+
+
+def truncate_content(content, max_depth):
+    """只保留根节点以下 max_depth 层，其余字段（布局、主题等）原样保留"""
+    rows = flatten_nodes(content)
+    if not rows:
+        return content
+    tree = build_tree(rows, rows[0]['node_id'], max_depth)
+    if isinstance(content.get('root'), dict):
+        return {**content, 'root': tree}
+    return tree
+
+
+def load_subtree(mindmap, root_id, max_depth):
+    """获取子树：节点表已同步时用递归CTE只读取需要的节点，否则解析完整内容；root_id 为空时从根节点开始"""
+    if mindmap.nodes_synced:
+        if root_id is None:
+            root_id = db.session.execute(
+                select(MindmapNode.node_id).where(
+                    MindmapNode.mindmap_id == mindmap.id, MindmapNode.parent_id.is_(None)
+                ).limit(1)
+            ).scalar()
+        if root_id is None:
+            return None
+        rows = [row._asdict() for row in MindmapNode.subtree(mindmap.id, root_id, max_depth)]
+    else:
+        rows = flatten_nodes(mindmap.get_content())
+        if root_id is None and rows:
+            root_id = rows[0]['node_id']
+    return build_tree(rows, root_id, max_depth)
+
+
+def sync_nodes(connection, mindmap_id, content):
+    """对比已有节点行，只删除、插入、更新变化的节点，返回变化的节点数"""
+    table = MindmapNode.__table__
+    rows = {}
+    for row in flatten_nodes(content):
+        row['data'] = dumps_text(row['data'])
+        rows[row['node_id']] = row
+
+    existing = {
+        row.node_id: row
+        for row in connection.execute(
+            select(table.c.node_id, *[table.c[column] for column in NODE_COLUMNS]).where(table.c.mindmap_id == mindmap_id)
+        )
+    }
+
+    removed = [node_id for node_id in existing if node_id not in rows]
+    added = [{'mindmap_id': mindmap_id, **row} for node_id, row in rows.items() if node_id not in existing]
+    changed = [
+        {'node': node_id, **{f'new_{column}': row[column] for column in NODE_COLUMNS}}
+        for node_id, row in rows.items()
+        if node_id in existing and any(getattr(existing[node_id], column) != row[column] for column in NODE_COLUMNS)
+    ]
+
+    for start in range(0, len(removed), DELETE_BATCH_SIZE):
+        connection.execute(table.delete().where(
+            table.c.mindmap_id == mindmap_id, table.c.node_id.in_(removed[start:start + DELETE_BATCH_SIZE])
+        ))
+    if added:
+        connection.execute(table.insert(), added)
+    if changed:
+        connection.execute(
+            table.update().where(
+                table.c.mindmap_id == mindmap_id, table.c.node_id == bindparam('node')
+            ).values({column: bindparam(f'new_{column}') for column in NODE_COLUMNS}),
+            changed
+        )
+    return len(removed) + len(added) + len(changed)
+
+
+def sync_mindmap(connection, mindmap):
+    """同步节点表并记录已同步的内容版本号（不改变 updated_at）"""
+    sync_nodes(connection, mindmap.id, mindmap.get_content())
+    version = mindmap.version or 0
+    table = Mindmap.__table__
+    connection.execute(
+        table.update().where(table.c.id == mindmap.id).values(node_version=version, updated_at=table.c.updated_at)
+    )
+    attributes.set_committed_value(mindmap, 'node_version', version)
+
+
+@event.listens_for(Session, 'before_flush')
+def _delete_removed_mindmap_nodes(session, flush_context, instances):
+    # 须在删除思维导图之前删除节点行，避免外键约束失败
+    mindmap_ids = [obj.id for obj in session.deleted if isinstance(obj, Mindmap) and obj.id is not None]
+    if mindmap_ids:
+        table = MindmapNode.__table__
+        session.connection().execute(table.delete().where(table.c.mindmap_id.in_(mindmap_ids)))
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_changed_mindmap_nodes(session, flush_context):
+    # 未启用节点表时不同步，node_version 落后于 version，读取时自动回退到完整内容
+    if not node_store_enabled():
+        return
+    # set_content 每次写入内容都会递增 version；对象已过期时 content 的属性历史可能为空，按 version 判断
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Mindmap) and inspect(obj).attrs.version.history.has_changes():
+            sync_mindmap(session.connection(), obj)
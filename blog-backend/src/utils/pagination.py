@@ -0,0 +1,175 @@
+import base64
+import bisect
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_, false, DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+# 游标分页每页数量上限
+MAX_PAGE_LIMIT = 100
+
+
+def clamp_limit(limit):
+    """将每页数量限制在 1..MAX_PAGE_LIMIT"""
+    return min(max(limit or 1, 1), MAX_PAGE_LIMIT)
+
+
+def encode_cursor(values):
+    """将排序键编码为不透明的游标字符串"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """解析游标字符串，按列类型还原排序键"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('无效的游标')
+
+    if not isinstance(payload, list) or len(payload) != len(columns):
+        raise ValueError('无效的游标')
+
+    return [_cursor_value(column, value) for column, value in zip(columns, payload)]
+
+
+def _cursor_value(column, value):
+    # 游标由客户端传入，值的类型必须与列类型一致，否则比较或查询时会出错
+    if value is None:
+        if not getattr(column, 'nullable', True):
+            raise ValueError('无效的游标')
+        return None
+    if isinstance(column.type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError('无效的游标')
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError('无效的游标')
+
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        return value
+    if isinstance(value, bool) or not isinstance(value, expected):
+        raise ValueError('无效的游标')
+    return value
+
+
+class CodepointOrder(ColumnElement):
+    """按码位比较的字符串列，数据库中的排序与 Python 的字符串排序一致
+
+    MySQL 等数据库默认按排序规则比较（忽略大小写、重音等），与内存中排好序的列表混用同一游标时
+    顺序会不一致。保留原列的 key、类型与可空性，可直接作为 keyset_paginate 的排序列。
+    """
+    inherit_cache = True
+    _traverse_internals = [('column', InternalTraversal.dp_clauseelement)]
+
+    def __init__(self, column):
+        self.column = column
+        self.key = column.key
+        self.type = column.type
+        self.nullable = getattr(column, 'nullable', True)
+
+
+@compiles(CodepointOrder)
+def _compile_codepoint_order(element, compiler, **kw):
+    # SQLite 默认的 BINARY 排序规则即按 UTF-8 字节（码位）比较
+    return compiler.process(element.column, **kw)
+
+
+@compiles(CodepointOrder, 'mysql')
+@compiles(CodepointOrder, 'mariadb')
+def _compile_codepoint_order_mysql(element, compiler, **kw):
+    return f'CAST({compiler.process(element.column, **kw)} AS BINARY)'
+
+
+@compiles(CodepointOrder, 'postgresql')
+def _compile_codepoint_order_postgresql(element, compiler, **kw):
+    return f'({compiler.process(element.column, **kw)} COLLATE "C")'
+
+
+def _seek_condition(columns, values, descending):
+    """构建 (c1, c2, ...) 位于游标之后的条件，NULL 始终排在最后"""
+    column, value = columns[0], values[0]
+
+    if value is None:
+        after = None
+        equal = column.is_(None)
+    else:
+        after = or_(column < value if descending else column > value, column.is_(None))
+        equal = column == value
+
+    if len(columns) == 1:
+        return after if after is not None else false()
+
+    rest = and_(equal, _seek_condition(columns[1:], values[1:], descending))
+    return or_(after, rest) if after is not None else rest
+
+
+def keyset_paginate(query, columns, cursor, limit, descending=True, with_total=False):
+    """游标分页：按 columns 排序，直接定位到游标之后的记录，避免 OFFSET 扫描
+
+    columns 的最后一列必须唯一（通常为主键）。返回 (items, pagination)。
+    """
+    limit = clamp_limit(limit)
+    count_query = query
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.filter(_seek_condition(columns, values, descending))
+
+    # MySQL 和 SQLite 在降序时都把 NULL 排在最后；升序时显式把 NULL 移到最后
+    ordering = []
+    for column in columns:
+        if descending:
+            ordering.append(column.desc())
+        else:
+            ordering.extend([column.is_(None), column.asc()])
+
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+    has_next = len(rows) > limit
+    items = rows[:limit]
+
+    next_cursor = None
+    if has_next and items:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+
+    pagination = {
+        'limit': limit,
+        'next_cursor': next_cursor,
+        'has_next': has_next
+    }
+    if with_total:
+        pagination['total'] = count_query.order_by(None).count()
+
+    return items, pagination
+
+
+def keyset_paginate_sorted(items, keys, columns, cursor, limit, with_total=False):
+    """对已按 keys 升序排好的内存列表做游标分页，游标格式与 keyset_paginate 升序时一致
+
+    keys 与 items 一一对应，为排序键元组；columns 仅用于解析游标。返回 (items, pagination)。
+    """
+    limit = clamp_limit(limit)
+    start = 0
+    if cursor:
+        start = bisect.bisect_right(keys, tuple(decode_cursor(cursor, columns)))
+
+    page = items[start:start + limit]
+    has_next = start + limit < len(items)
+    next_cursor = encode_cursor(list(keys[start + limit - 1])) if has_next and page else None
+
+    pagination = {
+        'limit': limit,
+        'next_cursor': next_cursor,
+        'has_next': has_next
+    }
+    if with_total:
+        pagination['total'] = len(items)
+
+    return page, pagination
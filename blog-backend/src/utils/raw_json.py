@@ -0,0 +1,43 @@
+import secrets
+from flask import current_app
+
+
+class RawJSON:
+    """已序列化且合法的 JSON 文本，dumps_raw 输出时原样拼接，不再解析和重新序列化"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+def _substitute(value, fragments, prefix):
+    # 将 RawJSON 替换为占位字符串，记录占位符与原始文本
+    if isinstance(value, RawJSON):
+        sentinel = f'{prefix}{len(fragments)}'
+        fragments.append((sentinel, value.text))
+        return sentinel
+    if isinstance(value, dict):
+        return {key: _substitute(item, fragments, prefix) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_substitute(item, fragments, prefix) for item in value]
+    return value
+
+
+def dumps_raw(payload):
+    """用应用的 JSON 提供者序列化 payload，其中的 RawJSON 片段直接拼接进结果
+
+    片段先替换为带随机前缀的占位字符串，序列化后再把带引号的占位符替换为原始文本，
+    序列化开销只与响应外层的大小有关，与内容文档的大小无关。
+    """
+    fragments = []
+    prefix = f'__raw_json_{secrets.token_hex(8)}_'
+    body = current_app.json.dumps(_substitute(payload, fragments, prefix))
+    for sentinel, text in fragments:
+        body = body.replace(f'"{sentinel}"', text, 1)
+    return body
+
+
+def jsonify_raw(payload):
+    """与 jsonify 相同的响应，支持 RawJSON 片段"""
+    return current_app.response_class(dumps_raw(payload) + '\n', mimetype=current_app.json.mimetype)
@@ -0,0 +1,95 @@
+from sqlalchemy import inspect, select, text
+from sqlalchemy.schema import AddConstraint
+from src.utils.tag_pages import backfill_tag_articles
+
+# 新增外键列的数据回填：在创建该列的索引和外键约束之前执行
+BACKFILLS = {
+    ('tags', 'article_id'): backfill_tag_articles
+}
+
+
+def upgrade_schema(db):
+    """为已有数据库补齐模型中新增的表、列、索引和外键
+
+    db.create_all() 只会创建不存在的表；已有表新增的列、索引和外键在这里通过
+    ALTER TABLE / CREATE INDEX 补齐，顺序为：新增列（一律按可空列添加）→ 回填数据 →
+    创建索引 → 清理悬空引用并添加外键约束。SQLite 不支持为已有表添加约束，跳过外键。
+    返回执行的变更说明列表。
+    """
+    engine = db.engine
+    changes = []
+
+    db.create_all()
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+
+    # 缺少外键约束的列：新增的列与之前升级时只添加了列的情况
+    supports_alter_constraint = engine.dialect.name != 'sqlite'
+    added_columns = set()
+    missing_foreign_keys = []
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f'ALTER TABLE {preparer.format_table(table)} '
+                    f'ADD COLUMN {preparer.format_column(column)} {column_type} NULL'
+                ))
+                added_columns.add((table.name, column.name))
+                changes.append(f'{table.name}.{column.name}: 新增列')
+
+            if supports_alter_constraint:
+                existing_foreign_keys = {
+                    tuple(foreign_key['constrained_columns']) for foreign_key in inspector.get_foreign_keys(table.name)
+                }
+                for constraint in table.foreign_key_constraints:
+                    if tuple(constraint.column_keys) not in existing_foreign_keys:
+                        missing_foreign_keys.append(constraint)
+
+    for (table_name, column_name), backfill in BACKFILLS.items():
+        if (table_name, column_name) in added_columns or any(
+            constraint.table.name == table_name and column_name in constraint.column_keys
+            for constraint in missing_foreign_keys
+        ):
+            count = backfill()
+            changes.append(f'{table_name}.{column_name}: 回填 {count} 行')
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                index.create(conn)
+                changes.append(f'{table.name}.{index.name}: 新增索引')
+
+        for constraint in missing_foreign_keys:
+            _clear_dangling_references(conn, constraint)
+            conn.execute(AddConstraint(constraint))
+            changes.append(f'{constraint.table.name}.{",".join(constraint.column_keys)}: 新增外键')
+
+    return changes
+
+
+def _clear_dangling_references(conn, constraint):
+    """添加外键前将指向已删除记录的可空外键列置空，否则约束无法创建"""
+    if len(constraint.elements) != 1:
+        return
+    element = constraint.elements[0]
+    column = element.parent
+    if not column.nullable:
+        return
+    table = constraint.table
+    # 保持 updated_at 等带 onupdate 的列不变
+    values = {other: other for other in table.columns if other.onupdate is not None}
+    values[column] = None
+    conn.execute(
+        table.update().where(
+            column.is_not(None),
+            column.not_in(select(element.column))
+        ).values(values)
+    )
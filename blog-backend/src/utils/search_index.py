@@ -0,0 +1,197 @@
+import math
+import re
+from collections import Counter
+from sqlalchemy import func, insert, delete, or_
+from src.models import db, Article, ArticleTerm, ArticleSearchDoc
+from src.utils.tiptap import extract_text
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+MAX_TERM_LENGTH = 64
+
+# 查询单词按前缀匹配索引词项：短于该长度的单词不走索引，单个前缀最多展开的词项数
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_EXPANSIONS = 50
+
+# CJK 统一表意文字（含扩展A区与兼容区）
+_CJK_RANGES = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_TOKEN_PATTERN = re.compile(
+    rf'(?P<cjk>[{_CJK_RANGES}]+)|(?P<word>[^\W_{_CJK_RANGES}]+)'
+)
+
+
+def tokenize(text, unigrams=True):
+    """分词：中文切分为单字和二元组（bigram），其他文字按单词切分并转为小写
+
+    unigrams=False 时多字中文只切分为二元组（查询时使用，比单字更有区分度），单字仍保留。
+    """
+    tokens = []
+    if not text:
+        return tokens
+
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        run = match.group('cjk')
+        if run:
+            if len(run) == 1:
+                tokens.append(run)
+                continue
+            if unigrams:
+                tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(match.group('word')[:MAX_TERM_LENGTH])
+    return tokens
+
+
+def _article_tokens(article):
+    """文章的索引词项：标题、摘要与正文文本"""
+    tokens = tokenize(article.title)
+    tokens.extend(tokenize(article.excerpt))
+    tokens.extend(tokenize(extract_text(article.get_content())))
+    return tokens
+
+
+def index_article(article):
+    """（重新）建立单篇文章的倒排索引，需在 flush 之后调用以获得文章ID"""
+    remove_article(article.id)
+
+    tokens = _article_tokens(article)
+    counts = Counter(tokens)
+    if counts:
+        db.session.execute(
+            insert(ArticleTerm),
+            [{'term': term, 'article_id': article.id, 'tf': tf} for term, tf in counts.items()]
+        )
+    db.session.execute(
+        insert(ArticleSearchDoc),
+        [{'article_id': article.id, 'length': len(tokens)}]
+    )
+
+
+def remove_article(article_id):
+    """删除单篇文章的索引"""
+    db.session.execute(delete(ArticleTerm).where(ArticleTerm.article_id == article_id))
+    db.session.execute(delete(ArticleSearchDoc).where(ArticleSearchDoc.article_id == article_id))
+
+
+def _query_terms(text):
+    """查询词项：[(词项, 是否按前缀匹配)]，中文按原词项匹配，其他文字的单词按前缀匹配"""
+    terms = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        run = match.group('cjk')
+        if run:
+            terms.extend((term, False) for term in tokenize(run, unigrams=False))
+        else:
+            terms.append((match.group('word')[:MAX_TERM_LENGTH], True))
+    return list(dict.fromkeys(terms))
+
+
+def _expand_terms(terms):
+    """将查询词项展开为索引中实际存在的词项，返回 {查询词项: [索引词项]}"""
+    groups = {}
+    for term, prefix in terms:
+        if prefix:
+            # term 是主键的首列，前缀匹配走索引范围扫描；单词不含 % 和 _，无需转义
+            rows = db.session.query(ArticleTerm.term).filter(
+                ArticleTerm.term.like(term + '%')
+            ).group_by(ArticleTerm.term).order_by(ArticleTerm.term).limit(MAX_PREFIX_EXPANSIONS)
+            groups[term] = [row.term for row in rows]
+        else:
+            groups[term] = [term]
+    return groups
+
+
+def _like_search(text, article_ids=None):
+    """子串匹配标题和摘要（索引无法处理的查询），按发布时间降序"""
+    query = db.session.query(Article.id).filter(
+        or_(
+            Article.title.contains(text, autoescape=True),
+            Article.excerpt.contains(text, autoescape=True)
+        )
+    )
+    if article_ids is not None:
+        query = query.filter(Article.id.in_(article_ids))
+    query = query.order_by(Article.published_at.desc(), Article.created_at.desc(), Article.id.desc())
+    return [(row.id, 0.0) for row in query]
+
+
+def search_articles(text, article_ids=None):
+    """按 BM25 相关度检索文章
+
+    要求文章包含查询的全部词项（单词按前缀匹配，与子串匹配的语义接近），article_ids 为可选的
+    候选文章ID子查询（已应用状态、用户、标签等筛选）。返回按得分降序的 [(article_id, score)]。
+
+    查询不含可索引的词项、含过短的单词（如单个字母），或索引中没有匹配的文章时，
+    回退到标题和摘要的子串匹配，得分为 0。
+    """
+    terms = _query_terms(text)
+    if not terms or any(prefix and len(term) < MIN_PREFIX_LENGTH for term, prefix in terms):
+        return _like_search(text, article_ids)
+
+    groups = _expand_terms(terms)
+    if not all(groups.values()):
+        return _like_search(text, article_ids)
+
+    # 索引词项 -> 对应的查询词项（一个索引词项可能同时匹配多个前缀）
+    owners = {}
+    for query_term, index_terms in groups.items():
+        for index_term in index_terms:
+            owners.setdefault(index_term, set()).add(query_term)
+
+    postings = db.session.query(
+        ArticleTerm.article_id, ArticleTerm.term, ArticleTerm.tf, ArticleSearchDoc.length
+    ).join(
+        ArticleSearchDoc, ArticleSearchDoc.article_id == ArticleTerm.article_id
+    ).filter(ArticleTerm.term.in_(owners))
+    if article_ids is not None:
+        postings = postings.filter(ArticleTerm.article_id.in_(article_ids))
+    postings = postings.all()
+
+    # 只保留包含全部查询词项的文章
+    matched = {}
+    for article_id, term, _, _ in postings:
+        matched.setdefault(article_id, set()).update(owners[term])
+    postings = [row for row in postings if len(matched[row.article_id]) == len(groups)]
+
+    if not postings:
+        return _like_search(text, article_ids)
+
+    # 语料统计
+    doc_count, avg_length = db.session.query(
+        func.count(ArticleSearchDoc.article_id), func.avg(ArticleSearchDoc.length)
+    ).one()
+    avg_length = float(avg_length or 1) or 1.0
+    doc_freq = dict(
+        db.session.query(ArticleTerm.term, func.count(ArticleTerm.article_id))
+        .filter(ArticleTerm.term.in_({row.term for row in postings}))
+        .group_by(ArticleTerm.term)
+        .all()
+    )
+
+    scores = {}
+    for article_id, term, tf, length in postings:
+        df = doc_freq.get(term, 0)
+        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+        scores[article_id] = scores.get(article_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+    return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+
+def rebuild_index(batch_size=200):
+    """重建全部文章的倒排索引，按批提交，返回处理的文章数"""
+    db.session.execute(delete(ArticleTerm))
+    db.session.execute(delete(ArticleSearchDoc))
+    db.session.commit()
+
+    article_ids = [row.id for row in db.session.query(Article.id).order_by(Article.id)]
+    for start in range(0, len(article_ids), batch_size):
+        batch = Article.query.filter(Article.id.in_(article_ids[start:start + batch_size])).all()
+        for article in batch:
+            index_article(article)
+        db.session.commit()
+        db.session.expunge_all()
+
+    return len(article_ids)
@@ -0,0 +1,248 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.models import Tag, TagRelation
+from src.utils.tag_layout import compute_layout
+
+# 会话中待失效的用户ID集合在 session.info 中的键
+SESSION_DIRTY_KEY = 'tag_graph_dirty_users'
+
+
+class TagGraph:
+    """单个用户标签DAG的内存快照：节点字典（不含作者）与邻接表"""
+    
+    def __init__(self, user_id, version, tags, relations):
+        self.user_id = user_id
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.nodes = {tag.id: tag.to_dict(include_author=False) for tag in tags}
+        self.relations = [
+            {
+                'id': relation.id,
+                'parent_tag_id': relation.parent_tag_id,
+                'child_tag_id': relation.child_tag_id,
+                'user_id': relation.user_id,
+                'created_at': relation.created_at
+            }
+            for relation in relations
+        ]
+        self._layout = None
+        self._sorted = None
+        self.parents = {}
+        self.children = {}
+        for relation in self.relations:
+            self.children.setdefault(relation['parent_tag_id'], []).append(relation['child_tag_id'])
+            self.parents.setdefault(relation['child_tag_id'], []).append(relation['parent_tag_id'])
+    
+    def _walk(self, tag_id, adjacency):
+        seen = {tag_id}
+        queue = deque([tag_id])
+        while queue:
+            for next_id in adjacency.get(queue.popleft(), ()):
+                if next_id not in seen:
+                    seen.add(next_id)
+                    queue.append(next_id)
+        return seen
+    
+    def descendant_ids(self, tag_id):
+        """标签及其全部后代标签的ID"""
+        return self._walk(tag_id, self.children)
+    
+    def ancestor_ids(self, tag_id):
+        """标签及其全部祖先标签的ID"""
+        return self._walk(tag_id, self.parents)
+    
+    def has_path(self, from_tag_id, to_tag_id):
+        """是否存在 from -> ... -> to 的路径（广度优先搜索）"""
+        if from_tag_id == to_tag_id:
+            return True
+        seen = {from_tag_id}
+        queue = deque([from_tag_id])
+        while queue:
+            for next_id in self.children.get(queue.popleft(), ()):
+                if next_id == to_tag_id:
+                    return True
+                if next_id not in seen:
+                    seen.add(next_id)
+                    queue.append(next_id)
+        return False
+    
+    def sorted_tags(self):
+        """按 (名称, ID) 排序的标签ID列表及对应的排序键，名称按码位比较，首次使用时计算"""
+        if self._sorted is None:
+            keys = sorted((node['name'], tag_id) for tag_id, node in self.nodes.items())
+            self._sorted = ([tag_id for _, tag_id in keys], keys)
+        return self._sorted
+    
+    def layout(self):
+        """分层布局坐标，首次请求时计算并随该版本的标签图一起缓存"""
+        if self._layout is None:
+            edges = [(relation['parent_tag_id'], relation['child_tag_id']) for relation in self.relations]
+            self._layout = compute_layout(self.nodes.keys(), edges)
+        return self._layout
+    
+    def node_dict(self, tag_id, author, include_author=True):
+        """渲染节点，作者信息由调用方统一提供"""
+        node = dict(self.nodes[tag_id])
+        if include_author:
+            node['author'] = author
+        return node
+    
+    def render(self, author):
+        """渲染为 get_tag_graph 的 {'nodes', 'edges'} 结构"""
+        nodes = {tag_id: self.node_dict(tag_id, author) for tag_id in self.nodes}
+        edges = []
+        for relation in self.relations:
+            edge = dict(relation)
+            edge['parent_tag'] = nodes.get(relation['parent_tag_id'])
+            edge['child_tag'] = nodes.get(relation['child_tag_id'])
+            edges.append(edge)
+        return {'nodes': list(nodes.values()), 'edges': edges}
+    
+    def render_compact(self, author):
+        """渲染为紧凑结构：节点只出现一次且不含作者，边为 [父标签ID, 子标签ID]"""
+        return {
+            'author': author,
+            'nodes': list(self.nodes.values()),
+            'edges': [[relation['parent_tag_id'], relation['child_tag_id']] for relation in self.relations],
+            'version': self.version
+        }
+
+
+class TagGraphCache:
+    """按用户缓存标签DAG，LRU淘汰；Tag/TagRelation 写入提交后移除对应用户的缓存
+    
+    版本号取自全局递增的失效计数：标签图的版本为开始加载时的计数，同一进程内单调递增。
+    加载期间该用户的缓存被失效时，读到的旧图不会写回缓存。只为正在加载的用户记录失效时刻，
+    内部状态的大小不超过缓存容量与并发加载数之和。
+    缓存只在当前进程内有效，多进程部署时依赖 TTL 兜底。
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._graphs = OrderedDict()
+        self._clock = 0
+        # 正在加载的用户：{用户ID: 并发加载数}，及加载期间最近一次失效时的计数
+        self._loading = {}
+        self._invalidated_at = {}
+        self.max_users = 128
+        self.ttl = 300
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def init_app(self, app):
+        """读取缓存容量与过期时间配置"""
+        self.max_users = app.config.get('TAG_GRAPH_CACHE_SIZE', self.max_users)
+        self.ttl = app.config.get('TAG_GRAPH_CACHE_TTL', self.ttl)
+    
+    def _fresh(self, user_id):
+        graph = self._graphs.get(user_id)
+        if graph is None:
+            return None
+        if time.monotonic() - graph.loaded_at > self.ttl:
+            del self._graphs[user_id]
+            return None
+        return graph
+    
+    def peek(self, user_id):
+        """仅在缓存命中时返回标签图，不触发加载"""
+        with self._lock:
+            graph = self._fresh(user_id)
+            if graph is not None:
+                self._graphs.move_to_end(user_id)
+                self.hits += 1
+            return graph
+    
+    def get(self, user_id):
+        """获取用户标签图，未命中时从数据库加载"""
+        graph = self.peek(user_id)
+        if graph is not None:
+            return graph
+        
+        with self._lock:
+            self.misses += 1
+            version = self._clock
+            self._loading[user_id] = self._loading.get(user_id, 0) + 1
+        
+        graph = None
+        try:
+            tags = Tag.query.filter_by(user_id=user_id).all()
+            relations = TagRelation.query.filter_by(user_id=user_id).order_by(TagRelation.id).all()
+            graph = TagGraph(user_id, version, tags, relations)
+        finally:
+            with self._lock:
+                stale = self._invalidated_at.get(user_id, -1) > version
+                self._loading[user_id] -= 1
+                if not self._loading[user_id]:
+                    del self._loading[user_id]
+                    self._invalidated_at.pop(user_id, None)
+                if graph is not None and not stale:
+                    self._graphs[user_id] = graph
+                    self._graphs.move_to_end(user_id)
+                    while len(self._graphs) > self.max_users:
+                        self._graphs.popitem(last=False)
+                        self.evictions += 1
+        return graph
+    
+    def invalidate(self, user_id):
+        """递增失效计数并移除该用户的缓存"""
+        with self._lock:
+            self._clock += 1
+            self._graphs.pop(user_id, None)
+            if user_id in self._loading:
+                self._invalidated_at[user_id] = self._clock
+            self.invalidations += 1
+    
+    def metrics(self):
+        """缓存命中与容量指标"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cached_users': len(self._graphs),
+                'max_users': self.max_users,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+def _changed_user_ids(session):
+    """会话中新增、修改、删除的 Tag/TagRelation 所属用户"""
+    user_ids = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, (Tag, TagRelation)) and obj.user_id is not None:
+            user_ids.add(obj.user_id)
+    for obj in session.dirty:
+        # 仅关联集合变化（如文章打标签）不影响标签图
+        if isinstance(obj, (Tag, TagRelation)) and session.is_modified(obj, include_collections=False):
+            user_ids.add(obj.user_id)
+    return user_ids
+
+
+tag_graph_cache = TagGraphCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_tag_graph_changes(session, flush_context):
+    # after_flush 时 new/dirty/deleted 仍为刷新前的状态
+    user_ids = _changed_user_ids(session)
+    if user_ids:
+        session.info.setdefault(SESSION_DIRTY_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_tag_graphs(session):
+    for user_id in session.info.pop(SESSION_DIRTY_KEY, ()):
+        tag_graph_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_tag_graph_changes(session):
+    session.info.pop(SESSION_DIRTY_KEY, None)
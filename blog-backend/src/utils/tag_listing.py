@@ -0,0 +1,64 @@
+from sqlalchemy import or_
+from src.models import db, Tag, TagRelation, User
+from src.utils.pagination import CodepointOrder, keyset_paginate, keyset_paginate_sorted
+from src.utils.tag_graph_cache import tag_graph_cache
+
+# 标签列表按 (名称, ID) 升序分页；名称按码位比较，数据库查询与缓存中的有序列表顺序一致，游标可互换
+SORT_COLUMNS = [CodepointOrder(Tag.name), Tag.id]
+
+
+def list_user_tags(user_id, fieldset, cursor=None, limit=None, with_total=False):
+    """从缓存的有序标签列表序列化用户的标签，作者信息只加载一次
+
+    cursor 为 None 时返回全部标签，否则按 (名称, ID) 游标分页；返回 (标签列表, 分页信息或 None)。
+    游标无效时抛出 ValueError。
+    """
+    graph = tag_graph_cache.get(user_id)
+    tag_ids, keys = graph.sorted_tags()
+    pagination = None
+    if cursor is not None:
+        tag_ids, pagination = keyset_paginate_sorted(tag_ids, keys, SORT_COLUMNS, cursor, limit, with_total)
+
+    with_author = fieldset.expands('author')
+    author = None
+    if with_author and tag_ids:
+        user = db.session.get(User, user_id)
+        author = user.to_dict(fieldset=fieldset.nested('author')) if user else None
+
+    return [fieldset.apply(graph.node_dict(tag_id, author, with_author)) for tag_id in tag_ids], pagination
+
+
+def query_tags(fieldset, cursor=None, limit=None, with_total=False, user_id=None, parent_id=None, search='',
+               search_description=True):
+    """从数据库查询标签列表，cursor 不为 None 时按 (名称, ID) 游标分页；返回 (标签列表, 分页信息或 None)
+
+    游标无效时抛出 ValueError。
+    """
+    query = Tag.query.options(*Tag.list_loader_options(fieldset))
+
+    if user_id:
+        query = query.filter(Tag.user_id == user_id)
+
+    # 父标签筛选：与标签关系表连接，(parent_tag_id, child_tag_id) 唯一，不会产生重复行
+    if parent_id:
+        query = query.join(TagRelation, TagRelation.child_tag_id == Tag.id).filter(
+            TagRelation.parent_tag_id == parent_id
+        )
+
+    if search and search_description:
+        query = query.filter(
+            or_(
+                Tag.name.contains(search),
+                Tag.description.contains(search)
+            )
+        )
+    elif search:
+        query = query.filter(Tag.name.contains(search))
+
+    pagination = None
+    if cursor is not None:
+        tags, pagination = keyset_paginate(query, SORT_COLUMNS, cursor, limit, descending=False, with_total=with_total)
+    else:
+        tags = query.order_by(*SORT_COLUMNS).all()
+
+    return [tag.to_dict(fieldset=fieldset) for tag in tags], pagination
@@ -0,0 +1,41 @@
+from sqlalchemy import select, func, bindparam, and_
+from src.models import db, Article, Tag, article_tags
+
+
+def find_tag_article(tag):
+    """获取标签对应的标签文章：已回填 article_id 时按主键获取，否则回退到按关联表查找"""
+    if tag.article_id is not None:
+        article = tag.article
+        if article is not None:
+            return article
+    return Article.query.filter_by(
+        user_id=tag.user_id,
+        is_tag_article=True
+    ).filter(Article.tags.any(Tag.id == tag.id)).order_by(Article.id).first()
+
+
+def backfill_tag_articles(batch_size=500):
+    """为 article_id 为空的标签回填标签文章外键，返回回填的标签数"""
+    stmt = select(Tag.id, func.min(Article.id)).join(
+        article_tags, article_tags.c.tag_id == Tag.id
+    ).join(
+        Article, and_(Article.id == article_tags.c.article_id, Article.user_id == Tag.user_id)
+    ).where(
+        Tag.article_id.is_(None), Article.is_tag_article.is_(True)
+    ).group_by(Tag.id)
+    rows = [
+        {'tag_id': tag_id, 'new_article_id': article_id}
+        for tag_id, article_id in db.session.execute(stmt).all()
+    ]
+
+    table = Tag.__table__
+    update = table.update().where(
+        table.c.id == bindparam('tag_id')
+    ).values({
+        'article_id': bindparam('new_article_id'),
+        'updated_at': table.c.updated_at
+    })
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(update, rows[start:start + batch_size])
+        db.session.commit()
+    return len(rows)
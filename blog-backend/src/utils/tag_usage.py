@@ -0,0 +1,146 @@
+from sqlalchemy import event, inspect, select, func, bindparam
+from sqlalchemy.orm import Session
+from src.models import db, Article, Roadmap, Mindmap, Tag, article_tags, roadmap_tags, mindmap_tags
+
+# 标签关联的内容类型：(模型, 关联表, 关联表中的内容ID列, 标签上的计数列)
+TAGGED_CONTENT = (
+    (Article, article_tags, article_tags.c.article_id, 'article_count'),
+    (Roadmap, roadmap_tags, roadmap_tags.c.roadmap_id, 'roadmap_count'),
+    (Mindmap, mindmap_tags, mindmap_tags.c.mindmap_id, 'mindmap_count'),
+)
+
+COUNTER_COLUMNS = {model: column for model, _, _, column in TAGGED_CONTENT}
+
+
+def _is_published(status):
+    return status == 'published'
+
+
+def _status_change(state):
+    """返回 (刷新前状态, 刷新后状态)"""
+    history = state.attrs.status.history
+    after = state.obj().status
+    if history.deleted:
+        return history.deleted[0], after
+    return after, after
+
+
+def _tag_change(state):
+    """返回 (刷新前标签集合, 刷新后标签集合)，调用前 tags 集合须已加载"""
+    history = state.attrs.tags.history
+    unchanged = list(history.unchanged)
+    return unchanged + list(history.deleted), unchanged + list(history.added)
+
+
+def _needs_tags(state, deleted):
+    """内容被删除或发布状态变化时需要完整的标签集合"""
+    if deleted:
+        return True
+    before, after = _status_change(state)
+    return _is_published(before) != _is_published(after)
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_changed_content_tags(session, flush_context, instances):
+    # 刷新后已无法从数据库读到旧的关联，先加载将要变化的内容的标签集合
+    with session.no_autoflush:
+        changes = [(obj, False) for obj in session.dirty] + [(obj, True) for obj in session.deleted]
+        for obj, deleted in changes:
+            if type(obj) not in COUNTER_COLUMNS:
+                continue
+            state = inspect(obj)
+            if 'tags' in state.unloaded and _needs_tags(state, deleted):
+                obj.tags
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_tag_usage_changes(session, flush_context):
+    # after_flush 时对象的属性历史仍为刷新前的状态
+    deltas = {}
+    changes = (
+        [(obj, False) for obj in session.new]
+        + [(obj, False) for obj in session.dirty]
+        + [(obj, True) for obj in session.deleted]
+    )
+    for obj, deleted in changes:
+        column = COUNTER_COLUMNS.get(type(obj))
+        if column is None:
+            continue
+        state = inspect(obj)
+        if 'tags' in state.unloaded:
+            continue
+
+        before_status, after_status = _status_change(state)
+        before_tags, after_tags = _tag_change(state)
+        if obj in session.new:
+            before_status, before_tags = None, []
+        if deleted:
+            after_status, after_tags = None, []
+
+        for tag in before_tags if _is_published(before_status) else ():
+            key = (column, tag.id)
+            deltas[key] = deltas.get(key, 0) - 1
+        for tag in after_tags if _is_published(after_status) else ():
+            key = (column, tag.id)
+            deltas[key] = deltas.get(key, 0) + 1
+
+    apply_usage_deltas(session.connection(), deltas)
+
+
+def apply_usage_deltas(connection, deltas):
+    """按 {(计数列, 标签ID): 增量} 批量更新标签计数，保留 updated_at"""
+    table = Tag.__table__
+    for column in COUNTER_COLUMNS.values():
+        rows = [
+            {'tag_id': tag_id, 'delta': delta}
+            for (counter, tag_id), delta in deltas.items()
+            if counter == column and delta and tag_id is not None
+        ]
+        if not rows:
+            continue
+        stmt = table.update().where(
+            table.c.id == bindparam('tag_id')
+        ).values({
+            column: func.coalesce(table.c[column], 0) + bindparam('delta'),
+            'updated_at': table.c.updated_at
+        })
+        connection.execute(stmt, rows)
+
+
+def count_published_usage(tag_ids=None):
+    """从关联表统计已发布内容数量，返回 {标签ID: {计数列: 数量}}；tag_ids 为空时统计全部标签"""
+    counts = {}
+    for model, table, content_id, column in TAGGED_CONTENT:
+        stmt = select(table.c.tag_id, func.count()).join(
+            model, model.id == content_id
+        ).where(model.status == 'published').group_by(table.c.tag_id)
+        if tag_ids is not None:
+            stmt = stmt.where(table.c.tag_id.in_(tag_ids))
+        for tag_id, count in db.session.execute(stmt).all():
+            counts.setdefault(tag_id, {})[column] = count
+    return counts
+
+
+def reconcile_usage(batch_size=500):
+    """按关联表重新统计全部标签的使用计数，只更新不一致的标签，返回修正的标签数"""
+    counts = count_published_usage()
+    columns = list(COUNTER_COLUMNS.values())
+    table = Tag.__table__
+    fixed = []
+
+    for row in db.session.execute(select(table.c.id, *[table.c[column] for column in columns])):
+        expected = counts.get(row.id, {})
+        values = {column: expected.get(column, 0) for column in columns}
+        if any(getattr(row, column) != value for column, value in values.items()):
+            fixed.append({'tag_id': row.id, **{f'new_{column}': value for column, value in values.items()}})
+
+    stmt = table.update().where(
+        table.c.id == bindparam('tag_id')
+    ).values({
+        **{column: bindparam(f'new_{column}') for column in columns},
+        'updated_at': table.c.updated_at
+    })
+    for start in range(0, len(fixed), batch_size):
+        db.session.execute(stmt, fixed[start:start + batch_size])
+        db.session.commit()
+    return len(fixed)
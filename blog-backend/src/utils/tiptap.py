@@ -0,0 +1,282 @@
+# TipTap 文档工具：在不依赖前端的情况下遍历和渲染 TipTap JSON
+import html
+import math
+import re
+
+
+def iter_text(doc):
+    """按文档顺序逐段产出 TipTap 文档中的文本
+
+    内联文本节点直接产出，块级节点结束时产出换行，保证相邻段落的文字不会被拼接在一起。
+    使用显式栈遍历，避免深层嵌套时触发递归上限。
+    """
+    if not isinstance(doc, dict):
+        return
+
+    stack = [doc]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            yield '\n'
+            continue
+        if not isinstance(node, dict):
+            continue
+
+        node_type = node.get('type')
+        if node_type == 'text':
+            text = node.get('text')
+            if text:
+                yield text
+            continue
+        if node_type == 'hardBreak':
+            yield '\n'
+            continue
+
+        children = node.get('content')
+        if isinstance(children, list) and children:
+            # None 作为块结束标记，子节点逆序入栈以保持文档顺序
+            stack.append(None)
+            stack.extend(reversed(children))
+
+
+def extract_text(doc):
+    """提取 TipTap 文档的纯文本"""
+    return ''.join(iter_text(doc))
+
+
+# ---- 摘要与阅读统计 ----
+
+# 阅读速度：中文每分钟约400字，英文每分钟约200词
+CJK_CHARS_PER_MINUTE = 400
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 150
+
+_CJK_PATTERN = re.compile('[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+_WORD_PATTERN = re.compile('[^\\W_\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_SPACE_PATTERN = re.compile(r'\s+')
+
+
+def analyze(doc, excerpt_length=EXCERPT_LENGTH):
+    """单次遍历文档，得到摘要、字符数、字数和预计阅读分钟数
+
+    字符数不含空白；字数中每个汉字计一个字，其他文字按单词计数。
+    """
+    excerpt_parts = []
+    excerpt_size = 0
+    char_count = 0
+    cjk_count = 0
+    latin_words = 0
+    prev_word_tail = False
+
+    for piece in iter_text(doc):
+        if excerpt_size < excerpt_length:
+            normalized = _SPACE_PATTERN.sub(' ', piece)
+            excerpt_parts.append(normalized)
+            excerpt_size += len(normalized)
+
+        char_count += len(piece) - sum(1 for ch in piece if ch.isspace())
+        cjk_count += len(_CJK_PATTERN.findall(piece))
+
+        words = _WORD_PATTERN.findall(piece)
+        latin_words += len(words)
+        # 被标记拆开的同一个单词（如部分加粗）只计一次
+        if words and prev_word_tail and _WORD_PATTERN.match(piece):
+            latin_words -= 1
+        prev_word_tail = bool(piece) and _WORD_PATTERN.match(piece[-1]) is not None
+
+    excerpt = _SPACE_PATTERN.sub(' ', ''.join(excerpt_parts)).strip()
+    if len(excerpt) > excerpt_length:
+        excerpt = excerpt[:excerpt_length].rstrip() + '…'
+
+    word_count = cjk_count + latin_words
+    minutes = cjk_count / CJK_CHARS_PER_MINUTE + latin_words / WORDS_PER_MINUTE
+    reading_time = max(1, math.ceil(minutes)) if word_count else 0
+
+    return {
+        'excerpt': excerpt,
+        'char_count': char_count,
+        'word_count': word_count,
+        'reading_time': reading_time
+    }
+
+
+# ---- HTML 渲染 ----
+
+_BLOCK_TAGS = {
+    'paragraph': 'p',
+    'blockquote': 'blockquote',
+    'bulletList': 'ul',
+    'orderedList': 'ol',
+    'listItem': 'li'
+}
+
+_SIMPLE_MARKS = {
+    'bold': 'strong',
+    'italic': 'em',
+    'underline': 'u',
+    'strike': 's',
+    'code': 'code',
+    'subscript': 'sub',
+    'superscript': 'sup'
+}
+
+_SAFE_URL_SCHEMES = ('http:', 'https:', 'mailto:', 'tel:', '/', '#', './', '../')
+
+
+def _escape(value):
+    return html.escape(str(value), quote=True)
+
+
+def _safe_url(url):
+    """过滤 javascript: 等危险链接"""
+    if not isinstance(url, str):
+        return None
+    stripped = url.strip()
+    lowered = stripped.lower()
+    if lowered.startswith(_SAFE_URL_SCHEMES) or ':' not in lowered.split('/', 1)[0]:
+        return stripped
+    if lowered.startswith('data:image/'):
+        return stripped
+    return None
+
+
+# 样式属性只接受以下格式的值，防止注入任意 CSS（如 "red; background: url(...)"）
+_CSS_COLOR_PATTERN = re.compile(
+    r'#[0-9a-f]{3,8}|[a-z]+|(?:rgb|rgba|hsl|hsla)\(\s*[0-9.%]+(?:\s*[,/ ]\s*[0-9.%]+){2,3}\s*\)',
+    re.IGNORECASE
+)
+_CSS_LENGTH_PATTERN = re.compile(r'\d+(?:\.\d+)?(?:px|%|em|rem)')
+
+
+def _safe_css(value, pattern):
+    """校验样式属性值，不合法时返回 None"""
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    return value if pattern.fullmatch(value) else None
+
+
+def _attrs_html(attrs):
+    """将属性字典渲染为 HTML 属性字符串，忽略值为 None 的属性"""
+    parts = []
+    for name, value in attrs.items():
+        if value is None or value is False:
+            continue
+        if value is True or value == '':
+            parts.append(f' {name}')
+        else:
+            parts.append(f' {name}="{_escape(value)}"')
+    return ''.join(parts)
+
+
+def _align_style(attrs):
+    align = attrs.get('textAlign')
+    if align and align != 'left' and align in ('center', 'right', 'justify'):
+        return f'text-align: {align}'
+    return None
+
+
+def _render_marks(text, marks):
+    """按标记由内向外包裹文本"""
+    result = _escape(text)
+    for mark in reversed(marks or []):
+        if not isinstance(mark, dict):
+            continue
+        mark_type = mark.get('type')
+        attrs = mark.get('attrs') or {}
+        if mark_type in _SIMPLE_MARKS:
+            tag = _SIMPLE_MARKS[mark_type]
+            result = f'<{tag}>{result}</{tag}>'
+        elif mark_type == 'link':
+            link_attrs = {
+                'href': _safe_url(attrs.get('href')),
+                'target': attrs.get('target'),
+                'rel': attrs.get('rel') or ('noopener noreferrer nofollow' if attrs.get('target') else None)
+            }
+            result = f'<a{_attrs_html(link_attrs)}>{result}</a>'
+        elif mark_type == 'highlight':
+            color = _safe_css(attrs.get('color'), _CSS_COLOR_PATTERN)
+            style = f'background-color: {color}' if color else None
+            result = f'<mark{_attrs_html({"style": style})}>{result}</mark>'
+        elif mark_type == 'textStyle':
+            color = _safe_css(attrs.get('color'), _CSS_COLOR_PATTERN)
+            if color:
+                result = f'<span{_attrs_html({"style": f"color: {color}"})}>{result}</span>'
+    return result
+
+
+def _open_node(node, out):
+    """输出节点的开始标签（叶子节点输出完整HTML），返回 (需要渲染的子节点, 结束标签)"""
+    node_type = node.get('type')
+    attrs = node.get('attrs') or {}
+    children = node.get('content') if isinstance(node.get('content'), list) else []
+
+    if node_type == 'text':
+        out.append(_render_marks(node.get('text', ''), node.get('marks')))
+    elif node_type == 'doc':
+        return children, ''
+    elif node_type == 'heading':
+        level = attrs.get('level', 1)
+        level = level if level in (1, 2, 3, 4, 5, 6) else 1
+        out.append(f'<h{level}{_attrs_html({"style": _align_style(attrs)})}>')
+        return children, f'</h{level}>'
+    elif node_type == 'codeBlock':
+        language = attrs.get('language')
+        code_attrs = {'class': f'language-{language}' if language else None}
+        code = ''.join(child.get('text', '') for child in children if isinstance(child, dict))
+        out.append(f'<pre><code{_attrs_html(code_attrs)}>{_escape(code)}</code></pre>')
+    elif node_type in ('image', 'inlineImage'):
+        image_attrs = {
+            'src': _safe_url(attrs.get('src')),
+            'alt': attrs.get('alt'),
+            'title': attrs.get('title')
+        }
+        if node_type == 'inlineImage':
+            width = _safe_css(attrs.get('width'), _CSS_LENGTH_PATTERN)
+            image_attrs['style'] = f'width: {width}' if width else None
+            image_attrs['data-inline-image'] = ''
+        out.append(f'<img{_attrs_html(image_attrs)}>')
+    elif node_type == 'hardBreak':
+        out.append('<br>')
+    elif node_type == 'horizontalRule':
+        out.append('<hr>')
+    elif node_type in ('inlineMath', 'blockMath'):
+        tag = 'span' if node_type == 'inlineMath' else 'div'
+        latex = attrs.get('latex', '')
+        out.append(f'<{tag}{_attrs_html({"data-type": node_type, "data-latex": latex})}>{_escape(latex)}</{tag}>')
+    elif node_type in _BLOCK_TAGS:
+        tag = _BLOCK_TAGS[node_type]
+        block_attrs = {}
+        if node_type == 'paragraph':
+            block_attrs['style'] = _align_style(attrs)
+        elif node_type == 'orderedList':
+            start = attrs.get('start')
+            block_attrs['start'] = start if isinstance(start, int) and start != 1 else None
+        out.append(f'<{tag}{_attrs_html(block_attrs)}>')
+        return children, f'</{tag}>'
+    else:
+        # 未知节点：保留其子内容
+        return children, ''
+    return (), ''
+
+
+def render_html(doc):
+    """将 TipTap JSON 文档渲染为 HTML，输出与前端 TipTap 的 getHTML() 保持一致的结构
+
+    与 iter_text 相同使用显式栈遍历，深层嵌套的文档不会触发递归上限。
+    """
+    out = []
+    stack = [doc]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, tuple):
+            # 结束标签，包装为元组以区别于内容中的非法字符串节点
+            out.append(node[0])
+            continue
+        if not isinstance(node, dict):
+            continue
+        children, closing = _open_node(node, out)
+        if closing:
+            stack.append((closing,))
+        stack.extend(reversed(children))
+    return ''.join(out)
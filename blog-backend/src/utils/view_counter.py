@@ -0,0 +1,166 @@
+import atexit
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import bindparam, func
+from src.models import db, Article, Roadmap, Mindmap
+
+# 浏览量计数支持的内容类型
+COUNTED_MODELS = {
+    'article': Article,
+    'roadmap': Roadmap,
+    'mindmap': Mindmap
+}
+
+
+class ViewCounterBuffer:
+    """浏览量写回缓冲：在内存中按 (类型, ID) 累加，定时或达到阈值时批量写入数据库"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_total = 0
+        # 正在写入数据库的一批计数，写入完成前仍计入 pending()
+        self._flushing = {}
+        self._flush_lock = threading.Lock()
+        self._app = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._last_flush = time.monotonic()
+        self.flush_interval = 30
+        self.flush_threshold = 100
+        self.flush_count = 0
+        self.flushed_total = 0
+        self.last_flush_at = None
+        self.last_error = None
+    
+    def init_app(self, app):
+        """绑定应用，启动定时刷新线程并在进程退出时刷新"""
+        self._app = app
+        self.flush_interval = app.config.get('VIEW_COUNTER_FLUSH_INTERVAL', self.flush_interval)
+        self.flush_threshold = app.config.get('VIEW_COUNTER_FLUSH_THRESHOLD', self.flush_threshold)
+        
+        thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+        thread.start()
+        atexit.register(self.shutdown)
+    
+    def _run(self):
+        # 定时刷新；达到阈值时由 increment 唤醒，写库始终在后台线程中进行
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self.flush()
+    
+    def increment(self, kind, item_id, amount=1):
+        """记录一次浏览，达到阈值或间隔时只唤醒后台线程刷新，不在请求线程中写库"""
+        with self._lock:
+            key = (kind, item_id)
+            self._pending[key] = self._pending.get(key, 0) + amount
+            self._pending_total += amount
+            due = (
+                self._pending_total >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        
+        if due:
+            self._wake.set()
+    
+    def pending(self, kind, item_id):
+        """尚未写入数据库的浏览量（含正在写入的一批）"""
+        key = (kind, item_id)
+        with self._lock:
+            return self._pending.get(key, 0) + self._flushing.get(key, 0)
+    
+    def flush(self):
+        """将缓冲的浏览量合并为每种类型一条批量 UPDATE，返回写入的浏览次数"""
+        with self._flush_lock:
+            return self._flush()
+    
+    def _flush(self):
+        with self._lock:
+            batch = self._pending
+            self._pending = {}
+            self._pending_total = 0
+            self._last_flush = time.monotonic()
+            if batch and self._app is not None:
+                self._flushing = batch
+        
+        if not batch:
+            return 0
+        if self._app is None:
+            # 未绑定应用时无法写入，计数留在缓冲中
+            with self._lock:
+                self._restore(batch)
+            return 0
+        
+        try:
+            with self._app.app_context():
+                with db.engine.begin() as conn:
+                    for kind, model in COUNTED_MODELS.items():
+                        rows = [
+                            {'item_id': item_id, 'increment': amount}
+                            for (item_kind, item_id), amount in batch.items()
+                            if item_kind == kind
+                        ]
+                        if not rows:
+                            continue
+                        table = model.__table__
+                        # 显式保留 updated_at，浏览量变化不算内容更新
+                        stmt = table.update().where(
+                            table.c.id == bindparam('item_id')
+                        ).values(
+                            view_count=func.coalesce(table.c.view_count, 0) + bindparam('increment'),
+                            updated_at=table.c.updated_at
+                        )
+                        conn.execute(stmt, rows)
+        except Exception as e:
+            # 写入失败时放回缓冲，等待下次刷新
+            with self._lock:
+                self._flushing = {}
+                self._restore(batch)
+            self.last_error = str(e)
+            return 0
+        
+        flushed = sum(batch.values())
+        with self._lock:
+            self._flushing = {}
+            self.flush_count += 1
+            self.flushed_total += flushed
+            self.last_flush_at = datetime.utcnow()
+            self.last_error = None
+        return flushed
+    
+    def _restore(self, batch):
+        # 调用方持有 self._lock
+        for key, amount in batch.items():
+            self._pending[key] = self._pending.get(key, 0) + amount
+            self._pending_total += amount
+    
+    def shutdown(self):
+        """停止定时线程并刷新剩余计数"""
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+    
+    def metrics(self):
+        """缓冲状态指标"""
+        with self._lock:
+            by_kind = {kind: 0 for kind in COUNTED_MODELS}
+            for (kind, _), amount in self._pending.items():
+                by_kind[kind] = by_kind.get(kind, 0) + amount
+            return {
+                'pending_total': self._pending_total,
+                'pending_items': len(self._pending),
+                'pending_by_type': by_kind,
+                'flush_interval': self.flush_interval,
+                'flush_threshold': self.flush_threshold,
+                'flush_count': self.flush_count,
+                'flushed_total': self.flushed_total,
+                'last_flush_at': self.last_flush_at.isoformat() if self.last_flush_at else None,
+                'last_error': self.last_error
+            }
+
+
+view_counter = ViewCounterBuffer()
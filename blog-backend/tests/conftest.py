@@ -0,0 +1,62 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager
+
+from src.models import db
+from src.routes.article import article_bp
+from src.routes.roadmap import roadmap_bp
+from src.routes.mindmap import mindmap_bp
+from src.routes.tag import tag_bp
+from src.utils.json_provider import FastJSONProvider
+from src.utils import tag_usage  # noqa: F401  注册维护标签使用计数的会话事件
+from src.utils import mindmap_nodes  # noqa: F401  注册同步思维导图节点表的会话事件
+
+
+@pytest.fixture
+def app():
+    """使用内存 SQLite 的测试应用（src.main 在导入时会连接配置的 MySQL，测试中不直接导入）"""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY='test-secret-key-for-the-test-suite',
+        JWT_SECRET_KEY='test-jwt-secret-key-for-the-test-suite',
+        SQLALCHEMY_DATABASE_URI='sqlite://',
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    JWTManager(app)
+    db.init_app(app)
+    app.register_blueprint(article_bp, url_prefix='/api/articles')
+    app.register_blueprint(roadmap_bp, url_prefix='/api/roadmaps')
+    app.register_blueprint(mindmap_bp, url_prefix='/api/mindmaps')
+    app.register_blueprint(tag_bp, url_prefix='/api/tags')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    from src.models import User
+    user = User(username='tester', email='tester@example.com', password_hash='x', display_name='测试用户')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(user):
+    from flask_jwt_extended import create_access_token
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
@@ -0,0 +1,81 @@
+import base64
+import zlib
+
+import pytest
+
+from src.utils import content_codec
+from src.utils.content_codec import (
+    MIN_COMPRESS_LENGTH, ZLIB_MARKER, ZSTD_MARKER, compression_mode, decode_content, encode_content, stored_mode
+)
+
+DOCUMENT = '{"type":"doc","content":[' + ','.join(['{"type":"paragraph","content":[{"type":"text","text":"重复的段落"}]}'] * 40) + ']}'
+
+
+def test_default_mode_is_none(app):
+    assert compression_mode() == 'none'
+    assert encode_content(DOCUMENT) == DOCUMENT
+
+
+def test_zlib_round_trip():
+    encoded = encode_content(DOCUMENT, 'zlib')
+    assert encoded.startswith(ZLIB_MARKER)
+    assert len(encoded) < len(DOCUMENT.encode('utf-8'))
+    assert stored_mode(encoded) == 'zlib'
+    assert decode_content(encoded) == DOCUMENT
+
+
+def test_short_content_is_kept_as_is():
+    text = '{"type":"doc"}'
+    assert len(text) < MIN_COMPRESS_LENGTH
+    assert encode_content(text, 'zlib') == text
+
+
+@pytest.mark.parametrize('stored', [
+    None,
+    '',
+    'plain legacy text',
+    '{"type":"doc","content":[]}',
+    '~ not a marker',
+])
+def test_plain_legacy_content_is_returned_unchanged(stored):
+    assert decode_content(stored) == stored
+    assert stored_mode(stored) == 'none'
+
+
+@pytest.mark.parametrize('stored', [
+    '~z: legacy text that happens to start with the marker',
+    ZLIB_MARKER + '!!!not base64!!!',
+    ZLIB_MARKER + base64.b64encode(b'not zlib data').decode('ascii'),
+    ZLIB_MARKER + base64.b64encode(zlib.compress(DOCUMENT.encode('utf-8')))[:-12].decode('ascii'),  # 截断
+    ZLIB_MARKER + base64.b64encode(zlib.compress(b'\xff\xfe invalid utf-8')).decode('ascii'),
+])
+def test_undecodable_marked_content_is_returned_unchanged(stored):
+    assert decode_content(stored) == stored
+
+
+def test_zstd_falls_back_to_zlib_when_not_installed(app, monkeypatch):
+    monkeypatch.setattr(content_codec, 'zstandard', None)
+    app.config['CONTENT_COMPRESSION'] = 'zstd'
+    assert compression_mode() == 'zlib'
+    assert encode_content(DOCUMENT, 'zstd').startswith(ZLIB_MARKER)
+
+
+def test_zstd_content_without_zstandard_raises(monkeypatch):
+    monkeypatch.setattr(content_codec, 'zstandard', None)
+    with pytest.raises(RuntimeError):
+        decode_content(ZSTD_MARKER + base64.b64encode(b'payload').decode('ascii'))
+
+
+def test_model_reads_compressed_and_legacy_content(app, user):
+    from src.models import db, Article
+    app.config['CONTENT_COMPRESSION'] = 'zlib'
+    article = Article(user_id=user.id, title='标题')
+    article.set_content({'type': 'doc', 'content': [{'type': 'paragraph', 'content': [{'type': 'text', 'text': '内容' * 200}]}]})
+    db.session.add(article)
+    db.session.commit()
+    assert stored_mode(article.content) == 'zlib'
+    assert article.get_content()['content'][0]['content'][0]['text'] == '内容' * 200
+
+    article.content = '~z: legacy text'
+    db.session.commit()
+    assert article.get_content() == {}
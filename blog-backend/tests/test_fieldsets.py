@@ -0,0 +1,85 @@
+from werkzeug.datastructures import MultiDict
+
+from src.models import db, Article, Tag
+from src.utils.fieldsets import DEFAULT_FIELDSET, FieldSet
+
+
+def _from(**args):
+    return FieldSet.from_request(MultiDict(args))
+
+
+def test_no_parameters_returns_default_fieldset():
+    fieldset = _from()
+    assert fieldset is DEFAULT_FIELDSET
+    assert fieldset.is_default
+    assert fieldset.includes('anything')
+    assert fieldset.expands('author') and fieldset.expands('tags')
+    assert fieldset.nested('tags') is DEFAULT_FIELDSET
+    assert fieldset.cache_key() == ''
+    assert fieldset.apply({'id': 1, 'x': 2}) == {'id': 1, 'x': 2}
+
+
+def test_fields_keep_id_and_drop_unknown_fields():
+    fieldset = _from(fields='title, unknown ,,')
+    assert fieldset.fields == {'title', 'unknown'}
+    assert fieldset.apply({'id': 1, 'title': 't', 'excerpt': 'e'}) == {'id': 1, 'title': 't'}
+    assert fieldset.includes('id') and not fieldset.includes('excerpt')
+    # 未知字段不会报错，也不会产生输出
+    assert 'unknown' not in fieldset.apply({'id': 1})
+
+
+def test_fields_only_does_not_expand_unlisted_relations():
+    fieldset = _from(fields='id,title')
+    assert not fieldset.is_default
+    assert not fieldset.expands('author')
+    assert not fieldset.expands('tags')
+
+
+def test_listed_relation_is_expanded():
+    fieldset = _from(fields='title,author')
+    assert fieldset.expands('author')
+    assert not fieldset.expands('tags')
+    assert fieldset.apply({'id': 1, 'title': 't', 'author': {}, 'tags': []}) == {'id': 1, 'title': 't', 'author': {}}
+
+
+def test_nested_tags_author_selection():
+    fieldset = _from(expand='tags.author')
+    assert fieldset.includes('title')
+    assert fieldset.expands('tags') and not fieldset.expands('author')
+
+    tags = fieldset.nested('tags')
+    assert tags.expands('author')
+    assert not tags.nested('author').expands('anything')
+
+    # 只写 tags 时不展开标签的作者
+    assert not _from(expand='tags').nested('tags').expands('author')
+
+
+def test_expanded_relation_survives_field_filter():
+    fieldset = _from(fields='title', expand='tags.author')
+    assert fieldset.apply({'id': 1, 'title': 't', 'tags': [], 'excerpt': 'e'}) == {'id': 1, 'title': 't', 'tags': []}
+
+
+def test_cache_key_is_canonical():
+    first = _from(fields='title,id', expand='tags.author,author')
+    second = _from(fields='id, title', expand='author,tags.author')
+    assert first.cache_key() == second.cache_key()
+    assert first.cache_key().startswith('fields=id,title;')
+    assert _from(expand='author').cache_key() == 'fields=*;expand=author'
+    assert _from(expand='author').cache_key() != _from(expand='tags').cache_key()
+
+
+def test_article_to_dict_with_nested_selection(user):
+    tag = Tag(user_id=user.id, name='标签')
+    article = Article(user_id=user.id, title='标题', status='published')
+    article.set_content({'type': 'doc', 'content': []})
+    article.tags = [tag]
+    db.session.add(article)
+    db.session.commit()
+
+    data = article.to_dict(fieldset=_from(fields='title,tags', expand='tags.author'))
+    assert set(data) == {'id', 'title', 'tags'}
+    assert data['tags'][0]['author']['username'] == user.username
+
+    data = article.to_dict(fieldset=_from(fields='title,tags'))
+    assert 'author' not in data['tags'][0]
@@ -0,0 +1,57 @@
+import pytest
+
+from src.models import db, Article, Tag
+
+
+@pytest.fixture
+def article(user):
+    tag = Tag(user_id=user.id, name='前端', color='#1677ff')
+    article = Article(user_id=user.id, title='标题', status='published')
+    article.set_content({'type': 'doc', 'content': []})
+    article.tags = [tag]
+    db.session.add(article)
+    db.session.commit()
+    return article
+
+
+def _etag(client, article_id, **params):
+    response = client.get(f'/api/articles/{article_id}', query_string=params)
+    assert response.status_code == 200
+    return response.headers['ETag']
+
+
+def test_etag_is_weak(client, article):
+    assert _etag(client, article.id).startswith('W/"')
+
+
+def test_unchanged_article_returns_304(client, article):
+    etag = _etag(client, article.id)
+    response = client.get(f'/api/articles/{article.id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_renaming_tag_changes_etag(client, article):
+    before = _etag(client, article.id)
+    tag = Tag.query.filter_by(name='前端').one()
+    tag.name = 'Frontend'
+    db.session.commit()
+
+    after = _etag(client, article.id)
+    assert after != before
+    response = client.get(f'/api/articles/{article.id}', headers={'If-None-Match': before})
+    assert response.status_code == 200
+    assert response.get_json()['data']['tags'][0]['name'] == 'Frontend'
+
+
+def test_renaming_author_changes_etag(client, article, user):
+    before = _etag(client, article.id)
+    user.display_name = '新名字'
+    db.session.commit()
+    assert _etag(client, article.id) != before
+
+
+def test_unexpanded_tag_does_not_affect_etag(client, article):
+    before = _etag(client, article.id, fields='id,title')
+    Tag.query.filter_by(name='前端').one().name = 'Frontend'
+    db.session.commit()
+    assert _etag(client, article.id, fields='id,title') == before
@@ -0,0 +1,145 @@
+import pytest
+
+from src.models import db, Mindmap, Roadmap
+from src.utils.json_patch import JsonPatchError, JsonPatchTestFailed, apply_patch, parse_pointer
+
+
+def test_parse_pointer_unescapes_tokens_in_order():
+    assert parse_pointer('') == []
+    assert parse_pointer('/a~1b/m~0n') == ['a/b', 'm~n']
+    # ~01 先还原 ~1 再还原 ~0，结果为字面量 ~1 而不是 /
+    assert parse_pointer('/~01') == ['~1']
+    assert parse_pointer('/') == ['']
+
+
+@pytest.mark.parametrize('pointer', ['a/b', 1, None])
+def test_parse_pointer_rejects_invalid_pointers(pointer):
+    with pytest.raises(JsonPatchError):
+        parse_pointer(pointer)
+
+
+def test_add_remove_replace():
+    doc = {'nodes': [{'id': 'a'}], 'meta': {'title': 't'}}
+    doc = apply_patch(doc, [
+        {'op': 'add', 'path': '/nodes/-', 'value': {'id': 'c'}},
+        {'op': 'add', 'path': '/nodes/1', 'value': {'id': 'b'}},
+        {'op': 'replace', 'path': '/meta/title', 'value': '标题'},
+        {'op': 'remove', 'path': '/meta/title'},
+        {'op': 'add', 'path': '/meta/a~1b', 'value': 1},
+        {'op': 'add', 'path': '/meta/m~0n', 'value': 2},
+    ])
+    assert doc == {'nodes': [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}], 'meta': {'a/b': 1, 'm~n': 2}}
+
+
+def test_move_and_copy():
+    doc = {'a': {'x': [1, 2]}, 'b': []}
+    doc = apply_patch(doc, [
+        {'op': 'copy', 'from': '/a/x', 'path': '/b/-'},
+        {'op': 'move', 'from': '/a/x/0', 'path': '/a/x/-'},
+        {'op': 'move', 'from': '/a/x', 'path': '/c'},
+    ])
+    assert doc == {'a': {}, 'b': [[1, 2]], 'c': [2, 1]}
+    # 复制的值与原值互不影响
+    doc['c'].append(3)
+    assert doc['b'] == [[1, 2]]
+
+
+def test_move_into_own_child_is_rejected():
+    with pytest.raises(JsonPatchError):
+        apply_patch({'a': {'b': {}}}, [{'op': 'move', 'from': '/a', 'path': '/a/b/c'}])
+
+
+def test_test_operation_distinguishes_booleans_from_numbers():
+    doc = {'flag': True, 'count': 1}
+    assert apply_patch(doc, [{'op': 'test', 'path': '/count', 'value': 1}]) is doc
+    with pytest.raises(JsonPatchTestFailed):
+        apply_patch(doc, [{'op': 'test', 'path': '/flag', 'value': 1}])
+    with pytest.raises(JsonPatchTestFailed):
+        apply_patch(doc, [{'op': 'test', 'path': '/count', 'value': True}])
+
+
+def test_replace_root_returns_new_document():
+    assert apply_patch({'a': 1}, [{'op': 'replace', 'path': '', 'value': {'b': 2}}]) == {'b': 2}
+
+
+@pytest.mark.parametrize('operation', [
+    {'op': 'add', 'path': '/list/3', 'value': 0},       # 越界
+    {'op': 'add', 'path': '/list/01', 'value': 0},      # 前导零
+    {'op': 'replace', 'path': '/list/-', 'value': 0},   # '-' 只能用于 add
+    {'op': 'remove', 'path': '/missing'},
+    {'op': 'replace', 'path': '/missing', 'value': 0},
+    {'op': 'add', 'path': '/list'},                     # 缺少 value
+    {'op': 'copy', 'path': '/x'},                       # 缺少 from
+    {'op': 'remove', 'path': ''},
+    {'op': 'unknown', 'path': '/list'},
+])
+def test_invalid_operations_raise(operation):
+    with pytest.raises(JsonPatchError):
+        apply_patch({'list': [1, 2]}, [operation])
+
+
+# ---- 接口 ----
+
+@pytest.fixture(params=['roadmaps', 'mindmaps'])
+def document(request, user):
+    model = Roadmap if request.param == 'roadmaps' else Mindmap
+    item = model(user_id=user.id, title='文档')
+    item.set_content({'nodes': [{'id': 'a'}], 'title': '旧标题'})
+    db.session.add(item)
+    db.session.commit()
+    return f'/api/{request.param}/{item.id}', item
+
+
+def test_patch_applies_and_bumps_version(client, auth_headers, document):
+    url, item = document
+    response = client.patch(url, headers=auth_headers, json={'base_version': 1, 'patch': [
+        {'op': 'test', 'path': '/title', 'value': '旧标题'},
+        {'op': 'replace', 'path': '/title', 'value': '新标题'},
+        {'op': 'add', 'path': '/nodes/-', 'value': {'id': 'b'}},
+    ]})
+    assert response.status_code == 200
+    assert response.get_json()['data']['version'] == 2
+
+    db.session.expire_all()
+    assert item.get_content() == {'nodes': [{'id': 'a'}, {'id': 'b'}], 'title': '新标题'}
+
+
+def test_patch_with_stale_version_conflicts(client, auth_headers, document):
+    url, item = document
+    response = client.patch(url, headers=auth_headers, json={'base_version': 0, 'patch': [
+        {'op': 'replace', 'path': '/title', 'value': '新标题'},
+    ]})
+    assert response.status_code == 409
+    assert response.get_json()['data'] == {'version': 1}
+
+    db.session.expire_all()
+    assert item.get_content()['title'] == '旧标题'
+
+
+def test_patch_with_failed_test_conflicts_and_changes_nothing(client, auth_headers, document):
+    url, item = document
+    response = client.patch(url, headers=auth_headers, json={'base_version': 1, 'patch': [
+        {'op': 'replace', 'path': '/title', 'value': '新标题'},
+        {'op': 'test', 'path': '/title', 'value': '旧标题'},
+    ]})
+    assert response.status_code == 409
+    assert response.get_json()['data'] == {'version': 1}
+
+    db.session.expire_all()
+    assert item.version == 1
+    assert item.get_content()['title'] == '旧标题'
+
+
+@pytest.mark.parametrize('body', [
+    {'base_version': 1, 'patch': [{'op': 'remove', 'path': '/missing'}]},
+    {'base_version': 1, 'patch': [{'op': 'replace', 'path': '', 'value': []}]},  # 内容必须为对象
+    {'base_version': True, 'patch': []},
+    {'base_version': 1, 'patch': {'op': 'add'}},
+])
+def test_invalid_patch_is_rejected(client, auth_headers, document, body):
+    url, item = document
+    response = client.patch(url, headers=auth_headers, json=body)
+    assert response.status_code == 400
+
+    db.session.expire_all()
+    assert item.version == 1
@@ -0,0 +1,51 @@
+import pytest
+
+from src.models import db, Article, Mindmap, Roadmap, Tag, User
+from src.utils.query_counter import count_queries
+
+PAGE_SIZES = (1, 5, 20)
+ITEM_COUNT = 20
+
+
+@pytest.fixture
+def content(user):
+    """每条内容属于不同作者，各带两个不同作者的标签，逐条懒加载时查询数会随每页数量增长"""
+    authors = [user] + [
+        User(username=f'author{i}', email=f'author{i}@example.com', password_hash='x') for i in range(ITEM_COUNT)
+    ]
+    db.session.add_all(authors)
+    db.session.flush()
+
+    for i in range(ITEM_COUNT):
+        author = authors[i % len(authors)]
+        tags = [
+            Tag(user_id=authors[(i + offset) % len(authors)].id, name=f'标签{i}-{offset}')
+            for offset in (1, 2)
+        ]
+        for model in (Article, Roadmap, Mindmap):
+            item = model(user_id=author.id, title=f'{model.__tablename__}{i}', status='published')
+            item.set_content({'type': 'doc', 'content': []})
+            item.tags = tags
+            db.session.add(item)
+    db.session.commit()
+
+
+@pytest.mark.parametrize('endpoint', ['/api/articles', '/api/roadmaps', '/api/mindmaps'])
+@pytest.mark.parametrize('cursor', [None, ''])
+def test_list_query_count_does_not_grow_with_page_size(app, client, auth_headers, content, endpoint, cursor):
+    counts = []
+    for limit in PAGE_SIZES:
+        params = {'limit': limit}
+        if cursor is not None:
+            params['cursor'] = cursor
+        db.session.expunge_all()
+        with count_queries(db.engine) as counter:
+            response = client.get(endpoint, query_string=params, headers=auth_headers)
+        assert response.status_code == 200
+        data = response.get_json()['data']
+        items = next(value for key, value in data.items() if key != 'pagination')
+        assert len(items) == limit
+        assert all(item['author'] and len(item['tags']) == 2 for item in items)
+        counts.append(counter.count)
+
+    assert len(set(counts)) == 1, dict(zip(PAGE_SIZES, counts))
@@ -0,0 +1,149 @@
+import pytest
+from sqlalchemy import select
+
+from src.models import db, Mindmap, MindmapNode
+from src.utils.mindmap_nodes import NODE_ID_MAX_LENGTH, build_tree, flatten_nodes, load_subtree, sync_nodes
+
+
+@pytest.fixture(autouse=True)
+def node_store(app):
+    app.config['MINDMAP_NODE_STORE'] = True
+    yield
+    app.config['MINDMAP_NODE_STORE'] = False
+
+
+def node(text, *children, uid=None):
+    data = {'text': text}
+    if uid is not None:
+        data['uid'] = uid
+    return {'data': data, 'children': list(children)}
+
+
+def content(root):
+    return {'root': root, 'layout': 'logicalStructure', 'theme': {'template': 'default'}}
+
+
+def stored_nodes(mindmap_id):
+    table = MindmapNode.__table__
+    return {
+        row.node_id: row
+        for row in db.session.execute(select(table).where(table.c.mindmap_id == mindmap_id))
+    }
+
+
+def test_flatten_uses_uids_and_preorder():
+    rows = flatten_nodes(content(node('根', node('A', node('A1', uid='a1'), uid='a'), node('B', uid='b'), uid='r')))
+    assert [(row['node_id'], row['parent_id'], row['position'], row['depth'], row['child_count']) for row in rows] == [
+        ('r', None, 0, 0, 2),
+        ('a', 'r', 0, 1, 1),
+        ('a1', 'a', 0, 2, 0),
+        ('b', 'r', 1, 1, 0),
+    ]
+
+
+def test_fallback_ids_derive_from_parent_and_position():
+    rows = flatten_nodes(content(node('根', node('A', node('A1')), node('B', uid='b'), node('C'))))
+    assert [row['node_id'] for row in rows] == ['#', '#/0', '#/0/0', 'b', '#/2']
+
+
+def test_fallback_ids_survive_insertion_elsewhere():
+    before = flatten_nodes(content(node('根', node('A', node('A1')), node('B', node('B1')))))
+    # 在 A 下新增子节点，B 子树的先序序号会变化，但ID不变
+    after = flatten_nodes(content(node('根', node('A', node('A1'), node('A2')), node('B', node('B1')))))
+    ids_before = {row['data']['text']: row['node_id'] for row in before}
+    ids_after = {row['data']['text']: row['node_id'] for row in after}
+    assert all(ids_after[text] == node_id for text, node_id in ids_before.items())
+    assert ids_after['A2'] == '#/0/1'
+
+
+def test_duplicate_long_and_colliding_uids_fall_back():
+    long_uid = 'x' * (NODE_ID_MAX_LENGTH + 1)
+    rows = flatten_nodes(content(node('根', node('A', uid='dup'), node('B', uid='dup'), node('C', uid=long_uid))))
+    assert [row['node_id'] for row in rows] == ['#', 'dup', '#/1', '#/2']
+
+    # 生成的ID与其他节点的 uid 冲突时追加序号
+    rows = flatten_nodes(content(node('根', node('A', uid='#/1'), node('B'))))
+    assert [row['node_id'] for row in rows] == ['#', '#/1', '#/1~1']
+
+
+def test_deep_fallback_ids_stay_within_column_length():
+    root = leaf = node('根')
+    for depth in range(40):
+        child = node(f'n{depth}')
+        leaf['children'].append(child)
+        leaf = child
+    rows = flatten_nodes(content(root))
+    assert len({row['node_id'] for row in rows}) == len(rows)
+    assert max(len(row['node_id']) for row in rows) <= NODE_ID_MAX_LENGTH
+
+
+@pytest.fixture
+def mindmap(user):
+    mindmap = Mindmap(user_id=user.id, title='导图')
+    mindmap.set_content(content(node('根', node('A', node('A1'), node('A2')), node('B', node('B1')))))
+    db.session.add(mindmap)
+    db.session.commit()
+    return mindmap
+
+
+def test_save_syncs_node_table(mindmap):
+    assert mindmap.nodes_synced
+    nodes = stored_nodes(mindmap.id)
+    assert set(nodes) == {'#', '#/0', '#/0/0', '#/0/1', '#/1', '#/1/0'}
+    assert nodes['#/1/0'].parent_id == '#/1'
+    assert nodes['#'].child_count == 2
+
+
+def test_insertion_only_writes_changed_nodes(mindmap):
+    before = stored_nodes(mindmap.id)
+    # 在第一个子节点前插入新节点：根节点的子节点位置都会变化
+    changed = sync_nodes(
+        db.session.connection(), mindmap.id,
+        content(node('根', node('A', node('A0'), node('A1'), node('A2')), node('B', node('B1'))))
+    )
+    after = stored_nodes(mindmap.id)
+    # A 的 child_count 变化，A 下原有两个节点的数据右移一位，新增一个节点；B 子树不受影响
+    assert changed == 4
+    assert after['#/1/0'].id == before['#/1/0'].id
+    assert after['#/0/2'].data == before['#/0/1'].data
+
+
+def test_sync_removes_deleted_nodes(mindmap):
+    mindmap.set_content(content(node('根', node('A'))))
+    db.session.commit()
+    assert set(stored_nodes(mindmap.id)) == {'#', '#/0'}
+    assert mindmap.nodes_synced
+
+
+def test_deleting_mindmap_deletes_nodes(mindmap):
+    mindmap_id = mindmap.id
+    db.session.delete(mindmap)
+    db.session.commit()
+    assert stored_nodes(mindmap_id) == {}
+
+
+def test_subtree_limits_depth(mindmap):
+    rows = MindmapNode.subtree(mindmap.id, '#/0', 1)
+    assert [(row.node_id, row.level) for row in rows] == [('#/0', 0), ('#/0/0', 1), ('#/0/1', 1)]
+
+    rows = MindmapNode.subtree(mindmap.id, '#', 0)
+    assert [row.node_id for row in rows] == ['#']
+
+    assert MindmapNode.subtree(mindmap.id, 'missing', 3) == []
+
+
+def test_load_subtree_matches_content_fallback(mindmap):
+    from_table = load_subtree(mindmap, None, 1)
+    expected = build_tree(flatten_nodes(mindmap.get_content()), '#', 1)
+    assert from_table == expected
+    assert [child['node_id'] for child in from_table['children']] == ['#/0', '#/1']
+    assert from_table['children'][0]['children'] == []
+    assert from_table['children'][0]['child_count'] == 2
+
+
+def test_nodes_endpoint(client, auth_headers, mindmap):
+    response = client.get(f'/api/mindmaps/{mindmap.id}/nodes?root=%23/0&depth=1', headers=auth_headers)
+    assert response.status_code == 200
+    tree = response.get_json()['data']['root']
+    assert tree['data'] == {'text': 'A'}
+    assert [child['data']['text'] for child in tree['children']] == ['A1', 'A2']
@@ -0,0 +1,92 @@
+import pytest
+
+from src.models import Article
+from src.utils.pagination import MAX_PAGE_LIMIT, decode_cursor, encode_cursor, keyset_paginate, keyset_paginate_sorted
+
+COLUMNS = [Article.published_at, Article.created_at, Article.id]
+
+
+def test_cursor_round_trip():
+    from datetime import datetime
+    values = [None, datetime(2024, 5, 1, 12, 30), 42]
+    assert decode_cursor(encode_cursor(values), COLUMNS) == values
+
+
+@pytest.mark.parametrize('payload', [
+    [None, 1, 42],              # 日期时间列不是字符串
+    [None, 'not-a-date', 42],   # 日期时间格式错误
+    [None, '2024-05-01T12:30:00', '42'],  # 整数列为字符串
+    [None, '2024-05-01T12:30:00', True],  # 整数列为布尔值
+    [None, '2024-05-01T12:30:00'],        # 长度不符
+])
+def test_invalid_cursor_values_raise_value_error(payload):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(payload), COLUMNS)
+
+
+def test_malformed_cursor_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor('%%%', COLUMNS)
+
+
+@pytest.fixture
+def articles(user):
+    from src.models import db
+    items = []
+    for i in range(3):
+        article = Article(user_id=user.id, title=f'文章{i}', status='published')
+        article.set_content({'type': 'doc', 'content': []})
+        db.session.add(article)
+        items.append(article)
+    db.session.commit()
+    return items
+
+
+@pytest.mark.parametrize('limit', [0, -5, None])
+def test_keyset_limit_is_clamped_to_one(articles, limit):
+    items, pagination = keyset_paginate(Article.query, COLUMNS, '', limit)
+    assert len(items) == 1
+    assert pagination['limit'] == 1
+    assert pagination['has_next'] is True
+    assert pagination['next_cursor'] is not None
+
+
+def test_keyset_limit_is_capped(articles):
+    _, pagination = keyset_paginate(Article.query, COLUMNS, '', MAX_PAGE_LIMIT + 50)
+    assert pagination['limit'] == MAX_PAGE_LIMIT
+
+
+def test_sorted_keyset_limit_is_clamped():
+    keys = [('a', 1), ('b', 2), ('c', 3)]
+    page, pagination = keyset_paginate_sorted([1, 2, 3], keys, [Article.title, Article.id], '', 0)
+    assert page == [1]
+    assert pagination['has_next'] is True
+    assert pagination['next_cursor'] is not None
+
+
+@pytest.mark.parametrize('payload', [
+    [None, 1],   # 名称列不可为空
+    ['a', None],  # ID 列不可为空
+])
+def test_null_cursor_value_for_non_nullable_column_raises_value_error(payload):
+    from src.models import Tag
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(payload), [Tag.name, Tag.id])
+
+
+def test_null_cursor_value_rejected_by_sorted_pagination():
+    from src.models import Tag
+    keys = [('a', 1), ('b', 2)]
+    with pytest.raises(ValueError):
+        keyset_paginate_sorted([1, 2], keys, [Tag.name, Tag.id], encode_cursor([None, 1]), 10)
+
+
+def test_codepoint_order_compiles_to_binary_comparison():
+    from sqlalchemy import select
+    from sqlalchemy.dialects import mysql
+    from src.models import Tag
+    from src.utils.pagination import CodepointOrder
+    name = CodepointOrder(Tag.name)
+    sql = str(select(Tag.id).where(name > 'a').order_by(name).compile(dialect=mysql.dialect()))
+    assert 'CAST(tags.name AS BINARY) >' in sql
+    assert sql.endswith('ORDER BY CAST(tags.name AS BINARY)')
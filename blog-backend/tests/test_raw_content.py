@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from src.models import db, Article, Mindmap, Roadmap
+from src.utils.json_provider import is_valid_json
+
+
+@pytest.mark.parametrize('text, valid', [
+    ('{"type":"doc","content":[]}', True),
+    ('[1, 2.5, "三"]', True),
+    ('plain legacy text', False),
+    ('{"type":"doc"', False),
+    ('{"value":NaN}', False),
+    ('{"value":Infinity}', False),
+])
+def test_is_valid_json(text, valid):
+    assert is_valid_json(text) is valid
+
+
+@pytest.fixture(params=[('articles', Article), ('roadmaps', Roadmap), ('mindmaps', Mindmap)], ids=lambda p: p[0])
+def legacy_item(request, user):
+    path, model = request.param
+    item = model(user_id=user.id, title='旧数据', status='published')
+    item.set_content({'type': 'doc'})
+    db.session.add(item)
+    db.session.commit()
+    return path, item
+
+
+@pytest.mark.parametrize('stored, expected', [
+    ('{"type":"doc","content":[{"type":"paragraph"}]}', {'type': 'doc', 'content': [{'type': 'paragraph'}]}),
+    ('plain legacy text', {}),
+    ('', {}),
+    ('~z: legacy text with a compression marker', {}),
+    ('{"ratio":NaN}', {'ratio': None}),
+])
+def test_detail_response_is_valid_json_for_legacy_content(client, auth_headers, legacy_item, stored, expected):
+    path, item = legacy_item
+    item.content = stored
+    db.session.commit()
+
+    response = client.get(f'/api/{path}/{item.id}', headers=auth_headers)
+    assert response.status_code == 200
+    # 响应体必须是严格合法的 JSON，不能拼接进旧的纯文本或 NaN
+    body = json.loads(response.get_data(as_text=True), parse_constant=lambda name: pytest.fail(name))
+    assert body['data']['content'] == expected
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from sqlalchemy import Column, MetaData, Table, inspect, text
+
+from src.models import db, Article, Tag
+from src.utils.schema import _clear_dangling_references, upgrade_schema
+
+
+def _drop_tag_article_column():
+    """模拟升级前的数据库：tags 表还没有 article_id 列及其索引和外键
+
+    SQLite 不能删除外键中的列，按去掉该列的结构重建 tags 表。
+    """
+    legacy = Table('tags_legacy', MetaData(), *[
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in Tag.__table__.columns if column.name != 'article_id'
+    ])
+    legacy.create(db.session.connection())
+    columns = ', '.join(column.name for column in legacy.columns)
+    for statement in [
+        f'INSERT INTO tags_legacy ({columns}) SELECT {columns} FROM tags',
+        'DROP TABLE tags',
+        'ALTER TABLE tags_legacy RENAME TO tags',
+        'CREATE INDEX idx_tags_user_id ON tags (user_id)',
+    ]:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+def test_upgrade_adds_column_then_backfills_then_indexes(user):
+    tag = Tag(user_id=user.id, name='标签')
+    article = Article(user_id=user.id, title='标签', status='published', is_tag_article=True)
+    article.set_content({'type': 'doc', 'content': []})
+    article.tags = [tag]
+    db.session.add(article)
+    db.session.commit()
+    tag_id, article_id = tag.id, article.id
+    db.session.expunge_all()
+
+    _drop_tag_article_column()
+    changes = upgrade_schema(db)
+
+    assert changes == [
+        'tags.article_id: 新增列',
+        'tags.article_id: 回填 1 行',
+        'tags.idx_tags_article_id: 新增索引',
+    ]
+    assert db.session.get(Tag, tag_id).article_id == article_id
+    assert 'idx_tags_article_id' in {index['name'] for index in inspect(db.engine).get_indexes('tags')}
+    # 再次升级无需任何变更
+    assert upgrade_schema(db) == []
+
+
+def test_dangling_references_are_cleared_without_touching_updated_at(user):
+    updated_at = datetime(2024, 1, 1)
+    tag = Tag(user_id=user.id, name='标签')
+    db.session.add(tag)
+    db.session.commit()
+    db.session.execute(Tag.__table__.update().values(article_id=999, updated_at=updated_at))
+    db.session.commit()
+
+    constraint = next(iter(Tag.__table__.c.article_id.foreign_keys)).constraint
+    with db.engine.begin() as conn:
+        _clear_dangling_references(conn, constraint)
+
+    db.session.expire_all()
+    tag = db.session.get(Tag, tag.id)
+    assert tag.article_id is None
+    assert tag.updated_at == updated_at
@@ -0,0 +1,61 @@
+import pytest
+
+from src.models import db, Article
+from src.utils.search_index import index_article, search_articles, tokenize
+
+
+def _paragraph(text):
+    return {'type': 'doc', 'content': [{'type': 'paragraph', 'content': [{'type': 'text', 'text': text}]}]}
+
+
+@pytest.fixture
+def articles(user):
+    created = []
+    for title, body in [
+        ('前端工程化实践', '构建工具与模块化'),
+        ('Reactive programming', 'Streams and observables in practice'),
+        ('后端服务', 'Database indexing'),
+    ]:
+        article = Article(user_id=user.id, title=title, status='published')
+        article.set_content(_paragraph(body))
+        db.session.add(article)
+        db.session.flush()
+        index_article(article)
+        created.append(article)
+    db.session.commit()
+    return created
+
+
+def _ids(text):
+    return [article_id for article_id, _ in search_articles(text)]
+
+
+def test_tokenize_indexes_cjk_unigrams_and_bigrams():
+    assert tokenize('前端') == ['前', '端', '前端']
+    assert tokenize('前端', unigrams=False) == ['前端']
+
+
+def test_single_cjk_character_query(articles):
+    assert _ids('前') == [articles[0].id]
+
+
+def test_cjk_phrase_query(articles):
+    assert _ids('工程化') == [articles[0].id]
+
+
+def test_english_prefix_query(articles):
+    assert _ids('react') == [articles[1].id]
+    assert _ids('observ') == [articles[1].id]
+
+
+def test_english_substring_falls_back_to_like(articles):
+    # 单词中间的子串无法通过前缀匹配，回退到标题和摘要的子串匹配
+    assert _ids('active') == [articles[1].id]
+
+
+def test_single_letter_query_uses_like(articles):
+    assert set(_ids('R')) == {articles[1].id}
+
+
+def test_all_terms_required(articles):
+    assert _ids('前端 database') == []
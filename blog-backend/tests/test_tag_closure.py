@@ -0,0 +1,120 @@
+import random
+
+import pytest
+
+from src.models import db, Tag, TagClosure, TagRelation
+
+
+@pytest.fixture
+def make_tags(user):
+    def make(*names):
+        tags = [Tag(user_id=user.id, name=name) for name in names]
+        db.session.add_all(tags)
+        db.session.commit()
+        return [tag.id for tag in tags]
+    return make
+
+
+def link(user, parent_id, child_id):
+    is_valid, msg = TagRelation.validate_dag(user.id, parent_id, child_id)
+    assert is_valid, msg
+    db.session.add(TagRelation(parent_tag_id=parent_id, child_tag_id=child_id, user_id=user.id))
+    TagClosure.link(user.id, parent_id, child_id)
+    db.session.commit()
+
+
+def unlink(user, parent_id, child_id):
+    relation = TagRelation.query.filter_by(parent_tag_id=parent_id, child_tag_id=child_id).one()
+    TagClosure.unlink(user.id, parent_id, child_id)
+    db.session.delete(relation)
+    db.session.commit()
+
+
+def closure():
+    return {
+        (row.ancestor_id, row.descendant_id, row.depth): row.path_count
+        for row in TagClosure.query.all()
+    }
+
+
+def test_diamond_counts_both_paths(user, make_tags):
+    a, b, c, d = make_tags('A', 'B', 'C', 'D')
+    for parent, child in [(a, b), (a, c), (b, d), (c, d)]:
+        link(user, parent, child)
+
+    assert closure() == {
+        (a, b, 1): 1, (a, c, 1): 1, (b, d, 1): 1, (c, d, 1): 1,
+        (a, d, 2): 2,
+    }
+
+
+def test_unlinking_one_diamond_path_keeps_closure_row(user, make_tags):
+    a, b, c, d = make_tags('A', 'B', 'C', 'D')
+    for parent, child in [(a, b), (a, c), (b, d), (c, d)]:
+        link(user, parent, child)
+
+    unlink(user, b, d)
+
+    assert closure() == {(a, b, 1): 1, (a, c, 1): 1, (c, d, 1): 1, (a, d, 2): 1}
+    assert TagRelation.validate_dag(user.id, d, a) == (False, '添加此关系会形成循环')
+
+    unlink(user, c, d)
+    assert (a, d, 2) not in closure()
+    assert TagRelation.validate_dag(user.id, d, a)[0] is True
+
+
+def test_paths_of_different_lengths_are_separate_rows(user, make_tags):
+    a, b, c = make_tags('A', 'B', 'C')
+    for parent, child in [(a, b), (b, c), (a, c)]:
+        link(user, parent, child)
+
+    assert closure() == {(a, b, 1): 1, (b, c, 1): 1, (a, c, 1): 1, (a, c, 2): 1}
+
+    unlink(user, a, c)
+    assert closure() == {(a, b, 1): 1, (b, c, 1): 1, (a, c, 2): 1}
+
+
+def test_cycle_detection_rejects_back_edges(user, make_tags):
+    a, b, c = make_tags('A', 'B', 'C')
+    link(user, a, b)
+    link(user, b, c)
+
+    assert TagRelation.validate_dag(user.id, c, a) == (False, '添加此关系会形成循环')
+    assert TagRelation.validate_dag(user.id, b, a) == (False, '添加此关系会形成循环')
+    assert TagRelation.validate_dag(user.id, a, a) == (False, '标签不能关联自己')
+    assert TagRelation.validate_dag(user.id, a, c)[0] is True
+
+
+def test_relation_route_rejects_back_edge(client, auth_headers, user, make_tags):
+    a, b = make_tags('A', 'B')
+    link(user, a, b)
+
+    response = client.post('/api/tags/relations', json={'parent_tag_id': b, 'child_tag_id': a}, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert TagRelation.query.count() == 1
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_rebuild_matches_incremental_maintenance(user, make_tags, seed):
+    rng = random.Random(seed)
+    tag_ids = make_tags(*[f'T{i}' for i in range(12)])
+
+    # 只添加从编号小的标签指向编号大的标签的关系，保证无环；随后随机删除一部分
+    edges = [
+        (tag_ids[i], tag_ids[j])
+        for i in range(len(tag_ids)) for j in range(i + 1, len(tag_ids))
+        if rng.random() < 0.3
+    ]
+    for parent, child in edges:
+        link(user, parent, child)
+    for parent, child in rng.sample(edges, len(edges) // 3):
+        unlink(user, parent, child)
+
+    incremental = closure()
+    assert incremental
+
+    TagClosure.rebuild(user.id)
+    db.session.commit()
+
+    assert closure() == incremental
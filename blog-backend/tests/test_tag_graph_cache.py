@@ -0,0 +1,133 @@
+import pytest
+from sqlalchemy import delete, event, insert
+
+from src.models import db, Tag, TagRelation
+from src.utils.tag_graph_cache import TagGraphCache, tag_graph_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(user):
+    # 缓存为进程级单例，各测试的数据库重新创建，前后都使其失效
+    tag_graph_cache.invalidate(user.id)
+    yield
+    tag_graph_cache.invalidate(user.id)
+
+
+def _warm_cache(client, user):
+    assert client.get('/api/tags/graph', query_string={'user_id': user.id}).status_code == 200
+    assert tag_graph_cache.peek(user.id) is not None
+
+
+def _insert_tag_elsewhere(user, name):
+    # 以 Core 写入，模拟其他进程提交，不触发本进程的缓存失效
+    return db.session.execute(insert(Tag).values(user_id=user.id, name=name, color='#1677ff')).inserted_primary_key[0]
+
+
+def test_create_tag_accepts_parent_missing_from_stale_cache(client, user, auth_headers):
+    _warm_cache(client, user)
+    parent_id = _insert_tag_elsewhere(user, '父标签')
+    db.session.commit()
+
+    response = client.post('/api/tags', json={'name': '子标签', 'parent_tags': [parent_id]}, headers=auth_headers)
+
+    assert response.status_code == 201
+    child_id = response.get_json()['data']['id']
+    assert TagRelation.query.filter_by(parent_tag_id=parent_id, child_tag_id=child_id).count() == 1
+
+
+def test_create_tag_skips_parent_deleted_after_caching(client, user, auth_headers):
+    parent_id = _insert_tag_elsewhere(user, '父标签')
+    db.session.commit()
+    _warm_cache(client, user)
+    db.session.execute(delete(Tag).where(Tag.id == parent_id))
+    db.session.commit()
+
+    response = client.post('/api/tags', json={'name': '子标签', 'parent_tags': [parent_id]}, headers=auth_headers)
+
+    assert response.status_code == 201
+    assert TagRelation.query.count() == 0
+
+
+def test_create_tag_ignores_other_users_parent(client, user, auth_headers):
+    from src.models import User
+    other = User(username='other', email='other@example.com', password_hash='x')
+    db.session.add(other)
+    db.session.commit()
+    foreign_id = _insert_tag_elsewhere(other, '他人的标签')
+    db.session.commit()
+
+    response = client.post('/api/tags', json={'name': '子标签', 'parent_tags': [foreign_id, foreign_id]}, headers=auth_headers)
+
+    assert response.status_code == 201
+    assert TagRelation.query.count() == 0
+
+
+def test_invalidating_uncached_users_keeps_no_state():
+    cache = TagGraphCache()
+    for user_id in range(1000):
+        cache.invalidate(user_id)
+    assert not cache._graphs and not cache._loading and not cache._invalidated_at
+
+
+def test_lru_eviction_bounds_internal_state(app):
+    from src.models import User
+    users = [User(username=f'u{i}', email=f'u{i}@example.com', password_hash='x') for i in range(5)]
+    db.session.add_all(users)
+    db.session.commit()
+
+    cache = TagGraphCache()
+    cache.max_users = 2
+    for user in users:
+        cache.get(user.id)
+        cache.invalidate(user.id + 100)
+
+    assert list(cache._graphs) == [users[3].id, users[4].id]
+    assert cache.evictions == 3
+    assert not cache._loading and not cache._invalidated_at
+
+
+def test_graph_invalidated_during_load_is_not_cached(user):
+    cache = TagGraphCache()
+    fired = []
+
+    def invalidate_once(*args):
+        if not fired:
+            fired.append(True)
+            cache.invalidate(user.id)
+
+    event.listen(db.engine, 'before_cursor_execute', invalidate_once)
+    try:
+        graph = cache.get(user.id)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', invalidate_once)
+
+    assert graph is not None
+    assert cache.peek(user.id) is None
+    assert not cache._loading and not cache._invalidated_at
+
+    reloaded = cache.get(user.id)
+    assert cache.peek(user.id) is reloaded
+    assert reloaded.version > graph.version
+
+
+def test_cached_and_database_tag_orderings_match(app, user):
+    from src.utils.fieldsets import DEFAULT_FIELDSET
+    from src.utils.tag_listing import list_user_tags, query_tags
+    for name in ['beta', 'Alpha', 'alpha', 'Zeta', '标签', 'Émile', '_x', '10', '9']:
+        db.session.add(Tag(user_id=user.id, name=name))
+    db.session.commit()
+
+    cached = []
+    database = []
+    cursor = ''
+    while cursor is not None:
+        page, pagination = list_user_tags(user.id, DEFAULT_FIELDSET, cursor, 2)
+        cached.extend(tag['name'] for tag in page)
+        # 缓存路径返回的游标可直接用于数据库路径，反之亦然
+        db_page, _ = query_tags(DEFAULT_FIELDSET, cursor, 2, user_id=user.id)
+        database.extend(tag['name'] for tag in db_page)
+        cursor = pagination['next_cursor']
+
+    assert cached == database == sorted(cached)
+    all_tags, _ = query_tags(DEFAULT_FIELDSET, user_id=user.id)
+    assert [tag['name'] for tag in all_tags] == cached
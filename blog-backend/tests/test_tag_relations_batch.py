@@ -0,0 +1,120 @@
+import pytest
+
+from src.models import db, Tag, TagClosure, TagRelation
+from src.routes.tag import RELATION_BATCH_LIMIT
+from src.utils.dag import partition_new_edges, topological_order
+
+
+# ---- partition_new_edges ----
+
+def test_acyclic_batch_is_accepted_as_is():
+    accepted, rejected = partition_new_edges([(1, 2)], [(2, 3), (1, 3)])
+    assert accepted == [(2, 3), (1, 3)]
+    assert rejected == []
+
+
+def test_cycle_within_batch_rejects_later_edge():
+    accepted, rejected = partition_new_edges([], [(1, 2), (2, 3), (3, 1)])
+    assert accepted == [(1, 2), (2, 3)]
+    assert rejected == [(3, 1)]
+
+
+def test_cycle_through_existing_edges():
+    accepted, rejected = partition_new_edges([(1, 2), (2, 3)], [(3, 1), (3, 4)])
+    assert accepted == [(3, 4)]
+    assert rejected == [(3, 1)]
+
+
+def test_two_independent_cycles_and_downstream_edges():
+    new_edges = [(1, 2), (2, 1), (3, 4), (4, 3), (2, 5), (5, 6)]
+    accepted, rejected = partition_new_edges([], new_edges)
+    assert rejected == [(2, 1), (4, 3)]
+    assert accepted == [(1, 2), (3, 4), (2, 5), (5, 6)]
+    _, remaining = topological_order((), accepted)
+    assert not remaining
+
+
+def test_earlier_edge_wins_in_two_cycle():
+    accepted, rejected = partition_new_edges([], [(2, 1), (1, 2)])
+    assert accepted == [(2, 1)]
+    assert rejected == [(1, 2)]
+
+
+# ---- POST /api/tags/relations/batch ----
+
+@pytest.fixture
+def tags(user):
+    tags = [Tag(user_id=user.id, name=f'T{i}') for i in range(6)]
+    db.session.add_all(tags)
+    db.session.commit()
+    return [tag.id for tag in tags]
+
+
+def _post(client, auth_headers, edges):
+    return client.post('/api/tags/relations/batch', headers=auth_headers, json={
+        'relations': [{'parent_tag_id': parent, 'child_tag_id': child} for parent, child in edges]
+    })
+
+
+def _errors(response):
+    return {item['index']: item['error'] for item in response.get_json()['data']['rejected']}
+
+
+def test_batch_rejects_cycles_duplicates_and_self_loops(client, auth_headers, user, tags):
+    a, b, c, d, e, _ = tags
+    db.session.add(TagRelation(parent_tag_id=a, child_tag_id=b, user_id=user.id))
+    TagClosure.link(user.id, a, b)
+    db.session.commit()
+
+    response = _post(client, auth_headers, [
+        (b, c),        # 0 接受
+        (c, a),        # 1 经已有关系 a->b 与本批 b->c 成环
+        (a, b),        # 2 已存在
+        (d, d),        # 3 自环
+        (b, c),        # 4 本批重复
+        (d, e),        # 5 接受
+        (e, d),        # 6 本批内成环
+        (a, 99999),    # 7 标签不存在
+    ])
+
+    assert response.status_code == 201
+    assert _errors(response) == {
+        1: '添加此关系会形成循环',
+        2: '标签关系已存在',
+        3: '标签不能关联自己',
+        4: '与本批次中的关系重复',
+        6: '添加此关系会形成循环',
+        7: '标签不存在或无权访问',
+    }
+    created = {(item['parent_tag_id'], item['child_tag_id']) for item in response.get_json()['data']['created']}
+    assert created == {(b, c), (d, e)}
+    assert TagRelation.query.count() == 3
+    assert TagRelation.validate_dag(user.id, c, a)[0] is False
+
+
+def test_batch_with_nothing_to_create_returns_200(client, auth_headers, tags):
+    response = _post(client, auth_headers, [(tags[0], tags[0])])
+    assert response.status_code == 200
+    assert TagRelation.query.count() == 0
+
+
+@pytest.mark.parametrize('body', [{}, {'relations': []}, {'relations': 'x'}])
+def test_batch_requires_a_list(client, auth_headers, body):
+    response = client.post('/api/tags/relations/batch', headers=auth_headers, json=body)
+    assert response.status_code == 400
+
+
+def test_batch_limit(client, auth_headers, user):
+    root = Tag(user_id=user.id, name='root')
+    children = [Tag(user_id=user.id, name=f'c{i}') for i in range(RELATION_BATCH_LIMIT + 1)]
+    db.session.add_all([root] + children)
+    db.session.commit()
+    edges = [(root.id, child.id) for child in children]
+
+    too_many = _post(client, auth_headers, edges)
+    assert too_many.status_code == 400
+    assert TagRelation.query.count() == 0
+
+    at_limit = _post(client, auth_headers, edges[:RELATION_BATCH_LIMIT])
+    assert at_limit.status_code == 201
+    assert len(at_limit.get_json()['data']['created']) == RELATION_BATCH_LIMIT
@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import update
+
+from src.models import db, Article, Mindmap, Roadmap, Tag
+from src.utils.tag_usage import count_published_usage, reconcile_usage
+
+COUNT_COLUMNS = {Article: 'article_count', Roadmap: 'roadmap_count', Mindmap: 'mindmap_count'}
+
+
+@pytest.fixture
+def tags(user):
+    tags = [Tag(user_id=user.id, name=name) for name in ('A', 'B', 'C')]
+    db.session.add_all(tags)
+    db.session.commit()
+    return [tag.id for tag in tags]
+
+
+def _counts(column):
+    db.session.expire_all()
+    return [getattr(tag, column) or 0 for tag in Tag.query.order_by(Tag.id)]
+
+
+def _create(model, user, tag_ids, status='published'):
+    item = model(user_id=user.id, title='标题', status=status)
+    item.set_content({'type': 'doc', 'content': []})
+    item.tags = Tag.query.filter(Tag.id.in_(tag_ids)).all()
+    db.session.add(item)
+    db.session.commit()
+    return item.id
+
+
+def _assert_reconciled():
+    # 增量维护的结果应与按关联表重新统计的结果一致
+    assert reconcile_usage() == 0
+
+
+@pytest.mark.parametrize('model', [Article, Roadmap, Mindmap])
+def test_counts_follow_publish_state_and_tag_changes(user, tags, model):
+    column = COUNT_COLUMNS[model]
+    a, b, c = tags
+
+    item_id = _create(model, user, [a, b])
+    assert _counts(column) == [1, 1, 0]
+
+    # 在新会话状态下修改，tags 尚未加载
+    db.session.expunge_all()
+    item = db.session.get(model, item_id)
+    item.tags = [tag for tag in item.tags if tag.id != a] + [db.session.get(Tag, c)]
+    db.session.commit()
+    assert _counts(column) == [0, 1, 1]
+
+    db.session.expunge_all()
+    db.session.get(model, item_id).status = 'draft'
+    db.session.commit()
+    assert _counts(column) == [0, 0, 0]
+
+    db.session.expunge_all()
+    db.session.get(model, item_id).status = 'published'
+    db.session.commit()
+    assert _counts(column) == [0, 1, 1]
+    _assert_reconciled()
+
+    db.session.expunge_all()
+    db.session.delete(db.session.get(model, item_id))
+    db.session.commit()
+    assert _counts(column) == [0, 0, 0]
+    _assert_reconciled()
+
+
+def test_drafts_are_not_counted(user, tags):
+    _create(Article, user, tags, status='draft')
+    assert _counts('article_count') == [0, 0, 0]
+    _assert_reconciled()
+
+
+@pytest.mark.parametrize('clear_tags', [False, True])
+def test_deleting_tag_together_with_its_content(user, tags, clear_tags):
+    a, b, _ = tags
+    article_id = _create(Article, user, [a, b])
+    _create(Article, user, [b])
+    assert _counts('article_count') == [1, 2, 0]
+
+    db.session.expunge_all()
+    article = db.session.get(Article, article_id)
+    tag = db.session.get(Tag, a)
+    if clear_tags:
+        article.tags = []
+    db.session.delete(article)
+    db.session.delete(tag)
+    db.session.commit()
+
+    assert _counts('article_count') == [1, 0]
+    _assert_reconciled()
+
+
+def test_reconcile_fixes_drift(user, tags):
+    a, b, _ = tags
+    _create(Article, user, [a])
+    _create(Roadmap, user, [a, b])
+    db.session.execute(update(Tag).where(Tag.id == b).values(article_count=7, roadmap_count=0))
+    db.session.commit()
+
+    assert reconcile_usage() == 1
+    assert _counts('article_count') == [1, 0, 0]
+    assert _counts('roadmap_count') == [1, 1, 0]
+    assert count_published_usage([a]) == {a: {'article_count': 1, 'roadmap_count': 1}}
+    _assert_reconciled()
@@ -0,0 +1,81 @@
+import pytest
+
+from src.utils.tiptap import render_html
+
+
+def _text(marks):
+    return {'type': 'doc', 'content': [
+        {'type': 'paragraph', 'content': [{'type': 'text', 'text': 'hi', 'marks': marks}]}
+    ]}
+
+
+def _image(width):
+    return {'type': 'doc', 'content': [
+        {'type': 'paragraph', 'content': [{'type': 'inlineImage', 'attrs': {'src': '/a.png', 'width': width}}]}
+    ]}
+
+
+HOSTILE_VALUES = [
+    'red; background: url(https://evil.example/x.png)',
+    'red;position:fixed',
+    'expression(alert(1))',
+    'url(javascript:alert(1))',
+    '#fff" onmouseover="alert(1)',
+    'rgb(1,2,3); color: red',
+    {'nested': 'object'},
+]
+
+
+@pytest.mark.parametrize('value', HOSTILE_VALUES)
+def test_hostile_text_color_is_dropped(value):
+    html = render_html(_text([{'type': 'textStyle', 'attrs': {'color': value}}]))
+    assert html == '<p>hi</p>'
+
+
+@pytest.mark.parametrize('value', HOSTILE_VALUES)
+def test_hostile_highlight_color_is_dropped(value):
+    html = render_html(_text([{'type': 'highlight', 'attrs': {'color': value}}]))
+    assert html == '<p><mark>hi</mark></p>'
+
+
+@pytest.mark.parametrize('value', HOSTILE_VALUES + ['100px; position: fixed', '50vw', '1e9px'])
+def test_hostile_image_width_is_dropped(value):
+    html = render_html(_image(value))
+    assert 'style' not in html
+
+
+@pytest.mark.parametrize('value', ['#ff0000', '#FFF', 'red', 'rgb(255, 0, 0)', 'rgba(0,0,0,0.5)', 'hsl(120 50% 50%)'])
+def test_valid_colors_are_kept(value):
+    html = render_html(_text([{'type': 'textStyle', 'attrs': {'color': value}}]))
+    assert html == f'<p><span style="color: {value}">hi</span></p>'
+
+
+@pytest.mark.parametrize('value', ['320px', '120.5px', '50%', '2em'])
+def test_valid_image_width_is_kept(value):
+    assert f'style="width: {value}"' in render_html(_image(value))
+
+
+def test_deeply_nested_document_renders_without_recursion_error():
+    depth = 5000
+    node = {'type': 'paragraph', 'content': [{'type': 'text', 'text': 'deep'}]}
+    for _ in range(depth):
+        node = {'type': 'blockquote', 'content': [node]}
+    html = render_html({'type': 'doc', 'content': [node]})
+    assert html == '<blockquote>' * depth + '<p>deep</p>' + '</blockquote>' * depth
+
+
+def test_render_keeps_document_order():
+    doc = {'type': 'doc', 'content': [
+        {'type': 'heading', 'attrs': {'level': 2}, 'content': [{'type': 'text', 'text': 'A'}]},
+        {'type': 'bulletList', 'content': [
+            {'type': 'listItem', 'content': [{'type': 'paragraph', 'content': [{'type': 'text', 'text': '1'}]}]},
+            {'type': 'listItem', 'content': [{'type': 'paragraph', 'content': [
+                {'type': 'text', 'text': '2'}, {'type': 'hardBreak'}, {'type': 'text', 'text': '3'}
+            ]}]}
+        ]},
+        {'type': 'unknown', 'content': [{'type': 'text', 'text': 'x'}]},
+        'not-a-node'
+    ]}
+    assert render_html(doc) == (
+        '<h2>A</h2><ul><li><p>1</p></li><li><p>2<br>3</p></li></ul>x'
+    )
@@ -0,0 +1,81 @@
+import time
+
+import pytest
+from sqlalchemy import event
+
+from src.models import db, Article
+from src.utils.view_counter import ViewCounterBuffer
+
+
+@pytest.fixture
+def article(user):
+    article = Article(user_id=user.id, title='标题', status='published')
+    article.set_content({'type': 'doc', 'content': []})
+    db.session.add(article)
+    db.session.commit()
+    return article
+
+
+@pytest.fixture
+def counter(app):
+    # 独立实例，不启动后台线程
+    counter = ViewCounterBuffer()
+    counter._app = app
+    counter.flush_threshold = 2
+    return counter
+
+
+def _stored_views(article_id):
+    db.session.expire_all()
+    return db.session.get(Article, article_id).view_count or 0
+
+
+def test_threshold_signals_background_flush_instead_of_writing(counter, article):
+    for _ in range(3):
+        counter.increment('article', article.id)
+
+    assert counter._wake.is_set()
+    assert _stored_views(article.id) == 0
+    assert counter.pending('article', article.id) == 3
+
+
+def test_flush_writes_batch_and_keeps_updated_at(counter, article):
+    updated_at = article.updated_at
+    counter.increment('article', article.id, 5)
+
+    assert counter.flush() == 5
+    assert _stored_views(article.id) == 5
+    assert db.session.get(Article, article.id).updated_at == updated_at
+    assert counter.pending('article', article.id) == 0
+
+
+def test_pending_includes_batch_being_flushed(counter, article):
+    counter.increment('article', article.id, 4)
+    seen = []
+
+    def during_flush(*args):
+        seen.append(counter.pending('article', article.id))
+
+    event.listen(db.engine, 'before_cursor_execute', during_flush)
+    try:
+        counter.flush()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', during_flush)
+
+    assert seen and all(value == 4 for value in seen)
+    assert counter.pending('article', article.id) == 0
+
+
+def test_background_thread_flushes_when_threshold_reached(app, article):
+    app.config.update(VIEW_COUNTER_FLUSH_INTERVAL=60, VIEW_COUNTER_FLUSH_THRESHOLD=2)
+    counter = ViewCounterBuffer()
+    counter.init_app(app)
+    try:
+        counter.increment('article', article.id)
+        counter.increment('article', article.id)
+        deadline = time.monotonic() + 5
+        while counter.flush_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert _stored_views(article.id) == 2
+    finally:
+        counter.shutdown()